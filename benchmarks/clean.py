@@ -0,0 +1,54 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Compare clean followed by cfn_literal_parser with transform, which does both in one walk
+
+    python benchmarks/clean.py
+"""
+
+from templates import report, template
+from cfn_clean import clean, cfn_literal_parser, transform
+import copy
+import time
+
+
+def separately(data):
+    return cfn_literal_parser(clean(data))
+
+
+def best_of_fresh(function, data, repeat=5):
+    """
+    The fastest of several runs of function on a fresh copy of data, as it changes it in place
+    """
+
+    times = []
+
+    for _ in range(repeat):
+        fresh = copy.deepcopy(data)
+        start = time.perf_counter()
+        function(fresh)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def main():
+    data = template(10000)
+
+    assert separately(copy.deepcopy(data)) == transform(copy.deepcopy(data))
+
+    for name, function in (("clean, cfn_literal_parser", separately), ("transform", transform)):
+        report(name, best_of_fresh(function, data))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Compare dump_json with json.dumps(indent=4), which uses the pure-Python encoder
+
+    python benchmarks/dump_json.py
+"""
+
+from templates import best_of, report, template
+from cfn_tools import dump_json
+from cfn_tools.json_encoder import DateTimeAwareJsonEncoder
+import json
+
+
+def indented(data):
+    return json.dumps(data, indent=4, cls=DateTimeAwareJsonEncoder,
+                      separators=(',', ': '), ensure_ascii=False)
+
+
+def main():
+    data = template(10000)
+    size = len(dump_json(data).encode("utf-8")) / (1024.0 * 1024.0)
+
+    assert dump_json(data) == indented(data)
+
+    for name, function in (("json.dumps(indent=4)", indented), ("dump_json", dump_json)):
+        seconds = best_of(lambda: function(data))
+        report(name, seconds)
+        print("{:<40} {:>10.1f} MB/s".format("", size / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Latency of 200 requests arriving every 10 ms, mostly small templates and some big ones,
+converted in the event loop, in threads and in processes. The loop lag is the longest time
+a 1 ms timer was held up, which is how long everything else in a service would stall.
+
+    python benchmarks/flip_async.py
+"""
+
+from templates import json_template
+from cfn_flip.asynchronous import AsyncExecutor
+import asyncio
+import cfn_flip
+import time
+
+REQUESTS = 200
+
+# Seconds between requests arriving
+INTERVAL = 0.01
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def blocking(template):
+    return cfn_flip.flip(template)
+
+
+async def measure(convert, templates):
+    """
+    Send the templates at a steady rate and return each one's latency, counted from when
+    it was due to arrive, and the longest the event loop was held up
+    """
+
+    loop = asyncio.get_running_loop()
+    lag = [0.0]
+    done = asyncio.Event()
+    start = loop.time()
+
+    async def request(index, template):
+        arrival = start + index * INTERVAL
+        await asyncio.sleep(max(0, arrival - loop.time()))
+        await convert(template)
+        return loop.time() - arrival
+
+    async def heartbeat():
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag[0] = max(lag[0], time.perf_counter() - before - 0.001)
+
+    beat = asyncio.ensure_future(heartbeat())
+    latencies = await asyncio.gather(*[request(index, template) for index, template in enumerate(templates)])
+    done.set()
+    await beat
+
+    return latencies, lag[0]
+
+
+async def warm_up(convert, templates):
+    await asyncio.gather(*[convert(template) for template in templates])
+
+
+def main():
+    templates = [json_template(500 if index % 20 == 0 else 10) for index in range(REQUESTS)]
+
+    for name, pool in (("event loop", None), ("threads", "thread"), ("processes", "process")):
+        loop = asyncio.new_event_loop()
+
+        if pool is None:
+            convert = blocking
+            executor = None
+        else:
+            executor = AsyncExecutor(pool)
+
+            def convert(template, executor=executor):
+                return cfn_flip.flip_async(template, executor=executor)
+
+            # Start the workers so that they are warm, as they would be in a service
+            loop.run_until_complete(warm_up(convert, templates[:executor.max_concurrency]))
+
+        latencies, lag = loop.run_until_complete(measure(convert, templates))
+        loop.close()
+
+        if executor is not None:
+            executor.shutdown()
+
+        print("{:<12} p50 {:>7.1f} ms  p90 {:>7.1f} ms  p99 {:>7.1f} ms  loop lag {:>7.1f} ms".format(
+            name,
+            percentile(latencies, 0.5) * 1000,
+            percentile(latencies, 0.9) * 1000,
+            percentile(latencies, 0.99) * 1000,
+            lag * 1000,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Compare flipping 2,000 small templates in a loop with flip_many on 1, 2, 4... processes
+
+    python benchmarks/flip_many.py
+"""
+
+from templates import best_of, json_template, report
+import cfn_flip
+import multiprocessing
+
+
+def main():
+    templates = [json_template(5) for _ in range(2000)]
+    loop = best_of(lambda: [cfn_flip.flip(template) for template in templates], repeat=3)
+
+    report("flip in a loop", loop)
+
+    jobs = 1
+
+    while True:
+        seconds = best_of(lambda: list(cfn_flip.flip_many(templates, jobs=jobs)), repeat=3)
+        report("flip_many jobs={}".format(jobs), seconds)
+        print("{:<40} {:>10.2f}x".format("", loop / seconds))
+
+        if jobs >= multiprocessing.cpu_count():
+            break
+
+        jobs = min(jobs * 2, multiprocessing.cpu_count())
+
+
+if __name__ == "__main__":
+    main()
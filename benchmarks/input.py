@@ -0,0 +1,113 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Loading and flipping a 50,000 resource template read as text, as the command line tool used to,
+against reading it as bytes and memory-mapping it, as it does now: the peak memory of a new
+interpreter doing each from the file on, and how long loading takes in each case.
+Linux only, since it reads the peak from /proc.
+
+    python benchmarks/input.py
+"""
+
+from templates import best_of, json_template, report
+from cfn_tools.buffers import TemplateFile
+import cfn_flip
+import os
+import subprocess
+import sys
+import tempfile
+
+RESOURCES = 50000
+
+CODE = """
+import os
+import sys
+import cfn_flip
+from cfn_tools.buffers import TemplateFile
+
+def peak():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+
+before = peak()
+
+with open(os.devnull, "w") as output:
+    {operation}
+
+print(before, peak())
+"""
+
+READS = (
+    ("text", "with open(sys.argv[1]) as f:\n        template = f.read()\n    "),
+    ("bytes", "with open(sys.argv[1], 'rb') as f:\n        template = f.read()\n    "),
+    ("mmap", "with TemplateFile(sys.argv[1]) as template:\n        "),
+)
+
+OPERATIONS = (
+    ("load", "cfn_flip.load(template)"),
+    ("flip", "cfn_flip.flip(template, stream=output)"),
+)
+
+
+def peak_rss(path, operation):
+    """
+    The peak RSS in MB of a new interpreter before it reads the template at path, and once it has run operation
+    """
+
+    output = subprocess.check_output([sys.executable, "-c", CODE.format(operation=operation), path],
+                                     universal_newlines=True)
+
+    # VmHWM is in kilobytes
+    return [int(value) / 1024.0 for value in output.split()]
+
+
+def load_from(path, read):
+    if read == "text":
+        with open(path) as f:
+            return cfn_flip.load(f.read())
+
+    if read == "bytes":
+        with open(path, "rb") as f:
+            return cfn_flip.load(f.read())
+
+    with TemplateFile(path) as template:
+        return cfn_flip.load(template)
+
+
+def main():
+    source = json_template(RESOURCES)
+
+    for in_format, text in (("json", source), ("yaml", cfn_flip.to_yaml(source))):
+        with tempfile.NamedTemporaryFile("w", suffix="." + in_format, delete=False) as f:
+            f.write(text)
+
+        try:
+            print("{} template, {:.1f} MB".format(in_format, os.path.getsize(f.name) / (1024.0 * 1024.0)))
+
+            for operation_name, operation in OPERATIONS:
+                for read, code in READS:
+                    before, after = peak_rss(f.name, code + operation)
+
+                    print("{:<40} {:>10.1f} MB peak, {:.1f} MB more than at the start".format(
+                        "{} {}, {}".format(operation_name, in_format, read),
+                        after,
+                        after - before,
+                    ))
+
+            for read, _ in READS:
+                report("load {}, {}".format(in_format, read), best_of(lambda: load_from(f.name, read), repeat=3))
+        finally:
+            os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Time convert_join on Joins of 10 to 10,000 parts, like generated UserData,
+where a quarter of the parts repeat an earlier one. The time per part should stay flat.
+
+    python benchmarks/join.py
+"""
+
+from templates import best_of
+from cfn_clean import convert_join
+from cfn_tools.odict import ODict
+
+
+def part(index):
+    if index % 4 == 0:
+        return "line {}\n".format(index)
+
+    if index % 4 == 1:
+        return ODict((("Ref", "Parameter{}".format(index % 10)),))
+
+    if index % 4 == 2:
+        return ODict((("Fn::Select", [index % 3, ODict((("Fn::GetAZs", "Region{}".format(index)),))]),))
+
+    # Repeats the Select from two parts earlier
+    return ODict((("Fn::Select", [(index - 1) % 3, ODict((("Fn::GetAZs", "Region{}".format(index - 1)),))]),))
+
+
+def join(parts):
+    return ["", [part(index) for index in range(parts)]]
+
+
+def main():
+    parts = 10
+
+    while parts <= 10000:
+        value = join(parts)
+        # The parts have no Joins of their own, so converting doesn't change them
+        seconds = best_of(lambda: convert_join(value), repeat=3)
+
+        print("{:>6} parts {:>10.2f} ms {:>8.2f} us/part".format(parts, seconds * 1000, seconds * 1e6 / parts))
+
+        parts *= 10
+
+
+if __name__ == "__main__":
+    main()
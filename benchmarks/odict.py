@@ -0,0 +1,35 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Time loading and dumping a template with 10,000 resources
+
+    python benchmarks/odict.py
+"""
+
+from templates import best_of, json_template, report
+import cfn_flip
+from cfn_tools import load_json, load_yaml
+
+
+def main():
+    source = json_template(10000)
+    data = load_json(source)
+    yaml_source = cfn_flip.dump_yaml(data)
+
+    report("load_json", best_of(lambda: load_json(source)))
+    report("load_yaml", best_of(lambda: load_yaml(yaml_source), repeat=3))
+    report("dump_yaml", best_of(lambda: cfn_flip.dump_yaml(data), repeat=3))
+    report("dump_yaml (long form)", best_of(lambda: cfn_flip.dump_yaml(data, long_form=True), repeat=3))
+
+
+if __name__ == "__main__":
+    main()
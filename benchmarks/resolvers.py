@@ -0,0 +1,69 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Load, flip and dump a template made almost entirely of plain scalars, such as words,
+numbers, flags and dates, with PyYAML's implicit resolvers and with the CloudFormation ones
+
+    python benchmarks/resolvers.py
+"""
+
+from templates import best_of, report
+from cfn_tools import load_yaml
+from cfn_tools._config import config
+import cfn_flip
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed egestas est diam".split()
+
+
+def scalar_template(resources=2000):
+    lines = ["AWSTemplateFormatVersion: 2010-09-09", "Resources:"]
+
+    for index in range(resources):
+        lines.extend([
+            "  Function{}:".format(index),
+            "    Type: AWS::Lambda::Function",
+            "    Properties:",
+            "      Description: {} {}".format(WORDS[index % len(WORDS)], WORDS[(index * 7) % len(WORDS)]),
+            "      Runtime: python3.11",
+            "      Handler: index.handler",
+            "      MemorySize: {}".format(128 * (1 + index % 8)),
+            "      Timeout: {}".format(index % 900),
+            "      Enabled: {}".format("true" if index % 2 else "false"),
+            "      Version: 1.{}".format(index),
+            "      Created: 2017-03-{:02}".format(1 + index % 28),
+            "      Tags:",
+            "        - Key: {}".format(WORDS[index % len(WORDS)]),
+            "          Value: {}".format(WORDS[(index * 3) % len(WORDS)]),
+            "        - Key: Owner",
+            "          Value: null",
+        ])
+
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    template = scalar_template()
+
+    for resolvers in ("yaml", "cfn"):
+        config.yaml_resolvers = resolvers
+
+        try:
+            data = load_yaml(template)
+
+            report("load_yaml, {} resolvers".format(resolvers), best_of(lambda: load_yaml(template), repeat=15))
+            report("to_json, {} resolvers".format(resolvers), best_of(lambda: cfn_flip.to_json(template), repeat=15))
+            report("dump_yaml, {} resolvers".format(resolvers), best_of(lambda: cfn_flip.dump_yaml(data), repeat=15))
+        finally:
+            config.reset("yaml_resolvers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Dump a template with 2,000 resources with each YAML writer, with and without the caches
+of scalar styles and analyses, and show how often the caches were hit
+
+    python benchmarks/scalars.py
+"""
+
+from templates import best_of, report, template
+from cfn_flip import YAML_WRITERS, dump_yaml
+from cfn_tools.yaml_dumper import analysis_cache, style_cache
+
+CACHES = (("style", style_cache), ("analysis", analysis_cache))
+
+
+def main():
+    data = template(2000)
+
+    for writer in YAML_WRITERS:
+        for cache in (True, False):
+            for _, scalar_cache in CACHES:
+                scalar_cache.clear()
+                scalar_cache.max_size = 10000 if cache else 0
+                scalar_cache.hits = scalar_cache.misses = scalar_cache.uncached = 0
+
+            seconds = best_of(lambda: dump_yaml(data, writer=writer), repeat=3)
+            report("{} {}".format(writer, "cached" if cache else "uncached"), seconds)
+
+            if cache:
+                for name, scalar_cache in CACHES:
+                    print("  {:<10} hit rate {:>6.1%} of {} lookups, {} uncached".format(
+                        name,
+                        scalar_cache.hit_rate,
+                        scalar_cache.hits + scalar_cache.misses,
+                        scalar_cache.uncached,
+                    ))
+
+
+if __name__ == "__main__":
+    main()
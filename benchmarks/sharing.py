@@ -0,0 +1,141 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Peak memory of loading and flipping 50,000 resource templates, with and without share=True:
+the usual synthetic template, where most of each resource is unique to it, and one whose
+resources carry the same tags, encryption settings and policies, as generated templates often do.
+Each measurement runs in a new interpreter, which reports its peak RSS before and after the work.
+Linux only, since it reads the peak from /proc.
+
+    python benchmarks/sharing.py
+"""
+
+from templates import best_of, json_template, report
+from cfn_tools import dump_json
+from cfn_tools.odict import ODict
+import cfn_flip
+import os
+import subprocess
+import sys
+import tempfile
+
+RESOURCES = 50000
+
+# ru_maxrss carries over from the parent, which holds the templates, so read the high water mark instead
+CODE = """
+import sys
+import cfn_flip
+
+def peak():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+
+with open(sys.argv[1]) as f:
+    template = f.read()
+
+before = peak()
+result = {operation}
+print(before, peak())
+"""
+
+OPERATIONS = (
+    ("load", "cfn_flip.load(template, share={share})"),
+    ("flip", "cfn_flip.flip(template, share={share})"),
+    ("flip, clean_up", "cfn_flip.flip(template, clean_up=True, share={share})"),
+)
+
+
+def tagged_resource(index):
+    return ODict((
+        ("Type", "AWS::S3::Bucket"),
+        ("Properties", ODict((
+            ("BucketName", ODict((("Fn::Sub", "${{AWS::StackName}}-bucket-{}".format(index)),))),
+            ("BucketEncryption", ODict((
+                ("ServerSideEncryptionConfiguration", [
+                    ODict((("ServerSideEncryptionByDefault", ODict((("SSEAlgorithm", "aws:kms"),))),)),
+                ]),
+            ))),
+            ("PublicAccessBlockConfiguration", ODict((
+                ("BlockPublicAcls", True),
+                ("BlockPublicPolicy", True),
+                ("IgnorePublicAcls", True),
+                ("RestrictPublicBuckets", True),
+            ))),
+            ("Tags", [
+                ODict((("Key", "Environment"), ("Value", ODict((("Ref", "Environment"),))))),
+                ODict((("Key", "Team"), ("Value", "storage"))),
+                ODict((("Key", "CostCenter"), ("Value", "{}".format(1000 + index % 10)))),
+            ]),
+        ))),
+        ("DeletionPolicy", "Retain"),
+    ))
+
+
+def tagged_template(resources=RESOURCES):
+    """
+    A template whose resources differ only in their names and one of ten cost centres
+    """
+
+    return dump_json(ODict((
+        ("AWSTemplateFormatVersion", "2010-09-09"),
+        ("Parameters", ODict((
+            ("Environment", ODict((("Type", "String"),))),
+        ))),
+        ("Resources", ODict(
+            ("Bucket{}".format(index), tagged_resource(index))
+            for index in range(resources)
+        )),
+    )))
+
+
+def peak_rss(path, operation, share):
+    """
+    The peak RSS in MB of a new interpreter once it has read the template at path, and once it has run operation
+    """
+
+    code = CODE.format(operation=operation.format(share=share))
+    output = subprocess.check_output([sys.executable, "-c", code, path], universal_newlines=True)
+
+    # VmHWM is in kilobytes
+    return [int(value) / 1024.0 for value in output.split()]
+
+
+def main():
+    templates = [
+        ("synthetic", json_template(RESOURCES)),
+        ("tagged", tagged_template(RESOURCES)),
+    ]
+
+    for name, template in templates:
+        for in_format, text in (("json", template), ("yaml", cfn_flip.to_yaml(template))):
+            with tempfile.NamedTemporaryFile("w", suffix="." + in_format, delete=False) as f:
+                f.write(text)
+
+            try:
+                for operation_name, operation in OPERATIONS:
+                    for share in (False, True):
+                        before, after = peak_rss(f.name, operation, share)
+
+                        print("{:<40} {:>10.1f} MB peak, {:.1f} MB over the template text".format(
+                            "{} {} {}{}".format(operation_name, name, in_format, ", share" if share else ""),
+                            after,
+                            after - before,
+                        ))
+
+                report("load {} {}".format(name, in_format), best_of(lambda: cfn_flip.load(text), repeat=3))
+                report("load {} {}, share".format(name, in_format), best_of(lambda: cfn_flip.load(text, share=True), repeat=3))
+            finally:
+                os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
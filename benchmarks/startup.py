@@ -0,0 +1,55 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Time how long cfn-flip takes to start, using python -X importtime to see what each command imports
+
+    python benchmarks/startup.py
+"""
+
+from importtime import import_times
+from templates import best_of, report
+import subprocess
+import sys
+
+COMMANDS = (
+    ("import cfn_flip", "import cfn_flip"),
+    ("cfn-flip --version", "from cfn_flip.main import main; main(['--version'])"),
+    ("cfn-flip --help", "from cfn_flip.main import main; main(['--help'])"),
+    ("flip JSON to JSON", "import cfn_flip; cfn_flip.flip('{\"A\": 1}', out_format='json', no_flip=True)"),
+    ("flip JSON to YAML", "import cfn_flip; cfn_flip.flip('{\"A\": 1}', out_format='yaml')"),
+)
+
+# Modules whose import is worth pointing out
+HEAVY_MODULES = ("yaml", "cfn_flip.yaml_dumper", "cfn_flip.yaml_writer", "click", "multiprocessing")
+
+
+def run(code):
+    subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    for name, code in COMMANDS:
+        report(name, best_of(lambda: run(code)))
+
+        times = import_times(code)
+        heavy = [module for module in HEAVY_MODULES if module in times]
+
+        print("{:<40} {:>10.1f} ms importing cfn_flip, {} modules, heavy: {}".format(
+            "",
+            times.get("cfn_flip", 0) / 1000.0,
+            len(times),
+            ", ".join(heavy) or "none",
+        ))
+
+
+if __name__ == "__main__":
+    main()
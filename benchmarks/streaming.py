@@ -0,0 +1,138 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Dumping a 20,000 resource template as a whole string and then writing it, as the CLI used to,
+against writing it to the stream as it's made: how long until the first write, how long in all,
+and the peak memory of a new interpreter flipping the template into /dev/null either way.
+Linux only, since it reads the peak from /proc.
+
+    python benchmarks/streaming.py
+"""
+
+from templates import best_of, json_template, report, template
+from cfn_flip import dump_yaml
+from cfn_tools import dump_json
+import cfn_flip
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+RESOURCES = 20000
+
+CODE = """
+import os
+import sys
+import cfn_flip
+
+def peak():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+
+with open(sys.argv[1]) as f:
+    template = f.read()
+
+before = peak()
+
+with open(os.devnull, "w") as output:
+    {operation}
+
+print(before, peak())
+"""
+
+OPERATIONS = (
+    ("whole string", "output.write(cfn_flip.flip(template))"),
+    ("stream", "cfn_flip.flip(template, stream=output)"),
+)
+
+
+class FirstWrite(object):
+    """
+    Writes to /dev/null, noting when the first write came
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.first = None
+
+    def write(self, text):
+        if self.first is None:
+            self.first = timeit.default_timer()
+
+        self.output.write(text)
+
+
+def first_write(function):
+    """
+    Seconds until function first writes to its stream, best of three
+    """
+
+    times = []
+
+    with open(os.devnull, "w") as output:
+        for _ in range(3):
+            stream = FirstWrite(output)
+            start = timeit.default_timer()
+            function(stream)
+            times.append(stream.first - start)
+
+    return min(times)
+
+
+def peak_rss(path, operation):
+    """
+    The peak RSS in MB of a new interpreter once it has read the template at path, and once it has run operation
+    """
+
+    output = subprocess.check_output([sys.executable, "-c", CODE.format(operation=operation), path],
+                                     universal_newlines=True)
+
+    # VmHWM is in kilobytes
+    return [int(value) / 1024.0 for value in output.split()]
+
+
+def main():
+    data = template(RESOURCES)
+
+    for name, dump in (
+        ("dump_json", lambda stream: stream.write(dump_json(data))),
+        ("dump_json, stream", lambda stream: dump_json(data, stream)),
+        ("dump_yaml", lambda stream: stream.write(dump_yaml(data))),
+        ("dump_yaml, stream", lambda stream: dump_yaml(data, stream=stream)),
+    ):
+        with open(os.devnull, "w") as output:
+            report(name, best_of(lambda: dump(output), repeat=3))
+
+        report(name + ", first write", first_write(dump))
+
+    source = json_template(RESOURCES)
+
+    for in_format, text in (("json", source), ("yaml", cfn_flip.to_yaml(source))):
+        with tempfile.NamedTemporaryFile("w", suffix="." + in_format, delete=False) as f:
+            f.write(text)
+
+        try:
+            for operation_name, operation in OPERATIONS:
+                before, after = peak_rss(f.name, operation)
+
+                print("{:<40} {:>10.1f} MB peak, {:.1f} MB over the template text".format(
+                    "flip {}, {}".format(in_format, operation_name),
+                    after,
+                    after - before,
+                ))
+        finally:
+            os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Load and transform a template with 10,000 resources and no Fn::Join, doing every pass
+as before and skipping the passes its Summary says can't change anything. Dumping the
+output is the same either way, so it's left out.
+
+    python benchmarks/summary.py
+"""
+
+from templates import best_of, json_template, report
+from cfn_clean import needs_clean, needs_literal, transform
+from cfn_flip import load
+from cfn_tools import Summary
+import cfn_flip
+
+
+def every_pass(template, clean_up, literal):
+    data, _ = load(template)
+
+    return transform(data, clean_up, literal)
+
+
+def skipping(template, clean_up, literal):
+    """
+    What to_yaml and to_json do before dumping the data
+    """
+
+    summary = Summary(count=False)
+    data, _ = load(template, summary=summary)
+
+    return transform(data, clean_up and needs_clean(summary), literal and needs_literal(summary))
+
+
+def main():
+    json_text = json_template(10000, joins=False)
+    yaml_text = cfn_flip.to_yaml(json_text)
+
+    conversions = (
+        ("to_yaml", json_text, False, True),
+        ("to_yaml clean_up", json_text, True, True),
+        ("to_json clean_up", yaml_text, True, False),
+    )
+
+    for name, template, clean_up, literal in conversions:
+        report("{}, every pass".format(name), best_of(lambda: every_pass(template, clean_up, literal), repeat=7))
+        report("{}, passes skipped".format(name), best_of(lambda: skipping(template, clean_up, literal), repeat=7))
+
+
+if __name__ == "__main__":
+    main()
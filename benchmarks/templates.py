@@ -0,0 +1,75 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Synthetic templates and timing helpers shared by the benchmarks
+"""
+
+from cfn_tools import dump_json
+from cfn_tools.odict import ODict
+import timeit
+
+
+def resource(index, joins=True):
+    if joins:
+        name = ODict((
+            ("Fn::Join", ["-", [ODict((("Ref", "AWS::StackName"),)), "bucket", str(index)]]),
+        ))
+    else:
+        name = ODict((
+            ("Fn::Sub", "${{AWS::StackName}}-bucket-{}".format(index)),
+        ))
+
+    return ODict((
+        ("Type", "AWS::S3::Bucket"),
+        ("Properties", ODict((
+            ("BucketName", name),
+            ("Tags", [
+                ODict((("Key", "Name"), ("Value", "bucket-{}".format(index)))),
+                ODict((("Key", "Owner"), ("Value", ODict((("Ref", "Owner"),))))),
+            ]),
+            ("AccountId", "0123456789{:02}".format(index % 100)),
+        ))),
+    ))
+
+
+def template(resources=10000, joins=True):
+    """
+    A template with some parameters and many similar resources,
+    whose names are made with Fn::Join or, without joins, with Fn::Sub
+    """
+
+    return ODict((
+        ("AWSTemplateFormatVersion", "2010-09-09"),
+        ("Parameters", ODict((
+            ("Owner", ODict((("Type", "String"),))),
+        ))),
+        ("Resources", ODict(
+            ("Bucket{}".format(index), resource(index, joins))
+            for index in range(resources)
+        )),
+    ))
+
+
+def json_template(resources=10000, joins=True):
+    return dump_json(template(resources, joins))
+
+
+def best_of(function, repeat=5):
+    """
+    The fastest of several runs of function, in seconds
+    """
+
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def report(name, seconds):
+    print("{:<40} {:>10.1f} ms".format(name, seconds * 1000))
@@ -13,16 +13,57 @@ See the License for the specific language governing permissions and limitations
 
 from cfn_tools.odict import ODict
 from cfn_tools.literal import LiteralString
+from cfn_tools.sharing import SharedList, SharedODict, thaw, thaw_all, unchanged
 from collections.abc import KeysView
 
 import json
 import six
 
+# Stands for a resource's Type on literal_steps' stack
+TYPE = object()
+
+# Nesting beyond which the functions below stop recursing and keep a stack of their own,
+# which is slower but has no limit
+MAX_DEPTH = 100
+
+# Kinds of frame on the stacks of clean_iteratively and cfn_literal_parser_iteratively
+MAPPING = "mapping"
+SEQUENCE = "sequence"
+JOIN = "join"
+
+# No result yet
+NOTHING = object()
+
 UNCONVERTED_KEYS = [
     # Resource Type, String Attribute to keep Json
     ("AWS::StepFunctions::StateMachine", "DefinitionString")
 ]
 
+NO_VALUE = "AWS::NoValue"
+
+# Levels of a Join part that go into its hash
+CANONICAL_DEPTH = 8
+
+# Resource types with properties that cfn_literal_parser keeps as JSON
+LITERAL_TYPES = frozenset(item[0] for item in UNCONVERTED_KEYS)
+
+
+def needs_clean(summary):
+    """
+    Could clean change a template with this Summary?
+    It only rewrites Fn::Join, besides copying lists that YAML aliases share
+    """
+
+    return summary.aliases or "Fn::Join" in summary.functions
+
+
+def needs_literal(summary):
+    """
+    Could cfn_literal_parser change a template with this Summary?
+    """
+
+    return summary.aliases or not LITERAL_TYPES.isdisjoint(summary.resource_types)
+
 
 def has_intrinsic_functions(parameter):
     intrinsic_functions = ["Fn::Sub", "!Sub", "!GetAtt"]
@@ -35,11 +76,122 @@ def has_intrinsic_functions(parameter):
     return result
 
 
-def convert_join(value):
+def canonical(value, depth=CANONICAL_DEPTH):
+    """
+    A hashable stand-in for value that is equal for any two equal values,
+    whatever the order of their keys
+
+    Below depth levels only the keys or length are kept, so that hashing a deeply
+    nested part costs no more than hashing a shallow one.
+    """
+
+    if isinstance(value, dict):
+        if depth <= 0:
+            return frozenset(value)
+
+        return frozenset((key, canonical(item, depth - 1)) for key, item in value.items())
+
+    if isinstance(value, (list, tuple)):
+        if depth <= 0:
+            return len(value)
+
+        return tuple(canonical(item, depth - 1) for item in value)
+
+    return value
+
+
+def canonical_hash(value):
+    """
+    The hash of value's canonical form, or None if it has no hash
+    """
+
+    try:
+        return hash(canonical(value))
+    except TypeError:
+        return None
+
+
+def mentions_no_value(value):
+    """
+    Does str(value) mention AWS::NoValue?
+    Looks through the strings in value rather than building the whole text
+    """
+
+    stack = [value]
+    seen = set()
+
+    while stack:
+        item = stack.pop()
+
+        if isinstance(item, six.string_types):
+            if NO_VALUE in item:
+                return True
+
+        elif isinstance(item, (dict, list, tuple)):
+            # Aliases can make the same container appear more than once, or inside itself
+            if id(item) in seen:
+                continue
+
+            seen.add(id(item))
+
+            if isinstance(item, dict):
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            else:
+                stack.extend(item)
+
+        elif isinstance(item, bytes):
+            if NO_VALUE.encode("ascii") in item:
+                return True
+
+        elif item is not None and not isinstance(item, (int, float)):
+            if NO_VALUE in str(item):
+                return True
+
+    return False
+
+
+def convert_join(value, depth=0):
     """
     Fix a Join ;)
     """
 
+    steps = join_steps(value)
+
+    try:
+        part = next(steps)
+
+        while True:
+            part = steps.send(clean(part, depth + 1))
+    except StopIteration as e:
+        return e.value
+
+
+def refused(value):
+    """
+    The Join convert_join won't convert, as cleaning its parts left it
+
+    Cleaning changes mappings in place, so the parts cleaned before it gave up stay cleaned.
+    Shared parts were copied instead, so their copies are lost; the Join is then thawed and
+    its parts cleaned again to make the same changes.
+    """
+
+    value, thawed = thaw_all(value)
+
+    if thawed:
+        convert_join(value)
+
+    return {
+        "Fn::Join": value,
+    }
+
+
+def join_steps(value):
+    """
+    convert_join, yielding each part to have it cleaned before it's used,
+    so that Joins inside Joins don't need to recurse
+    """
+
     if not isinstance(value, list) or len(value) != 2:
         # Cowardly refuse
         return value
@@ -60,8 +212,16 @@ def convert_join(value):
     args = ODict()
     new_parts = []
 
+    # The names of the args in order, and their positions by the hash of their canonical form
+    names = []
+    index = {}
+    unhashable = []
+
+    # The position of the first arg that is a conditional that can evaluate to AWS::NoValue
+    no_value = None
+
     for part in parts:
-        part = clean(part)
+        part = yield part
 
         if isinstance(part, dict):
             plain_string = False
@@ -72,20 +232,45 @@ def convert_join(value):
                 params = part["Fn::GetAtt"]
                 new_parts.append("${{{}}}".format(".".join(params)))
             else:
-                for key, val in args.items():
-                    # we want to bail if a conditional can evaluate to AWS::NoValue
-                    if isinstance(val, dict):
-                        if "Fn::If" in val and "AWS::NoValue" in str(val["Fn::If"]):
-                            return {
-                                "Fn::Join": value,
-                            }
-
-                    if val == part:
-                        param_name = key
-                        break
+                digest = canonical_hash(part)
+
+                if digest is None:
+                    candidates = range(len(names))
+                elif unhashable:
+                    candidates = sorted(index.get(digest, []) + unhashable)
                 else:
+                    candidates = index.get(digest, ())
+
+                # Only args before the first conditional that can be AWS::NoValue can be reused
+                found = None
+
+                for position in candidates:
+                    if no_value is not None and position >= no_value:
+                        break
+
+                    if args[names[position]] == part:
+                        found = position
+                        break
+
+                if found is None and no_value is not None:
+                    # we want to bail if a conditional can evaluate to AWS::NoValue
+                    return refused(value)
+
+                if found is None:
+                    position = len(names)
                     param_name = "Param{}".format(len(args) + 1)
                     args[param_name] = part
+                    names.append(param_name)
+
+                    if digest is None:
+                        unhashable.append(position)
+                    else:
+                        index.setdefault(digest, []).append(position)
+
+                    if "Fn::If" in part and mentions_no_value(part["Fn::If"]):
+                        no_value = position
+                else:
+                    param_name = names[found]
 
                 new_parts.append("${{{}}}".format(param_name))
 
@@ -94,9 +279,7 @@ def convert_join(value):
 
         else:
             # Doing something weird; refuse
-            return {
-                "Fn::Join": value
-            }
+            return refused(value)
 
     source = sep.join(new_parts)
 
@@ -113,53 +296,403 @@ def convert_join(value):
     ))
 
 
-def clean(source):
+def clean(source, depth=0):
     """
     Clean up the source:
     * Replace use of Fn::Join with Fn::Sub
     * Keep json body for specific resource properties
+
+    Shared mappings and lists are copied rather than changed, and only if something in them changes.
     """
 
+    if depth >= MAX_DEPTH:
+        return clean_iteratively(source)
+
     if isinstance(source, dict):
+        result = source
+
         for key, value in source.items():
             if key == "Fn::Join":
-                return convert_join(value)
+                return convert_join(value, depth)
 
             else:
-                source[key] = clean(value)
+                cleaned = clean(value, depth + 1)
+
+                if cleaned is not value:
+                    result = thaw(result)
+                    result[key] = cleaned
+
+        return result
 
     elif isinstance(source, list):
-        return [clean(item) for item in source]
+        return unchanged(source, [clean(item, depth + 1) for item in source])
 
     return source
 
 
-def cfn_literal_parser(source):
+def clean_iteratively(source):
+    """
+    clean, working through the source with a stack rather than recursing,
+    so there's no limit to how deeply it can be nested
+    """
+
+    stack = []
+    value = source
+
+    while True:
+        # Start on value: dicts and lists get a frame and anything else is already clean
+        if isinstance(value, dict):
+            stack.append([MAPPING, value, iter(value.items()), None])
+            result = NOTHING
+        elif isinstance(value, list):
+            stack.append([SEQUENCE, iter(value), [], value])
+            result = NOTHING
+        else:
+            result = value
+
+        # Hand the result up the stack until a frame needs another value cleaned
+        value = NOTHING
+
+        while value is NOTHING:
+            if not stack:
+                return result
+
+            frame = stack[-1]
+            kind = frame[0]
+
+            if kind is MAPPING:
+                mapping = frame[1]
+
+                if result is not NOTHING and result is not mapping[frame[3]]:
+                    mapping = frame[1] = thaw(mapping)
+                    mapping[frame[3]] = result
+
+                for key, item in frame[2]:
+                    if key == "Fn::Join":
+                        # The mapping is replaced by the converted Join
+                        frame[:] = [JOIN, join_steps(item)]
+                        result = NOTHING
+                        break
+
+                    if isinstance(item, (dict, list)):
+                        frame[3] = key
+                        value = item
+                        break
+                else:
+                    stack.pop()
+                    result = mapping
+
+            elif kind is SEQUENCE:
+                cleaned = frame[2]
+
+                if result is not NOTHING:
+                    cleaned.append(result)
+
+                for item in frame[1]:
+                    if isinstance(item, (dict, list)):
+                        value = item
+                        break
+
+                    cleaned.append(item)
+                else:
+                    stack.pop()
+                    result = unchanged(frame[3], cleaned)
+
+            else:
+                # Clean the next part of a Join
+                try:
+                    value = next(frame[1]) if result is NOTHING else frame[1].send(result)
+                except StopIteration as e:
+                    stack.pop()
+                    result = e.value
+
+
+def clean_steps(source):
+    """
+    clean, yielding after each dict or list so that it can be done a bit at a time
+
+    Slower than clean, so only used where that matters. Walks the source with a stack of
+    (container, key) whose value is a dict or list still to be cleaned, visiting them in the
+    same order as a recursive walk would. Like lists, shared mappings are copied on the way.
+    Returns the cleaned source.
+    """
+
+    root = [source]
+    stack = [(root, 0)]
+
+    while stack:
+        container, key = stack.pop()
+        value = container[key]
+
+        if isinstance(value, dict):
+            if "Fn::Join" in value:
+                container[key] = convert_join(value["Fn::Join"])
+                yield
+                continue
+
+            value = container[key] = thaw(value)
+            children = [(value, child) for child, item in value.items() if isinstance(item, (dict, list))]
+        else:
+            value = container[key] = list(value)
+            children = [(value, index) for index, item in enumerate(value) if isinstance(item, (dict, list))]
+
+        children.reverse()
+        stack.extend(children)
+
+        yield
+
+    return root[0]
+
+
+def keep_literal(source):
+    """
+    Turn the properties listed in UNCONVERTED_KEYS of a resource into literal JSON strings
+    Returns the resource, which is a copy if it was shared and had to change
+    """
+
+    value = source["Type"]
+
+    for item in UNCONVERTED_KEYS:
+        if value == item[0]:
+            # Checking if this resource has "Properties" and the property literal to maintain
+            # Better check than just try/except KeyError :-)
+            if source.get("Properties") and source.get("Properties", {}).get(item[1]):
+                if isinstance(source["Properties"][item[1]], dict) and \
+                        not has_intrinsic_functions(source["Properties"][item[1]].keys()):
+                    literal = LiteralString(u"{}".format(json.dumps(
+                        source["Properties"][item[1]],
+                        indent=2,
+                        separators=(',', ': '))
+                    ))
+
+                    source = thaw(source)
+                    properties = source["Properties"] = thaw(source["Properties"])
+                    properties[item[1]] = literal
+
+    return source
+
+
+def cfn_literal_parser(source, depth=0):
     """
     Sanitize the source:
     * Keep json body for specific resource properties
     """
 
+    if depth >= MAX_DEPTH:
+        return cfn_literal_parser_iteratively(source)
+
     if isinstance(source, dict):
-        for key, value in source.items():
+        result = source
+
+        for key in source:
             if key == "Type":
-                for item in UNCONVERTED_KEYS:
-                    if value == item[0]:
-                        # Checking if this resource has "Properties" and the property literal to maintain
-                        # Better check than just try/except KeyError :-)
-                        if source.get("Properties") and source.get("Properties", {}).get(item[1]):
-                            if isinstance(source["Properties"][item[1]], dict) and \
-                                    not has_intrinsic_functions(source["Properties"][item[1]].keys()):
-                                source["Properties"][item[1]] = LiteralString(u"{}".format(json.dumps(
-                                    source["Properties"][item[1]],
-                                    indent=2,
-                                    separators=(',', ': '))
-                                ))
+                result = keep_literal(result)
 
             else:
-                source[key] = cfn_literal_parser(value)
+                # keep_literal may have replaced the value already
+                value = result[key]
+                sanitized = cfn_literal_parser(value, depth + 1)
+
+                if sanitized is not value:
+                    result = thaw(result)
+                    result[key] = sanitized
+
+        return result
 
     elif isinstance(source, list):
-        return [cfn_literal_parser(item) for item in source]
+        return unchanged(source, [cfn_literal_parser(item, depth + 1) for item in source])
 
     return source
+
+
+def cfn_literal_parser_iteratively(source):
+    """
+    cfn_literal_parser, working through the source with a stack rather than recursing
+    """
+
+    stack = []
+    value = source
+
+    while True:
+        if isinstance(value, dict):
+            stack.append([MAPPING, value, iter(list(value)), None])
+            result = NOTHING
+        elif isinstance(value, list):
+            stack.append([SEQUENCE, iter(value), [], value])
+            result = NOTHING
+        else:
+            result = value
+
+        value = NOTHING
+
+        while value is NOTHING:
+            if not stack:
+                return result
+
+            frame = stack[-1]
+
+            if frame[0] is MAPPING:
+                mapping = frame[1]
+
+                if result is not NOTHING and result is not mapping[frame[3]]:
+                    mapping = frame[1] = thaw(mapping)
+                    mapping[frame[3]] = result
+
+                for key in frame[2]:
+                    if key == "Type":
+                        mapping = frame[1] = keep_literal(mapping)
+                        continue
+
+                    # keep_literal may have replaced the value already
+                    item = mapping[key]
+
+                    if isinstance(item, (dict, list)):
+                        frame[3] = key
+                        value = item
+                        break
+                else:
+                    stack.pop()
+                    result = mapping
+
+            else:
+                sanitized = frame[2]
+
+                if result is not NOTHING:
+                    sanitized.append(result)
+
+                for item in frame[1]:
+                    if isinstance(item, (dict, list)):
+                        value = item
+                        break
+
+                    sanitized.append(item)
+                else:
+                    stack.pop()
+                    result = unchanged(frame[3], sanitized)
+
+
+def transform(source, clean_up=True, literal=True):
+    """
+    clean and/or cfn_literal_parser, walking the source only once when both are wanted
+    """
+
+    if clean_up and literal:
+        return visit_other(source, 0)
+
+    if clean_up:
+        return clean(source)
+
+    if literal:
+        return cfn_literal_parser(source)
+
+    return source
+
+
+def visit_other(source, depth):
+    """
+    Clean and sanitize something whose type isn't in VISITORS
+    """
+
+    if isinstance(source, dict):
+        return visit_mapping(source, depth)
+
+    if isinstance(source, list):
+        return visit_sequence(source, depth)
+
+    return source
+
+
+def visit_mapping(source, depth):
+    # Joins and resources with literal properties are rare enough to be done the long way,
+    # which keeps their output identical to clean followed by cfn_literal_parser.
+    # So is a Type that clean might change, and anything nested too deeply to recurse into.
+    if "Fn::Join" in source or depth >= MAX_DEPTH:
+        return cfn_literal_parser(clean(source, depth), depth)
+
+    resource_type = source.get("Type")
+
+    if isinstance(resource_type, (dict, list)) or resource_type in LITERAL_TYPES:
+        return cfn_literal_parser(clean(source, depth), depth)
+
+    result = source
+
+    for key, value in source.items():
+        visit = VISITORS.get(type(value), visit_other)
+
+        if visit is not None:
+            visited = visit(value, depth + 1)
+
+            if visited is not value:
+                result = thaw(result)
+                result[key] = visited
+
+    return result
+
+
+def visit_sequence(source, depth):
+    if depth >= MAX_DEPTH:
+        return cfn_literal_parser(clean(source, depth), depth)
+
+    result = []
+
+    for item in source:
+        visit = VISITORS.get(type(item), visit_other)
+        result.append(item if visit is None else visit(item, depth + 1))
+
+    return unchanged(source, result)
+
+
+# How transform handles each type of value, rather than a chain of isinstance checks;
+# None for scalars, which are left as they are
+VISITORS = {
+    dict: visit_mapping,
+    ODict: visit_mapping,
+    SharedODict: visit_mapping,
+    list: visit_sequence,
+    SharedList: visit_sequence,
+    six.text_type: None,
+    LiteralString: None,
+    int: None,
+    float: None,
+    bool: None,
+    type(None): None,
+}
+
+
+def literal_steps(source):
+    """
+    cfn_literal_parser, yielding after each dict or list so that it can be done a bit at a time
+    Like lists, shared mappings are copied on the way.
+    Returns the sanitized source.
+    """
+
+    root = [source]
+    stack = [(root, 0)]
+
+    while stack:
+        container, key = stack.pop()
+
+        if key is TYPE:
+            # Checked when a recursive walk would get to the Type key; the container was copied already if shared
+            keep_literal(container)
+            continue
+
+        value = container[key]
+
+        if isinstance(value, dict):
+            value = container[key] = thaw(value)
+            children = [
+                (value, TYPE if child == "Type" else child)
+                for child, item in value.items()
+                if child == "Type" or isinstance(item, (dict, list))
+            ]
+        else:
+            value = container[key] = list(value)
+            children = [(value, index) for index, item in enumerate(value) if isinstance(item, (dict, list))]
+
+        children.reverse()
+        stack.extend(children)
+
+        yield
+
+    return root[0]
@@ -11,10 +11,10 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and limitations under the License.
 """
 
-from cfn_tools.yaml_dumper import CfnYamlDumper
+from cfn_tools.yaml_dumper import CfnCYamlDumper, CfnYamlDumper
 
 
-class CleanCfnYamlDumper(CfnYamlDumper):
+class CleanRepresenter(object):
     """
     Format multi-line strings with |
     """
@@ -23,4 +23,19 @@ class CleanCfnYamlDumper(CfnYamlDumper):
         if "\n" in value:
             style = "|"
 
-        return super(CleanCfnYamlDumper, self).represent_scalar(tag, value, style)
+        return super(CleanRepresenter, self).represent_scalar(tag, value, style)
+
+
+class CleanCfnYamlDumper(CleanRepresenter, CfnYamlDumper):
+    """
+    Format multi-line strings with |
+    """
+
+
+if CfnCYamlDumper is not None:
+    class CleanCfnCYamlDumper(CleanRepresenter, CfnCYamlDumper):
+        """
+        libyaml-backed equivalent of CleanCfnYamlDumper
+        """
+else:
+    CleanCfnCYamlDumper = None
@@ -11,36 +11,200 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and limitations under the License.
 """
 
-from .yaml_dumper import get_dumper
-from cfn_clean import clean, cfn_literal_parser
-from cfn_tools import load_json, load_yaml, dump_json
+from cfn_clean import clean, cfn_literal_parser, needs_clean, needs_literal, transform  # noqa: F401 cfn_literal_parser is part of the API
+from cfn_tools import Summary, load_json, load_yaml, dump_json, summarize
 from cfn_tools._config import config
-import yaml
+from cfn_tools._lazy import lazy_attributes
+import os
+import re
+import six
 
+# The YAML side, with its dumpers and representers, is only imported when it's needed
+lazy_attributes(globals(), {
+    "Cache": ".cache",
+    "MemoryCache": ".cache",
+    "flip_many": ".batch",
+    "AsyncExecutor": ".asynchronous",
+    "flip_async": ".asynchronous",
+    "to_json_async": ".asynchronous",
+    "to_yaml_async": ".asynchronous",
+    "Conversion": ".incremental",
+    "get_dumper": ".yaml_dumper",
+    "stream_json_to_yaml": ".json_to_yaml",
+    "write_yaml": ".yaml_writer",
+    "dump_with_libyaml": "cfn_tools.yaml_dumper",
+    "stream_yaml_to_json": "cfn_tools.yaml_to_json",
+})
 
-def load(template):
+# The first character that isn't whitespace or a byte order mark
+FIRST_CHAR = re.compile(r"[^\s\ufeff]")
+JSON_KEYWORD = re.compile(r"(?:true|false|null|NaN|Infinity)\s*\Z")
+YAML_SEQUENCE_ENTRY = re.compile(r"-(?:\s|\Z)")
+
+
+def sniff_format(template):
+    """
+    Guess the format from the first few characters of the template
+    Returns the format and whether the guess is certain
+    """
+
+    if not isinstance(template, six.text_type):
+        from cfn_tools.buffers import head
+
+        template = head(template)
+
+    match = FIRST_CHAR.search(template)
+
+    if not match:
+        return "json", False
+
+    start = match.start()
+    char = template[start]
+
+    if char in "{[\"" or char.isdigit():
+        # Could be YAML flow style or a YAML scalar
+        return "json", False
+
+    if char == "-":
+        if YAML_SEQUENCE_ENTRY.match(template, start):
+            return "yaml", True
+
+        if template.startswith("---", start):
+            return "yaml", True
+
+        return "json", False
+
+    if char in "tfnNI" and JSON_KEYWORD.match(template, start):
+        return "json", False
+
+    # Comments, directives, plain keys...
+    return "yaml", True
+
+
+def from_path(function, path, *args):
+    """
+    function called with the contents of the template file at path, memory-mapped if it's big
+    """
+
+    from cfn_tools.buffers import TemplateFile
+
+    with TemplateFile(path) as template:
+        return function(template, *args)
+
+
+def load(template, cache=None, summary=None, share=False):
     """
     Try to guess the input format
+    The template may be text, a buffer such as bytes or a memoryview, or the path of a template file
+    If a MemoryCache is given, the result is looked up there before parsing
+    If a Summary is given, what's loaded is recorded in it
+    With share=True, scalars are interned and identical mappings and lists are shared
     """
 
+    # Found out before reading anything, rather than when the result is stored
+    if cache is not None and cache.text_only:
+        raise TypeError("{} can only store text, load needs a MemoryCache".format(type(cache).__name__))
+
+    if isinstance(template, os.PathLike):
+        return from_path(load, template, cache, summary, share)
+
+    if cache is not None:
+        data, in_format = cache.convert(load, template, share=share)
+
+        if summary is not None:
+            summarize(data, summary)
+
+        return data, in_format
+
+    in_format, certain = sniff_format(template)
+
+    if in_format == "yaml" and certain:
+        try:
+            data = load_yaml(template, summary, share)
+            return data, "yaml"
+        except Exception:
+            # Report the JSON error as we would have before sniffing
+            if summary is not None:
+                summary.clear()
+
     try:
-        data = load_json(template)
+        data = load_json(template, summary, share)
         return data, "json"
     except ValueError as e:
+        if in_format == "yaml" and certain:
+            raise
+
+        if summary is not None:
+            summary.clear()
+
         try:
-            data = load_yaml(template)
+            data = load_yaml(template, summary, share)
             return data, "yaml"
         except Exception:
             raise e
 
 
-def dump_yaml(data, clean_up=False, long_form=False):
+YAML_WRITERS = ("direct", "libyaml", "pyyaml")
+
+
+def dump_yaml(data, clean_up=False, long_form=False, writer="direct", stream=None):
     """
     Output some YAML
+
+    writer picks how the text is produced: "direct" walks the data once with YamlWriter,
+    "libyaml" uses the libyaml-backed dumpers and "pyyaml" the pure-Python dumpers.
+    All three produce the same output; the first two fall back to the pure-Python
+    dumpers for anything they can't reproduce exactly.
+
+    If a stream is given, the YAML is written there instead of returned. The direct writer
+    and the pure-Python dumpers write it as they go; libyaml's output has to be checked whole first.
     """
 
+    if writer not in YAML_WRITERS:
+        raise ValueError("Unknown YAML writer {!r}, expected one of {}".format(writer, ", ".join(YAML_WRITERS)))
+
+    from .yaml_dumper import get_dumper
+    from .yaml_writer import Remainder, stream_yaml, write_yaml
+    from cfn_tools.yaml_dumper import dump_with_libyaml
+    import yaml
+
+    if writer == "direct":
+        if stream is None:
+            output = write_yaml(data, clean_up, long_form, width=config.max_col_width)
+
+            if output is not None:
+                return output
+        else:
+            written = stream_yaml(data, stream, clean_up, long_form, width=config.max_col_width)
+
+            if written is None:
+                return None
+
+            if written:
+                # The dumper writes the same text up to there
+                stream = Remainder(stream, written)
+
+    dumper = get_dumper(clean_up, long_form, libyaml=True) if writer == "libyaml" else None
+
+    if dumper is not None:
+        output = dump_with_libyaml(
+            data,
+            dumper,
+            default_flow_style=False,
+            allow_unicode=True,
+            width=config.max_col_width
+        )
+
+        if output is not None:
+            if stream is None:
+                return output
+
+            stream.write(output)
+            return None
+
     return yaml.dump(
         data,
+        stream,
         Dumper=get_dumper(clean_up, long_form),
         default_flow_style=False,
         allow_unicode=True,
@@ -48,38 +212,100 @@ def dump_yaml(data, clean_up=False, long_form=False):
     )
 
 
-def to_json(template, clean_up=False):
+def written(output, stream):
+    """
+    output, or None once it's written to stream if one is given
+    """
+
+    if stream is None:
+        return output
+
+    stream.write(output)
+
+
+def to_json(template, clean_up=False, cache=None, share=False, stream=None):
     """
     Assume the input is YAML and convert to JSON
+    If a Cache is given, the result is looked up there before converting
+    With share=True, the template is loaded as load does with it, to use less memory
+    If a stream is given, the JSON is written there as it's made and None is returned
     """
 
-    data, _ = load(template)
+    if isinstance(template, os.PathLike):
+        return from_path(to_json, template, clean_up, cache, share, stream)
 
-    if clean_up:
+    if cache is not None:
+        return written(cache.convert(to_json, template, clean_up=clean_up, share=share), stream)
+
+    summary = Summary(count=False) if clean_up else None
+    data, _ = load(template, summary=summary, share=share)
+
+    # Only clean up if it could change something
+    if clean_up and needs_clean(summary):
         data = clean(data)
 
-    return dump_json(data)
+    return dump_json(data, stream)
+
+
+def to_json_stream(template, output):
+    """
+    Assume the input is YAML and write it to output as JSON
+    without building the whole template in memory
+    """
+
+    from cfn_tools.yaml_to_json import stream_yaml_to_json
 
+    stream_yaml_to_json(template, output)
 
-def to_yaml(template, clean_up=False, long_form=False, literal=True):
+
+def to_yaml(template, clean_up=False, long_form=False, literal=True, cache=None, share=False, stream=None):
     """
     Assume the input is JSON and convert to YAML
+    If a Cache is given, the result is looked up there before converting
+    With share=True, the template is loaded as load does with it, to use less memory
+    If a stream is given, the YAML is written there as it's made and None is returned
     """
 
-    data, _ = load(template)
+    if isinstance(template, os.PathLike):
+        return from_path(to_yaml, template, clean_up, long_form, literal, cache, share, stream)
 
-    if clean_up:
-        data = clean(data)
+    if cache is not None:
+        output = cache.convert(to_yaml, template, clean_up=clean_up, long_form=long_form, literal=literal, share=share)
+
+        return written(output, stream)
+
+    # Only do the passes that could change something
+    summary = Summary(count=False) if clean_up or literal else None
+    data, _ = load(template, summary=summary, share=share)
 
-    if literal:
-        data = cfn_literal_parser(data)
+    if summary is not None:
+        data = transform(data, clean_up and needs_clean(summary), literal and needs_literal(summary))
 
-    return dump_yaml(data, clean_up, long_form)
+    return dump_yaml(data, clean_up, long_form, stream=stream)
 
 
-def flip(template, in_format=None, out_format=None, clean_up=False, no_flip=False, long_form=False):
+def to_yaml_stream(template, output, long_form=False):
     """
-    Figure out the input format and convert the data to the opposing output format
+    Assume the input is JSON and write it to output as YAML
+    without building the whole template in memory
+    """
+
+    from .json_to_yaml import stream_json_to_yaml
+    from .yaml_dumper import get_dumper
+
+    stream_json_to_yaml(
+        template,
+        output,
+        get_dumper(long_form=long_form),
+        default_flow_style=False,
+        allow_unicode=True,
+        width=config.max_col_width
+    )
+
+
+def choose_in_format(in_format, out_format, no_flip):
+    """
+    The format flip should load the template as, or None if it has to be guessed
     """
 
     # Do we need to figure out the input format?
@@ -90,27 +316,82 @@ def flip(template, in_format=None, out_format=None, clean_up=False, no_flip=Fals
         elif (out_format == "yaml" and no_flip) or (out_format == "json" and not no_flip):
             in_format = "yaml"
 
-    # Load the data
-    if in_format == "json":
-        data = load_json(template)
-    elif in_format == "yaml":
-        data = load_yaml(template)
-    else:
-        data, in_format = load(template)
+    return in_format
 
-    # Clean up?
-    if clean_up:
-        data = clean(data)
 
-    # Figure out the output format
+def choose_out_format(in_format, out_format, no_flip):
+    """
+    The format flip should write, once it knows the input format
+    """
+
     if not out_format:
         if (in_format == "json" and no_flip) or (in_format == "yaml" and not no_flip):
             out_format = "json"
         else:
             out_format = "yaml"
 
+    return out_format
+
+
+def flip(template, in_format=None, out_format=None, clean_up=False, no_flip=False, long_form=False, cache=None,
+         share=False, stream=None):
+    """
+    Figure out the input format and convert the data to the opposing output format
+    The template may be text, a buffer such as bytes or a memoryview, or the path of a template file
+    If a Cache is given, the result is looked up there before converting
+    With share=True, the template is loaded as load does with it, to use less memory
+    If a stream is given, the output is written there as it's made and None is returned
+    """
+
+    output, _ = flip_with_format(template, in_format, out_format, clean_up, no_flip, long_form, cache, share, stream)
+
+    return output
+
+
+def flip_with_format(template, in_format=None, out_format=None, clean_up=False, no_flip=False, long_form=False,
+                     cache=None, share=False, stream=None):
+    """
+    Like flip, but also return the output format that was chosen
+    """
+
+    if isinstance(template, os.PathLike):
+        return from_path(flip_with_format, template, in_format, out_format, clean_up, no_flip, long_form, cache, share,
+                         stream)
+
+    if cache is not None:
+        output, out_format = cache.convert(
+            flip_with_format,
+            template,
+            in_format=in_format,
+            out_format=out_format,
+            clean_up=clean_up,
+            no_flip=no_flip,
+            long_form=long_form,
+            share=share,
+        )
+
+        return written(output, stream), out_format
+
+    in_format = choose_in_format(in_format, out_format, no_flip)
+
+    summary = Summary(count=False) if clean_up else None
+
+    # Load the data
+    if in_format == "json":
+        data = load_json(template, summary, share)
+    elif in_format == "yaml":
+        data = load_yaml(template, summary, share)
+    else:
+        data, in_format = load(template, summary=summary, share=share)
+
+    # Clean up? Only if it could change something
+    if clean_up and needs_clean(summary):
+        data = clean(data)
+
+    out_format = choose_out_format(in_format, out_format, no_flip)
+
     # Finished!
     if out_format == "json":
-        return dump_json(data)
+        return dump_json(data, stream), out_format
 
-    return dump_yaml(data, clean_up, long_form)
+    return dump_yaml(data, clean_up, long_form, stream=stream), out_format
@@ -0,0 +1,170 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Coroutines that convert templates without blocking the event loop
+"""
+
+from . import flip, to_json, to_yaml
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import threading
+import weakref
+
+# New in Python 3.7; before that, get_event_loop is the running loop inside a coroutine
+get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+# The executor used when none is given, created on first use
+default_executor = None
+default_executor_lock = threading.Lock()
+
+
+class AsyncExecutor(object):
+    """
+    Runs conversions for the coroutines in a pool of threads or processes
+
+    pool is "process", "thread" or a concurrent.futures.Executor to use.
+    Processes sidestep the GIL, so they suit big templates best; they are started on
+    first use and kept warm for later calls. At most max_concurrency conversions are
+    handed to the pool at a time, two per worker by default, and the rest wait without
+    blocking the event loop.
+    """
+
+    def __init__(self, pool="process", workers=None, max_concurrency=None):
+        workers = workers or multiprocessing.cpu_count()
+
+        if isinstance(pool, Executor):
+            self.pool = pool
+        elif pool == "process":
+            self.pool = ProcessPoolExecutor(workers)
+        elif pool == "thread":
+            self.pool = ThreadPoolExecutor(workers)
+        else:
+            raise ValueError("Unknown pool {!r}, expected \"process\", \"thread\" or an Executor".format(pool))
+
+        self.max_concurrency = max_concurrency or workers * 2
+
+        # asyncio.Semaphore belongs to one event loop before Python 3.10
+        self.semaphores = weakref.WeakKeyDictionary()
+
+    def semaphore(self, loop):
+        semaphore = self.semaphores.get(loop)
+
+        if semaphore is None:
+            semaphore = self.semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        return semaphore
+
+    async def run(self, function, *args, timeout=None, **kwargs):
+        """
+        Call function in the pool and wait for its result, for at most timeout seconds
+
+        On a timeout or cancellation, a conversion that hasn't started yet is dropped.
+        One that has started can't be interrupted; it keeps its place towards
+        max_concurrency until it finishes.
+        """
+
+        return await asyncio.wait_for(self.submit(function, args, kwargs), timeout)
+
+    async def submit(self, function, args, kwargs):
+        loop = get_running_loop()
+        semaphore = self.semaphore(loop)
+
+        await semaphore.acquire()
+
+        try:
+            future = self.pool.submit(function, *args, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # The loop has been closed
+                pass
+
+        future.add_done_callback(release)
+
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+
+def get_executor():
+    """
+    The AsyncExecutor used when none is given, a process pool with a worker per CPU
+    """
+
+    global default_executor
+
+    with default_executor_lock:
+        if default_executor is None:
+            default_executor = AsyncExecutor()
+
+        return default_executor
+
+
+def set_executor(executor):
+    """
+    Replace the AsyncExecutor used when none is given, returning the previous one
+    """
+
+    global default_executor
+
+    with default_executor_lock:
+        previous, default_executor = default_executor, executor
+
+    return previous
+
+
+async def flip_async(template, in_format=None, out_format=None, clean_up=False, no_flip=False, long_form=False,
+                     executor=None, timeout=None):
+    """
+    flip in an AsyncExecutor, giving up after timeout seconds
+    """
+
+    return await (executor or get_executor()).run(
+        flip,
+        template,
+        in_format=in_format,
+        out_format=out_format,
+        clean_up=clean_up,
+        no_flip=no_flip,
+        long_form=long_form,
+        timeout=timeout,
+    )
+
+
+async def to_json_async(template, clean_up=False, executor=None, timeout=None):
+    """
+    to_json in an AsyncExecutor, giving up after timeout seconds
+    """
+
+    return await (executor or get_executor()).run(to_json, template, clean_up=clean_up, timeout=timeout)
+
+
+async def to_yaml_async(template, clean_up=False, long_form=False, literal=True, executor=None, timeout=None):
+    """
+    to_yaml in an AsyncExecutor, giving up after timeout seconds
+    """
+
+    return await (executor or get_executor()).run(
+        to_yaml,
+        template,
+        clean_up=clean_up,
+        long_form=long_form,
+        literal=literal,
+        timeout=timeout,
+    )
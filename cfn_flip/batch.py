@@ -0,0 +1,414 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from . import flip_with_format
+from .files import write_file
+from cfn_tools.buffers import TemplateFile
+import collections
+import glob
+import itertools
+import multiprocessing
+import os
+import queue
+
+# Files picked up when searching a directory
+TEMPLATE_EXTENSIONS = (".json", ".yaml", ".yml", ".template")
+
+# Extensions that tell us the input format
+INPUT_FORMATS = {
+    ".json": "json",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+}
+
+OUTPUT_EXTENSIONS = {
+    "json": ".json",
+    "yaml": ".yaml",
+}
+
+GLOB_CHARACTERS = "*?["
+
+# flip_many sends templates to the workers in chunks of about this many characters,
+# enough work to make the cost of passing them around negligible
+CHUNK_CHARACTERS = 32 * 1024
+
+# How many chunks of work run_pool keeps queued for each process
+CHUNKS_PER_JOB = 2
+
+# Every input of the current batch, so that no output overwrites one
+inputs = frozenset()
+
+# Each process's Cache for each cache directory
+caches = {}
+
+
+class Result(object):
+    """
+    The outcome of converting one template
+    """
+
+    __slots__ = ("path", "output", "error", "cached")
+
+    def __init__(self, path, output=None, error=None, cached=None):
+        self.path = path
+        self.output = output
+        self.error = error
+
+        # Whether the output came from the cache, None without one
+        self.cached = cached
+
+    def __repr__(self):
+        return "Result({!r}, output={!r}, error={!r}, cached={!r})".format(
+            self.path, self.output, self.error, self.cached)
+
+
+class FlipResult(object):
+    """
+    The outcome of flipping one of flip_many's templates
+    """
+
+    __slots__ = ("index", "output", "out_format", "error", "error_type")
+
+    def __init__(self, index, output=None, out_format=None, error=None, error_type=None):
+        self.index = index
+        self.output = output
+        self.out_format = out_format
+        self.error = error
+
+        # The class of the exception whose message is error, which unlike the exception
+        # itself can always be sent back from the worker
+        self.error_type = error_type
+
+    def __repr__(self):
+        return "FlipResult({!r}, output={!r}, out_format={!r}, error={!r}, error_type={!r})".format(
+            self.index, self.output, self.out_format, self.error, self.error_type)
+
+
+def find_templates(paths):
+    """
+    Expand paths, directories and globs into templates
+
+    Returns a list of (path, name) where name is the path relative to the directory
+    or glob it was found in, used to place the output in an output directory.
+    Paths that match nothing are returned as they are so that they get reported.
+    """
+
+    found = []
+    seen = set()
+
+    def add(path, name):
+        key = os.path.abspath(path)
+
+        if key not in seen:
+            seen.add(key)
+            found.append((path, name))
+
+    for path in paths:
+        magic = [path.index(char) for char in GLOB_CHARACTERS if char in path]
+
+        if magic:
+            # Names are relative to the directory the glob starts from
+            base = os.path.dirname(path[:min(magic)])
+            matches = sorted(glob.glob(path, recursive=True)) or [path]
+        else:
+            base = os.path.dirname(path)
+            matches = [path]
+
+        for match in matches:
+            if not os.path.isdir(match):
+                add(match, os.path.relpath(match, base or os.curdir))
+                continue
+
+            for root, dirs, files in os.walk(match):
+                dirs.sort()
+
+                for name in sorted(files):
+                    if name.endswith(TEMPLATE_EXTENSIONS):
+                        full = os.path.join(root, name)
+                        add(full, os.path.relpath(full, match))
+
+    return found
+
+
+def set_inputs(paths):
+    global inputs
+    inputs = frozenset(os.path.abspath(path) for path in paths)
+
+
+def get_cache(directory):
+    if directory not in caches:
+        from .cache import Cache
+
+        caches[directory] = Cache(directory)
+
+    return caches[directory]
+
+
+def convert_file(job):
+    """
+    Convert one template and write the output next to it or into the output directory
+
+    Never raises; failures are returned in the Result.
+    """
+
+    path, name, output_dir, options = job
+    in_format = options["in_format"] or INPUT_FORMATS.get(os.path.splitext(path)[1].lower())
+    cache = get_cache(options["cache_dir"]) if options["cache"] else None
+    cached = None
+
+    try:
+        hits = cache.hits if cache is not None else 0
+
+        # Read as bytes, and memory-mapped if it's big
+        with TemplateFile(path) as template:
+            output, out_format = flip_with_format(
+                template,
+                in_format=in_format,
+                out_format=options["out_format"],
+                clean_up=options["clean_up"],
+                no_flip=options["no_flip"],
+                long_form=options["long_form"],
+                cache=cache,
+            )
+
+        if cache is not None:
+            cached = cache.hits > hits
+
+        base = os.path.splitext(os.path.join(output_dir, name) if output_dir else path)[0]
+        destination = base + OUTPUT_EXTENSIONS[out_format]
+
+        if os.path.abspath(destination) in inputs:
+            raise ValueError("Output {} would overwrite an input, use --output-dir".format(destination))
+
+        directory = os.path.dirname(destination)
+
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        write_file(destination, lambda f: f.write(output), encoding="utf-8")
+    except Exception as e:
+        return Result(path, error="{}".format(e))
+
+    return Result(path, output=destination, cached=cached)
+
+
+def convert_files(paths, jobs=None, output_dir=None, in_format=None, out_format=None,
+                  clean_up=False, no_flip=False, long_form=False, cache=False, cache_dir=None):
+    """
+    Convert every template found in paths across a pool of jobs processes
+
+    Yields a Result for each template in the order they were found.
+    A failure is reported in its Result and doesn't stop the others.
+    An output is never written over any of the templates found, whoever wrote it.
+    With cache, outputs are reused from a Cache in cache_dir, or the default directory.
+    """
+
+    templates = find_templates(paths)
+    options = {
+        "in_format": in_format,
+        "out_format": out_format,
+        "clean_up": clean_up,
+        "no_flip": no_flip,
+        "long_form": long_form,
+        "cache": cache,
+        "cache_dir": cache_dir,
+    }
+
+    work = [(path, name, output_dir, options) for path, name in templates]
+    sources = [path for path, _ in templates]
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    jobs = min(jobs, len(work))
+
+    if jobs <= 1:
+        set_inputs(sources)
+
+        for job in work:
+            yield convert_file(job)
+
+        return
+
+    # Big enough chunks to keep the overhead down but small enough to balance the load
+    chunk_size = max(1, len(work) // (jobs * 4))
+
+    for result in run_pool(convert_file, work, jobs, chunk_size, initializer=set_inputs, initargs=(sources,)):
+        yield result
+
+
+def call_each(function, items):
+    return [function(item) for item in items]
+
+
+def run_pool(function, work, jobs, chunk_size=1, ordered=True, initializer=None, initargs=()):
+    """
+    Yield function(item) for each item of work from a pool of jobs processes
+
+    With ordered=False, results come as soon as they are ready rather than in order.
+    work is read as results are taken, no more than CHUNKS_PER_JOB chunks of chunk_size items
+    ahead for each process, so that a generator isn't read all at once.
+    The pool is shut down once everything is done or the caller stops iterating.
+    """
+
+    pool = multiprocessing.Pool(jobs, initializer=initializer, initargs=initargs)
+    work = iter(work)
+
+    # The chunks in the pool, as their AsyncResults when ordered
+    pending = collections.deque()
+
+    # Without ordered, (succeeded, results or exception) for each chunk as it finishes
+    finished = queue.Queue()
+
+    def submit():
+        chunk = list(itertools.islice(work, chunk_size))
+
+        if not chunk:
+            return False
+
+        if ordered:
+            pending.append(pool.apply_async(call_each, (function, chunk)))
+        else:
+            pending.append(None)
+            pool.apply_async(
+                call_each, (function, chunk),
+                callback=lambda results: finished.put((True, results)),
+                error_callback=lambda e: finished.put((False, e)),
+            )
+
+        return True
+
+    try:
+        for _ in range(jobs * CHUNKS_PER_JOB):
+            if not submit():
+                break
+
+        while pending:
+            if ordered:
+                results = pending.popleft().get()
+            else:
+                pending.popleft()
+                succeeded, results = finished.get()
+
+                if not succeeded:
+                    raise results
+
+            # Keep the workers busy while these are used
+            submit()
+
+            for result in results:
+                yield result
+
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def template_size(template):
+    """
+    How big a template is: its length, or the size of the file if it's a path
+    """
+
+    if not isinstance(template, os.PathLike):
+        return len(template)
+
+    try:
+        return os.path.getsize(template)
+    except OSError:
+        # flip_with_format reports it
+        return 0
+
+
+def chunk_templates(templates, size=CHUNK_CHARACTERS):
+    """
+    Group templates into lists of (index, template) of about size characters
+    """
+
+    chunk = []
+    characters = 0
+
+    for index, template in enumerate(templates):
+        chunk.append((index, template))
+        characters += template_size(template)
+
+        if characters >= size:
+            yield chunk
+            chunk = []
+            characters = 0
+
+    if chunk:
+        yield chunk
+
+
+def flip_chunk(job):
+    """
+    Flip a chunk of templates
+
+    Never raises; failures are returned in the FlipResults.
+    """
+
+    chunk, options = job
+    results = []
+
+    for index, template in chunk:
+        try:
+            output, out_format = flip_with_format(template, **options)
+        except Exception as e:
+            results.append(FlipResult(index, error="{}".format(e), error_type=type(e)))
+        else:
+            results.append(FlipResult(index, output=output, out_format=out_format))
+
+    return results
+
+
+def flip_many(templates, in_format=None, out_format=None, clean_up=False, no_flip=False, long_form=False,
+              jobs=None, ordered=True, chunk_size=CHUNK_CHARACTERS):
+    """
+    Flip any number of templates across a pool of jobs processes, taking the same options as flip
+
+    Yields a FlipResult for each template. Its index is the template's position in templates
+    and a failure is reported in its error and error_type without stopping the others.
+    templates can be a generator, which is read a few chunks ahead of the results yielded.
+    Results are yielded in order unless ordered is False, when each comes as soon as it's ready.
+    Small templates are sent to the workers in chunks of about chunk_size characters.
+    """
+
+    options = {
+        "in_format": in_format,
+        "out_format": out_format,
+        "clean_up": clean_up,
+        "no_flip": no_flip,
+        "long_form": long_form,
+    }
+    chunks = chunk_templates(templates, chunk_size)
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    # No more processes than there are chunks to go round
+    first = list(itertools.islice(chunks, jobs))
+    jobs = min(jobs, len(first))
+    work = ((chunk, options) for chunk in itertools.chain(first, chunks))
+
+    if jobs <= 1:
+        results = (flip_chunk(job) for job in work)
+    else:
+        results = run_pool(flip_chunk, work, jobs, ordered=ordered)
+
+    for chunk in results:
+        for result in chunk:
+            yield result
@@ -0,0 +1,373 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_tools._config import config
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import pickle
+import six
+import sys
+import threading
+
+# Bump this whenever the same input and options produce different output,
+# so that entries written by older versions are never used
+CACHE_VERSION = 1
+
+DIRECTORY_VARIABLE = "CFN_FLIP_CACHE_DIR"
+
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+DEFAULT_MEMORY_SIZE = 64 * 1024 * 1024
+
+# Eviction trims the cache to this fraction of max_size so that it doesn't happen on every write
+LOW_WATER_MARK = 0.9
+
+# Files being written, which are never entries
+TEMPORARY_PREFIX = ".tmp-"
+
+
+def default_cache_dir():
+    """
+    $CFN_FLIP_CACHE_DIR, or cfn-flip in the user's cache directory
+    """
+
+    path = os.environ.get(DIRECTORY_VARIABLE)
+
+    if path:
+        return path
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(base, "cfn-flip")
+
+
+def is_text(value):
+    """
+    Is value a string, or a tuple of them, so that it can be shared by everyone who asks for it?
+    """
+
+    if isinstance(value, tuple):
+        return all(isinstance(item, six.text_type) for item in value)
+
+    return isinstance(value, six.text_type)
+
+
+class BaseCache(object):
+    """
+    Results of conversions, keyed by a digest of the input and the options
+
+    Subclasses store the values with get and put; values are never None.
+    """
+
+    # Whether only text can be stored, so not the templates returned by load
+    text_only = False
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def key(self, name, template, options):
+        """
+        The digest of a conversion's input and everything that affects its output
+        """
+
+        # Buffers, such as bytes or memory-mapped files, are digested as they are
+        if isinstance(template, six.text_type):
+            template = template.encode("utf-8", "surrogatepass")
+
+        settings = [CACHE_VERSION, name, config.max_col_width, config.yaml_resolvers, sorted(options.items())]
+
+        digest = hashlib.sha256(json.dumps(settings).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(template)
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        raise NotImplementedError()
+
+    def put(self, key, value):
+        raise NotImplementedError()
+
+    def convert(self, function, template, **options):
+        """
+        function(template, **options), unless its result is already in the cache
+        """
+
+        key = self.key(function.__name__, template, options)
+        value = self.get(key)
+
+        if value is None:
+            value = function(template, **options)
+            self.put(key, value)
+
+        return value
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+
+        if not lookups:
+            return 0.0
+
+        return float(self.hits) / lookups
+
+
+class Cache(BaseCache):
+    """
+    Converted templates kept in a directory
+
+    Each entry is written to a temporary file and renamed into place, so any number of
+    processes can share a directory. Reading an entry marks it as recently used and the
+    least recently used entries are removed once the directory grows past max_size bytes.
+    Only text can be stored, so load needs a MemoryCache.
+    """
+
+    text_only = True
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        super(Cache, self).__init__(max_size)
+
+        self.directory = directory or default_cache_dir()
+
+        # Bytes used, as far as this process knows; None until the directory is scanned
+        self.size = None
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key):
+        """
+        The value stored for key, or None
+        """
+
+        path = self.path(key)
+
+        try:
+            with open(path, "rb") as f:
+                value = json.loads(f.read().decode("utf-8"))
+
+            # Reading doesn't reliably update the access time, so use the modification time
+            os.utime(path, None)
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        except ValueError:
+            # Damaged, perhaps by a full disk
+            self.remove(path)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        if isinstance(value, list):
+            return tuple(value)
+
+        return value
+
+    def put(self, key, value):
+        """
+        Store a string, or a tuple of them, for key
+        """
+
+        import tempfile
+
+        if not is_text(value):
+            raise TypeError("Cache can only store text, not {}".format(type(value).__name__))
+
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, 0o700)
+            except OSError:
+                # Created by another process in the meantime
+                if not os.path.isdir(directory):
+                    raise
+
+        handle, temporary = tempfile.mkstemp(dir=directory, prefix=TEMPORARY_PREFIX)
+
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(data)
+
+            os.replace(temporary, path)
+        except BaseException:
+            self.remove(temporary)
+            raise
+
+        self.writes += 1
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += len(data)
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        """
+        Yield (path, size, last used) for each entry
+        """
+
+        try:
+            directories = list(os.scandir(self.directory))
+        except (IOError, OSError):
+            return
+
+        for directory in directories:
+            if not directory.is_dir():
+                continue
+
+            try:
+                files = list(os.scandir(directory.path))
+            except (IOError, OSError):
+                continue
+
+            for entry in files:
+                if entry.name.startswith(TEMPORARY_PREFIX):
+                    continue
+
+                try:
+                    stat = entry.stat()
+                except (IOError, OSError):
+                    # Evicted by another process
+                    continue
+
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is comfortably below max_size
+        """
+
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        target = self.max_size * LOW_WATER_MARK
+
+        for path, entry_size, _ in entries:
+            if size <= target:
+                break
+
+            if self.remove(path):
+                self.evictions += 1
+
+            size -= entry_size
+
+        self.size = size
+
+    def clear(self):
+        for path, _, _ in list(self.entries()):
+            self.remove(path)
+
+        self.size = 0
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except (IOError, OSError):
+            return False
+
+        return True
+
+
+class MemoryCache(BaseCache):
+    """
+    Results kept in this process, for services that convert the same templates over and over
+
+    Unlike Cache, it can hold the templates returned by load. As clean and cfn_literal_parser
+    change templates in place, those are kept pickled and everyone who asks gets a fresh copy;
+    that is still much quicker than parsing them again. Text is shared.
+    The least recently used values are dropped to keep them under max_size bytes.
+    A MemoryCache can be shared between threads.
+    """
+
+    def __init__(self, max_size=DEFAULT_MEMORY_SIZE):
+        super(MemoryCache, self).__init__(max_size)
+
+        # key: (value, size, pickled), least recently used first
+        self.store = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        The value stored for key, or None
+        """
+
+        with self.lock:
+            entry = self.store.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.store.move_to_end(key)
+            self.hits += 1
+
+        value, _, pickled = entry
+
+        if pickled:
+            return pickle.loads(value)
+
+        return value
+
+    def put(self, key, value):
+        pickled = not is_text(value)
+
+        if pickled:
+            try:
+                value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                # Something a loader made that can't be copied this way
+                return
+
+            size = len(value)
+        else:
+            size = sum(sys.getsizeof(item) for item in value) if isinstance(value, tuple) else sys.getsizeof(value)
+
+        if size > self.max_size:
+            return
+
+        with self.lock:
+            old = self.store.pop(key, None)
+
+            if old is not None:
+                self.size -= old[1]
+
+            self.store[key] = value, size, pickled
+            self.size += size
+            self.writes += 1
+
+            while self.size > self.max_size:
+                _, (_, evicted, _) = self.store.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.store)
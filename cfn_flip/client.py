@@ -0,0 +1,248 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+A thin client for a daemon started with "cfn-flip --serve"
+
+Only uses the standard library so that it starts quickly;
+without a daemon it runs the conversion itself.
+"""
+
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+
+SOCKET_VARIABLE = "CFN_FLIP_SOCKET"
+
+# Environment variables starting with this are cfn-flip's settings, such as CFN_MAX_COL_WIDTH,
+# and are sent with each request so that the daemon runs it as cfn-flip would have here
+SETTINGS_PREFIX = "CFN_"
+
+# cfn-flip's options that take a value
+VALUE_OPTIONS = ("--input", "--output", "--output-dir", "--jobs", "--socket", "--cache-dir")
+SHORT_VALUE_OPTIONS = "iod"
+
+# Options after which cfn-flip never reads stdin
+NO_STDIN_OPTIONS = ("--batch", "--help", "--version")
+
+
+class Stdin(io.StringIO):
+    """
+    Stdin that has already been read, or a terminal if there was none
+    """
+
+    def __init__(self, text):
+        super(Stdin, self).__init__(text or "")
+        self.name = "<stdin>"
+        self.tty = text is None
+
+    def isatty(self):
+        return self.tty
+
+
+def temporary_socket_directory():
+    """
+    The directory the default socket is put in without $XDG_RUNTIME_DIR,
+    which the daemon makes so that only the current user can use it
+    """
+
+    return os.path.join(tempfile.gettempdir(), "cfn-flip-{}".format(os.getuid()))
+
+
+def default_socket_path():
+    """
+    The socket used when --socket isn't given
+    """
+
+    path = os.environ.get(SOCKET_VARIABLE)
+
+    if path:
+        return path
+
+    # Not straight in the temporary directory, where anyone could make a socket of that name first
+    directory = os.environ.get("XDG_RUNTIME_DIR") or temporary_socket_directory()
+
+    return os.path.join(directory, "cfn-flip.sock")
+
+
+def socket_path(argv):
+    """
+    The socket named by a --socket option in argv, or the default
+    """
+
+    for index, arg in enumerate(argv):
+        if arg == "--socket" and index + 1 < len(argv):
+            return argv[index + 1]
+
+        if arg.startswith("--socket="):
+            return arg[len("--socket="):]
+
+    return default_socket_path()
+
+
+def settings():
+    """
+    cfn-flip's settings from the environment
+    """
+
+    return {name: value for name, value in os.environ.items() if name.startswith(SETTINGS_PREFIX)}
+
+
+def reads_stdin(argv):
+    """
+    Would cfn-flip read stdin with these arguments?
+    That's when there is no INPUT argument and it isn't in batch mode.
+    """
+
+    args = iter(argv)
+
+    for arg in args:
+        if arg == "--":
+            arg = next(args, None)
+            return arg is None or arg == "-"
+
+        if arg in NO_STDIN_OPTIONS:
+            return False
+
+        if arg.startswith("--"):
+            if arg in VALUE_OPTIONS:
+                next(args, None)
+
+            continue
+
+        if arg.startswith("-") and len(arg) > 1:
+            # A cluster of short flags, perhaps ending with one that takes a value
+            for index, char in enumerate(arg[1:], 1):
+                if char == "b":
+                    return False
+
+                if char in SHORT_VALUE_OPTIONS:
+                    if index == len(arg) - 1:
+                        next(args, None)
+
+                    break
+
+            continue
+
+        # An INPUT argument, "-" included
+        return arg == "-"
+
+    return True
+
+
+def receive(connection):
+    chunks = []
+
+    while True:
+        chunk = connection.recv(65536)
+
+        if not chunk:
+            return json.loads(b"".join(chunks).decode("utf-8"))
+
+        chunks.append(chunk)
+
+
+def send(connection, message):
+    connection.sendall(json.dumps(message).encode("utf-8"))
+    connection.shutdown(socket.SHUT_WR)
+
+
+def trusted(path, connection):
+    """
+    Whether the socket at path, and the daemon connected to through it, are the current user's
+    """
+
+    uid = os.getuid()
+
+    try:
+        if os.stat(path).st_uid != uid:
+            return False
+    except (IOError, OSError):
+        return False
+
+    # Linux can tell who is at the other end, which catches a socket swapped after the check
+    if hasattr(socket, "SO_PEERCRED"):
+        credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, peer, _ = struct.unpack("3i", credentials)
+
+        if peer != uid:
+            return False
+
+    return True
+
+
+def request(path, argv, stdin):
+    """
+    Ask the daemon at path to run cfn-flip with argv
+
+    Returns its response, or None if no daemon is listening there.
+    Nothing is sent to a daemon run by another user; that is reported and None returned.
+    """
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        try:
+            connection.connect(path)
+        except (IOError, OSError):
+            return None
+
+        if not trusted(path, connection):
+            sys.stderr.write("Warning: Not using {}, which belongs to another user\n".format(path))
+            return None
+
+        send(connection, {
+            "args": argv,
+            "cwd": os.getcwd(),
+            "env": settings(),
+            "stdin": stdin,
+        })
+
+        return receive(connection)
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    """
+    Forward the arguments and stdin to the daemon and relay its output
+    """
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    argv = list(argv)
+
+    if "--serve" not in argv:
+        # Only read stdin if the daemon would; a terminal gets the help text
+        stdin = None
+
+        if reads_stdin(argv) and not sys.stdin.isatty():
+            stdin = sys.stdin.read()
+        response = request(socket_path(argv), argv, stdin)
+
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            sys.exit(response["status"])
+
+        if stdin is not None:
+            sys.stdin = Stdin(stdin)
+
+    # No daemon, so do the work here
+    from .main import main as cfn_flip
+
+    cfn_flip(argv, prog_name="cfn-flip")
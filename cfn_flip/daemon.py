@@ -0,0 +1,212 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from .client import Stdin, receive, send, settings, temporary_socket_directory
+from .main import main
+from cfn_tools._config import config
+import os
+import signal
+import six
+import socket
+import stat
+import sys
+import traceback
+
+# Seconds to wait for a client to send its request, so that one that never does can't hold up the others
+RECEIVE_TIMEOUT = 10
+
+
+class Daemon(object):
+    """
+    Run cfn-flip commands sent by cfn-flip-client over a Unix socket
+
+    Requests are handled one at a time in this process, so everything
+    imported and cached stays warm between them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.listener = None
+
+    def bind(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+
+        if directory == os.path.abspath(temporary_socket_directory()):
+            private_directory(directory)
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            probe.connect(self.path)
+        except (IOError, OSError):
+            # Nothing is listening, so any socket left behind is stale
+            if os.path.exists(self.path):
+                if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+                    raise RuntimeError("{} exists and isn't a socket".format(self.path))
+
+                os.remove(self.path)
+        else:
+            raise RuntimeError("A daemon is already listening on {}".format(self.path))
+        finally:
+            probe.close()
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        # Only the current user may connect
+        umask = os.umask(0o077)
+
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(umask)
+
+        self.listener.listen(16)
+
+    def serve_forever(self):
+        if self.listener is None:
+            self.bind()
+
+        listener = self.listener
+
+        try:
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except (IOError, OSError):
+                    # Closed by close()
+                    return
+
+                connection.settimeout(RECEIVE_TIMEOUT)
+
+                try:
+                    send(connection, run(receive(connection)))
+                except (IOError, OSError, ValueError):
+                    # The client went away, took too long to send its request or sent nonsense
+                    pass
+                finally:
+                    connection.close()
+        finally:
+            self.close()
+
+    def close(self):
+        listener, self.listener = self.listener, None
+
+        if listener is None:
+            return
+
+        try:
+            # Wakes up serve_forever if it's waiting in another thread
+            listener.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+
+        listener.close()
+
+        try:
+            os.remove(self.path)
+        except (IOError, OSError):
+            pass
+
+
+def private_directory(path):
+    """
+    Make the directory at path if it's missing, making sure that only the current user can use it
+    """
+
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+    # Not followed through a symbolic link, which anyone could have put there
+    status = os.lstat(path)
+
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise RuntimeError("{} must be a directory that only the current user can use".format(path))
+
+
+def use_settings(environment):
+    """
+    Replace cfn-flip's settings in the environment with these, and load the configuration from them
+    """
+
+    for name in settings():
+        if name not in environment:
+            del os.environ[name]
+
+    os.environ.update(environment)
+    config.reset()
+
+
+def run(request):
+    """
+    Run the command line tool as the client asked, capturing its output
+    """
+
+    args = request["args"]
+    stdout = six.StringIO()
+    stderr = six.StringIO()
+    status = 0
+
+    if "--serve" in args:
+        return {"status": 2, "stdout": "", "stderr": "Error: The daemon can't start another daemon\n"}
+
+    streams = sys.stdin, sys.stdout, sys.stderr
+    cwd = os.getcwd()
+    environment = settings()
+
+    try:
+        os.chdir(request["cwd"])
+        sys.stdin, sys.stdout, sys.stderr = Stdin(request["stdin"]), stdout, stderr
+
+        # The client's settings rather than those the daemon was started with
+        use_settings(request.get("env", {}))
+
+        main.main(args=args, prog_name="cfn-flip")
+    except SystemExit as e:
+        status = e.code or 0
+    except Exception:
+        traceback.print_exc(file=stderr)
+        status = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = streams
+        os.chdir(cwd)
+        use_settings(environment)
+
+    return {
+        "status": status,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+def stop(signum, frame):
+    # Not a SystemExit, which would be taken for the end of a command
+    raise KeyboardInterrupt()
+
+
+def serve(daemon):
+    """
+    Answer requests on a bound daemon's socket until interrupted
+    """
+
+    # Clean up the socket when stopped with kill
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
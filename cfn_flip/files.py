@@ -0,0 +1,68 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+import os
+import stat
+
+# The output is written to a file starting with this in the same directory until it's complete
+TEMPORARY_PREFIX = ".tmp-"
+
+
+def write_file(path, write, encoding=None):
+    """
+    Call write with a file to write the contents of the file at path to
+
+    A regular file, or one that doesn't exist yet, is only replaced once write returns,
+    so that a failure part of the way through leaves it as it was. Anything else,
+    such as /dev/null or a pipe, is written to as it is.
+    The file is opened with encoding, or the locale's when it's None.
+    """
+
+    # Through a symbolic link to the file it points to, rather than replacing the link
+    path = os.path.realpath(path)
+
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        mode = None
+
+    if mode is not None and not stat.S_ISREG(mode):
+        with open(path, "w", encoding=encoding) as f:
+            write(f)
+
+        return
+
+    import tempfile
+
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMPORARY_PREFIX)
+
+    try:
+        with os.fdopen(handle, "w", encoding=encoding) as f:
+            write(f)
+
+        if mode is None:
+            # What open would have created it with
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+
+        os.chmod(temporary, stat.S_IMODE(mode))
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+        raise
@@ -0,0 +1,267 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Conversions done a bounded amount of work at a time
+
+Each stage is a generator that yields after every node and returns its result,
+so that they can be chained with yield from.
+"""
+
+from . import choose_in_format, choose_out_format, dump_yaml, sniff_format
+from cfn_clean import clean_steps, literal_steps
+from cfn_tools import load_json, load_yaml
+from cfn_tools._config import config
+from cfn_tools.json_encoder import iterencode
+import six
+
+# Nodes processed by each call to Conversion.step
+DEFAULT_STEP_SIZE = 1000
+
+STAGES = ("load", "clean", "literal", "dump")
+
+
+class Cancelled(Exception):
+    """
+    The conversion was cancelled before it finished
+    """
+
+
+def load_json_steps(template):
+    """
+    load_json, yielding after each node
+
+    Errors are left to load_json so that the exception is exactly the same.
+    """
+
+    from cfn_tools.json_tokenizer import build_steps
+
+    if not isinstance(template, six.text_type):
+        return load_json(template)
+
+    try:
+        data = yield from build_steps(template)
+    except Exception:
+        return load_json(template)
+
+    return data
+
+
+def load_yaml_steps(template):
+    """
+    load_yaml, yielding after each node
+
+    Anything out of the ordinary, such as recursive aliases, merge keys or errors,
+    is left to load_yaml so that the result, or the exception, is exactly the same.
+    """
+
+    from cfn_tools.yaml_loader import build_steps
+
+    try:
+        data = yield from build_steps(template)
+    except Exception:
+        return load_yaml(template)
+
+    return data
+
+
+def load_steps(template):
+    """
+    load, yielding after each node
+    """
+
+    in_format, certain = sniff_format(template)
+
+    if in_format == "yaml" and certain:
+        try:
+            data = yield from load_yaml_steps(template)
+            return data, "yaml"
+        except Exception:
+            # Report the JSON error as we would have before sniffing
+            pass
+
+    try:
+        data = yield from load_json_steps(template)
+        return data, "json"
+    except ValueError as e:
+        if in_format == "yaml" and certain:
+            raise
+
+        try:
+            data = yield from load_yaml_steps(template)
+            return data, "yaml"
+        except Exception:
+            raise e
+
+
+def dump_json_steps(data):
+    """
+    dump_json, yielding after each piece of the output
+    """
+
+    chunks = []
+
+    for chunk in iterencode(data):
+        chunks.append(chunk)
+        yield
+
+    return "".join(chunks)
+
+
+def dump_yaml_steps(data, clean_up=False, long_form=False):
+    """
+    dump_yaml, yielding after each node
+
+    Data that YamlWriter can't write is dumped by dump_yaml in one go.
+    """
+
+    from .yaml_writer import Unsupported, YamlWriter
+
+    writer = YamlWriter(clean_up, long_form, width=config.max_col_width)
+
+    try:
+        yield from writer.steps(data)
+    except Unsupported:
+        return dump_yaml(data, clean_up, long_form)
+
+    return writer.stream.getvalue()
+
+
+class Conversion(object):
+    """
+    A flip that is done step_size nodes at a time
+
+    Takes the same options as flip, plus literal to turn JSON properties into literal
+    strings as to_yaml does. Call step until it returns True, or iterate over the
+    conversion, and the result is then in output; in between, the caller is free to do
+    something else, report progress from stage and nodes, or cancel.
+    """
+
+    def __init__(self, template, in_format=None, out_format=None, clean_up=False, no_flip=False, long_form=False,
+                 literal=False, step_size=DEFAULT_STEP_SIZE):
+        if step_size < 1:
+            raise ValueError("step_size must be at least 1")
+
+        self.template = template
+        self.in_format = in_format
+        self.out_format = out_format
+        self.clean_up = clean_up
+        self.no_flip = no_flip
+        self.long_form = long_form
+        self.literal = literal
+        self.step_size = step_size
+
+        # The stage being worked on, one of STAGES, or None before the first step
+        self.stage = None
+
+        # Nodes processed so far, over all the stages
+        self.nodes = 0
+
+        self.output = None
+        self.error = None
+        self.done = False
+        self.cancelled = False
+
+        self.steps = self.convert()
+
+    def convert(self):
+        self.stage = "load"
+
+        in_format = choose_in_format(self.in_format, self.out_format, self.no_flip)
+
+        if in_format == "json":
+            data = yield from load_json_steps(self.template)
+        elif in_format == "yaml":
+            data = yield from load_yaml_steps(self.template)
+        else:
+            data, in_format = yield from load_steps(self.template)
+
+        self.in_format = in_format
+        self.out_format = choose_out_format(in_format, self.out_format, self.no_flip)
+
+        if self.clean_up:
+            self.stage = "clean"
+            data = yield from clean_steps(data)
+
+        if self.out_format == "json":
+            self.stage = "dump"
+            return (yield from dump_json_steps(data))
+
+        if self.literal:
+            self.stage = "literal"
+            data = yield from literal_steps(data)
+
+        self.stage = "dump"
+
+        return (yield from dump_yaml_steps(data, self.clean_up, self.long_form))
+
+    def step(self):
+        """
+        Process up to step_size nodes, returning True once the conversion is done
+
+        Errors from the conversion are raised here, and again by any later step.
+        """
+
+        if self.cancelled:
+            raise Cancelled()
+
+        if self.error is not None:
+            raise self.error
+
+        if self.done:
+            return True
+
+        steps = self.steps
+        count = 0
+
+        try:
+            while count < self.step_size:
+                next(steps)
+                count += 1
+        except StopIteration as e:
+            self.output = e.value
+            self.done = True
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self.nodes += count
+
+        return self.done
+
+    def run(self):
+        """
+        Finish the conversion in one go and return the output
+        """
+
+        while not self.step():
+            pass
+
+        return self.output
+
+    def cancel(self):
+        """
+        Stop the conversion and free what it was holding; later steps raise Cancelled
+        """
+
+        if not self.done:
+            self.cancelled = True
+            self.steps.close()
+
+    def __iter__(self):
+        """
+        Step the conversion to the end, yielding the number of nodes processed after each step
+        """
+
+        while not self.step():
+            yield self.nodes
+
+        yield self.nodes
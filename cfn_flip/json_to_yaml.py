@@ -0,0 +1,222 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from collections import deque
+import yaml
+
+from cfn_tools.chunked_writer import ChunkedWriter
+from cfn_tools.json_tokenizer import JsonTokenizer, KEY, MAP_END, MAP_START, SEQ_END, SEQ_START
+from cfn_tools.odict import ODict
+from .yaml_dumper import CONVERTED_SUFFIXES, FN_PREFIX, TAG_MAP, map_representer
+
+TAG_SEQ = "tag:yaml.org,2002:seq"
+
+
+class JsonToYamlSerializer(object):
+    """
+    Turn JSON tokens into the YAML events yaml.dump would produce with the given dumper
+
+    Objects whose first key is a function name are held back until it's clear
+    whether that is their only key, so they can be written in short form.
+    Everything else is passed straight through to the emitter.
+    """
+
+    def __init__(self, dumper, short_form):
+        self.dumper = dumper
+        self.short_form = short_form
+        self.pending = deque()
+        self.keys = []
+
+    def next_token(self, tokens):
+        if self.pending:
+            return self.pending.popleft()
+
+        return next(tokens)
+
+    def collect_value(self, tokens):
+        """
+        Read all the tokens of the next value
+        """
+
+        collected = []
+        depth = 0
+
+        while True:
+            token = self.next_token(tokens)
+            collected.append(token)
+
+            if token[0] in (MAP_START, SEQ_START):
+                depth += 1
+            elif token[0] in (MAP_END, SEQ_END):
+                depth -= 1
+
+            if depth == 0 and token[0] != KEY:
+                return collected
+
+    def build(self, collected):
+        """
+        Build the value made up of some tokens
+        """
+
+        stack = [[]]
+        keys = []
+
+        for kind, value in collected:
+            if kind == MAP_START:
+                stack.append(ODict())
+            elif kind == SEQ_START:
+                stack.append([])
+            elif kind == KEY:
+                keys.append(value)
+                continue
+            else:
+                if kind in (MAP_END, SEQ_END):
+                    value = stack.pop()
+
+                parent = stack[-1]
+
+                if isinstance(parent, list):
+                    parent.append(value)
+                else:
+                    parent[keys.pop()] = value
+
+        return stack[0][0]
+
+    def is_function(self, key):
+        return key in CONVERTED_SUFFIXES or key.startswith(FN_PREFIX)
+
+    def node_events(self, node):
+        """
+        Serialize a node the way yaml.serializer does (CloudFormation templates have no aliases)
+        """
+
+        dumper = self.dumper
+
+        if isinstance(node, yaml.ScalarNode):
+            detected_tag = dumper.resolve(yaml.ScalarNode, node.value, (True, False))
+            default_tag = dumper.resolve(yaml.ScalarNode, node.value, (False, True))
+            implicit = (node.tag == detected_tag), (node.tag == default_tag)
+            yield yaml.ScalarEvent(None, node.tag, implicit, node.value, style=node.style)
+
+        elif isinstance(node, yaml.SequenceNode):
+            implicit = node.tag == dumper.resolve(yaml.SequenceNode, node.value, True)
+            yield yaml.SequenceStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+
+            for item in node.value:
+                for event in self.node_events(item):
+                    yield event
+
+            yield yaml.SequenceEndEvent()
+
+        else:
+            implicit = node.tag == dumper.resolve(yaml.MappingNode, node.value, True)
+            yield yaml.MappingStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+
+            for key, value in node.value:
+                for event in self.node_events(key):
+                    yield event
+
+                for event in self.node_events(value):
+                    yield event
+
+            yield yaml.MappingEndEvent()
+
+    def represent(self, data):
+        node = self.dumper.represent_data(data)
+
+        # Nothing is shared between values so don't hold on to them
+        self.dumper.represented_objects = {}
+        self.dumper.object_keeper = []
+        self.dumper.alias_key = None
+
+        return self.node_events(node)
+
+    def events(self, tokens):
+        tokens = iter(tokens)
+
+        while True:
+            try:
+                kind, value = self.next_token(tokens)
+            except StopIteration:
+                return
+
+            if kind == MAP_START:
+                first = self.next_token(tokens)
+
+                if first[0] == KEY and self.short_form and self.is_function(first[1]):
+                    collected = self.collect_value(tokens)
+                    after = self.next_token(tokens)
+
+                    if after[0] == MAP_END:
+                        for event in self.represent(ODict(((first[1], self.build(collected)),))):
+                            yield event
+                        continue
+
+                    self.pending.extendleft(reversed([first] + collected + [after]))
+                else:
+                    self.pending.appendleft(first)
+
+                self.keys.append(set())
+                yield yaml.MappingStartEvent(None, TAG_MAP, True, flow_style=False)
+
+            elif kind == SEQ_START:
+                yield yaml.SequenceStartEvent(None, TAG_SEQ, True, flow_style=False)
+
+            elif kind == MAP_END:
+                self.keys.pop()
+                yield yaml.MappingEndEvent()
+
+            elif kind == SEQ_END:
+                yield yaml.SequenceEndEvent()
+
+            else:
+                if kind == KEY:
+                    if value in self.keys[-1]:
+                        raise ValueError("Duplicate key {!r} can't be streamed".format(value))
+
+                    self.keys[-1].add(value)
+
+                for event in self.represent(value):
+                    yield event
+
+
+def stream_json_to_yaml(source, output, dumper, **kwargs):
+    """
+    Convert JSON from a string or file to YAML written to output,
+    without building the whole template in memory
+
+    The dumper should be one of the cfn_flip dumpers and kwargs are passed to it as for yaml.dump
+    """
+
+    writer = ChunkedWriter(output)
+    instance = dumper(writer, **kwargs)
+    short_form = instance.yaml_representers.get(ODict) is map_representer
+    serializer = JsonToYamlSerializer(instance, short_form)
+
+    try:
+        instance.emit(yaml.StreamStartEvent(encoding=instance.use_encoding))
+        instance.emit(yaml.DocumentStartEvent(
+            explicit=instance.use_explicit_start,
+            version=instance.use_version,
+            tags=instance.use_tags,
+        ))
+
+        for event in serializer.events(JsonTokenizer(source)):
+            instance.emit(event)
+
+        instance.emit(yaml.DocumentEndEvent(explicit=instance.use_explicit_end))
+        instance.emit(yaml.StreamEndEvent())
+    finally:
+        instance.dispose()
+
+    writer.flush()
@@ -12,9 +12,13 @@ See the License for the specific language governing permissions and limitations
 """
 
 from . import flip
+from .files import write_file
 import click
 import sys
 
+# Read as bytes, which the parsers decode themselves, and memory-mapped if it's big
+INPUT = click.Argument(["input"], type=click.File("rb"))
+
 
 @click.command()
 @click.option("--input", "-i", "in_format", type=click.Choice(["json", "yaml"]), help="Specify the input format. Overrides -j and -y flags.")
@@ -24,8 +28,21 @@ import sys
 @click.option("--clean", "-c", is_flag=True, help="Performs some opinionated cleanup on your template.")
 @click.option("--long", "-l", is_flag=True, help="Use long-form syntax for functions when converting to YAML.")
 @click.option("--no-flip", "-n", is_flag=True, help="Perform other operations but do not flip the output format.")
-@click.argument("input", type=click.File("r"), default=sys.stdin)
-@click.argument("output", type=click.File("w"), default=sys.stdout)
+@click.option("--batch", "-b", is_flag=True, help="Convert any number of templates, directories and globs. "
+              "Each output is written next to its input with .json and .yaml swapped.")
+@click.option("--output-dir", "-d", type=click.Path(file_okay=False),
+              help="With --batch, write the outputs into this directory instead.")
+@click.option("--jobs", type=click.IntRange(min=1), help="With --batch, the number of processes to use. "
+              "Defaults to the number of CPUs.")
+@click.option("--serve", is_flag=True, help="Run as a daemon answering cfn-flip-client on a Unix socket.")
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False),
+              help="The daemon's socket. Defaults to $CFN_FLIP_SOCKET, or one in $XDG_RUNTIME_DIR "
+              "or a private directory in the temporary directory.")
+@click.option("--cache", is_flag=True, help="Reuse the outputs of templates converted before from an on-disk cache.")
+@click.option("--cache-dir", type=click.Path(file_okay=False), help="The cache's directory, implies --cache. "
+              "Defaults to $CFN_FLIP_CACHE_DIR or cfn-flip in the user's cache directory.")
+@click.option("--cache-stats", is_flag=True, help="Report how many outputs came from the cache, implies --cache.")
+@click.argument("paths", nargs=-1, metavar="[INPUT [OUTPUT]]")
 @click.version_option(message='AWS Cloudformation Template Flip, Version %(version)s')
 @click.pass_context
 def main(ctx, **kwargs):
@@ -39,8 +56,47 @@ def main(ctx, **kwargs):
     no_flip = kwargs.pop('no_flip')
     clean = kwargs.pop('clean')
     long_form = kwargs.pop('long')
-    input_file = kwargs.pop('input')
-    output_file = kwargs.pop('output')
+    paths = kwargs.pop('paths')
+    socket_path = kwargs.pop('socket_path')
+    cache_dir = kwargs.pop('cache_dir')
+    cache_stats = kwargs.pop('cache_stats')
+    use_cache = kwargs.pop('cache') or cache_stats or cache_dir is not None
+    jobs = kwargs.pop('jobs')
+    output_dir = kwargs.pop('output_dir')
+    batch_mode = kwargs.pop('batch')
+
+    if not batch_mode:
+        for option, value in (("--jobs", jobs), ("--output-dir", output_dir)):
+            if value is not None:
+                raise click.UsageError("{} can only be used with --batch".format(option), ctx)
+
+    if kwargs.pop('serve'):
+        # Only the daemon needs the socket handling
+        from .client import default_socket_path
+        from .daemon import Daemon, serve
+
+        daemon = Daemon(socket_path or default_socket_path())
+
+        try:
+            daemon.bind()
+        except RuntimeError as e:
+            raise click.ClickException("{}".format(e))
+
+        click.echo("Listening on {}".format(daemon.path), err=True)
+        serve(daemon)
+
+        return
+
+    if batch_mode:
+        batch(ctx, paths, jobs, output_dir, in_format, out_format, clean, no_flip, long_form,
+              use_cache, cache_dir, cache_stats)
+        return
+
+    if len(paths) > 2:
+        raise click.UsageError("Got unexpected extra argument ({})".format(" ".join(paths[2:])), ctx)
+
+    input_file = INPUT.type.convert(paths[0], INPUT, ctx) if paths and paths[0] != "-" else sys.stdin
+    output_path = paths[1] if len(paths) > 1 and paths[1] != "-" else None
 
     if not in_format:
         if input_file.name.endswith(".json"):
@@ -52,15 +108,104 @@ def main(ctx, **kwargs):
         click.echo(ctx.get_help())
         ctx.exit()
 
+    cache = None
+
+    if use_cache:
+        from .cache import Cache
+
+        cache = Cache(cache_dir)
+
+    from cfn_tools.buffers import TemplateFile
+
+    def write(output_file):
+        # Written as it's made, so that whatever reads the output can start straight away
+        with TemplateFile(input_file) as template:
+            flip(
+                template,
+                in_format=in_format,
+                out_format=out_format,
+                clean_up=clean,
+                no_flip=no_flip,
+                long_form=long_form,
+                cache=cache,
+                stream=output_file,
+            )
+
     try:
-        flipped = flip(
-            input_file.read(),
-            in_format=in_format,
-            out_format=out_format,
-            clean_up=clean,
-            no_flip=no_flip,
-            long_form=long_form
-        )
-        output_file.write(flipped)
+        if output_path is None:
+            write(sys.stdout)
+        else:
+            write_file(output_path, write)
     except Exception as e:
         raise click.ClickException("{}".format(e))
+
+    if cache_stats:
+        report_cache(cache)
+
+
+def batch(ctx, paths, jobs, output_dir, in_format, out_format, clean, no_flip, long_form,
+          cache=False, cache_dir=None, cache_stats=False):
+    """
+    Convert many templates, reporting each failure without stopping
+    """
+
+    if not paths:
+        raise click.UsageError("--batch needs at least one path", ctx)
+
+    # multiprocessing is only needed here
+    from .batch import convert_files
+
+    converted = failed = hits = misses = 0
+
+    for result in convert_files(
+        paths,
+        jobs=jobs,
+        output_dir=output_dir,
+        in_format=in_format,
+        out_format=out_format,
+        clean_up=clean,
+        no_flip=no_flip,
+        long_form=long_form,
+        cache=cache,
+        cache_dir=cache_dir,
+    ):
+        if result.cached is not None:
+            hits += result.cached
+            misses += not result.cached
+
+        if result.error is None:
+            converted += 1
+            click.echo("{} -> {}".format(result.path, result.output))
+        else:
+            failed += 1
+            click.echo("Error: {}: {}".format(result.path, result.error), err=True)
+
+    click.echo("Converted {} template(s), {} failed".format(converted, failed), err=True)
+
+    if cache_stats:
+        from .cache import Cache
+
+        # The lookups were spread over the worker processes
+        totals = Cache(cache_dir)
+        totals.hits, totals.misses = hits, misses
+        report_cache(totals)
+
+    if failed:
+        ctx.exit(1)
+
+
+def report_cache(cache):
+    """
+    Print the cache's hit rate and what it holds
+    """
+
+    entries = list(cache.entries())
+
+    click.echo("Cache: {} hit(s), {} miss(es), {:.0%} hit rate; {} entries, {:.1f} KB in {}".format(
+        cache.hits,
+        cache.misses,
+        cache.hit_rate,
+        len(entries),
+        sum(size for _, size, _ in entries) / 1024.0,
+        cache.directory,
+    ), err=True)
@@ -14,10 +14,12 @@ See the License for the specific language governing permissions and limitations
 
 import six
 
-from cfn_clean.yaml_dumper import CleanCfnYamlDumper
+from cfn_clean.yaml_dumper import CleanCfnCYamlDumper, CleanCfnYamlDumper
 from cfn_tools.literal import LiteralString
 from cfn_tools.odict import ODict
-from cfn_tools.yaml_dumper import CfnYamlDumper
+from cfn_tools.resolver import configured
+from cfn_tools.sharing import SharedODict
+from cfn_tools.yaml_dumper import CfnCYamlDumper, CfnYamlDumper, style_cache
 from cfn_tools._config import config
 
 TAG_STR = "tag:yaml.org,2002:str"
@@ -26,7 +28,8 @@ CONVERTED_SUFFIXES = ["Ref", "Condition"]
 
 FN_PREFIX = "Fn::"
 
-# Maximum length of a string before switching to angle-bracket-style representation
+# Deprecated: the maximum length of a string before switching to angle-bracket-style representation
+# is config.max_col_width, read when each string is dumped; this is only its value at import
 STR_MAX_LENGTH_QUOTED = config.max_col_width
 # Maximum number of newlines a string can have before switching to pipe-style representation
 STR_MAX_LINES_QUOTED = 10
@@ -56,21 +59,56 @@ class LongCleanDumper(CleanCfnYamlDumper):
     """
 
 
+if CfnCYamlDumper is not None:
+    class CDumper(CfnCYamlDumper):
+        """
+        The standard dumper, using libyaml
+        """
+
+    class CCleanDumper(CleanCfnCYamlDumper):
+        """
+        Cleans up strings, using libyaml
+        """
+
+    class CLongDumper(CfnCYamlDumper):
+        """
+        Preserves long-form function syntax, using libyaml
+        """
+
+    class CLongCleanDumper(CleanCfnCYamlDumper):
+        """
+        Preserves long-form function syntax, using libyaml
+        """
+else:
+    # PyYAML was built without libyaml
+    CDumper = CCleanDumper = CLongDumper = CLongCleanDumper = None
+
+
 def literal_unicode_representer(dumper, value):
     return dumper.represent_scalar(TAG_STR, value, style='|')
 
 
-def string_representer(dumper, value):
-    if sum(1 for nl in value if nl in ('\n', '\r')) >= STR_MAX_LINES_QUOTED:
-        return dumper.represent_scalar(TAG_STR, value, style="|")
+def string_style(value):
+    """
+    The style string_representer gives value
+    """
 
-    if len(value) >= STR_MAX_LENGTH_QUOTED and '\n' not in value:
-        return dumper.represent_scalar(TAG_STR, value, style=">")
+    if value.count("\n") + value.count("\r") >= STR_MAX_LINES_QUOTED:
+        return "|"
+
+    if len(value) >= config.max_col_width and '\n' not in value:
+        return ">"
 
     if value.startswith("0"):
-        return dumper.represent_scalar(TAG_STR, value, style="'")
+        return "'"
+
+    return None
 
-    return dumper.represent_scalar(TAG_STR, value)
+
+def string_representer(dumper, value):
+    style = style_cache.fetch(value, ("string", config.max_col_width), string_style, value)
+
+    return dumper.represent_scalar(TAG_STR, value, style=style)
 
 
 def fn_representer(dumper, fn_name, value):
@@ -93,10 +131,8 @@ def map_representer(dumper, value):
     Deal with !Ref style function format and OrderedDict
     """
 
-    value = ODict(value.items())
-
-    if len(value.keys()) == 1:
-        key = list(value.keys())[0]
+    if len(value) == 1:
+        key = next(iter(value))
 
         if key in CONVERTED_SUFFIXES:
             return fn_representer(dumper, key, value[key])
@@ -109,20 +145,43 @@ def map_representer(dumper, value):
 
 # Customise our dumpers
 Dumper.add_representer(ODict, map_representer)
+Dumper.add_representer(SharedODict, map_representer)
 Dumper.add_representer(six.text_type, string_representer)
 Dumper.add_representer(LiteralString, literal_unicode_representer)
 CleanDumper.add_representer(LiteralString, literal_unicode_representer)
 CleanDumper.add_representer(ODict, map_representer)
+CleanDumper.add_representer(SharedODict, map_representer)
+
+if CfnCYamlDumper is not None:
+    CDumper.add_representer(ODict, map_representer)
+    CDumper.add_representer(SharedODict, map_representer)
+    CDumper.add_representer(six.text_type, string_representer)
+    CDumper.add_representer(LiteralString, literal_unicode_representer)
+    CCleanDumper.add_representer(LiteralString, literal_unicode_representer)
+    CCleanDumper.add_representer(ODict, map_representer)
+    CCleanDumper.add_representer(SharedODict, map_representer)
+
+
+def get_dumper(clean_up=False, long_form=False, libyaml=False):
+    """
+    Pick a dumper class, with the implicit resolvers chosen by config.yaml_resolvers
+    With libyaml=True, returns None if PyYAML was built without libyaml
+    """
+
+    if libyaml:
+        dumpers = (CDumper, CCleanDumper, CLongDumper, CLongCleanDumper)
+    else:
+        dumpers = (Dumper, CleanDumper, LongDumper, LongCleanDumper)
 
+    standard, clean, long_, long_clean = dumpers
 
-def get_dumper(clean_up=False, long_form=False):
     if clean_up:
         if long_form:
-            return LongCleanDumper
+            return configured(long_clean)
 
-        return CleanDumper
+        return configured(clean)
 
     if long_form:
-        return LongDumper
+        return configured(long_)
 
-    return Dumper
+    return configured(standard)
@@ -0,0 +1,536 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+import re
+import six
+import yaml
+
+from cfn_tools._config import config
+from cfn_tools.literal import LiteralString
+from cfn_tools.odict import ODict
+from cfn_tools.sharing import SharedList, SharedODict
+from cfn_tools.yaml_dumper import ACCOUNT_ID, style_cache
+from .yaml_dumper import CONVERTED_SUFFIXES, FN_PREFIX, TAG_MAP, TAG_STR, get_dumper, string_style
+
+TAG_SEQ = "tag:yaml.org,2002:seq"
+
+# Printable ASCII without spaces; such a scalar is written in one piece
+SIMPLE_CHARS = re.compile(r"[\x21-\x7E]+\Z")
+# Characters that can't start a plain scalar
+LEADING_INDICATORS = "#,[]{}&*!|>'\"%@`"
+
+# Scalars of these types are left to the dumper's representers
+REPRESENTED_TYPES = (bool, float, type(None)) + six.integer_types
+
+# Marks the end of a mapping's or sequence's items
+END = object()
+
+# How many characters write_to collects before passing them on to its stream
+CHUNK_SIZE = 64 * 1024
+
+
+class Unsupported(Exception):
+    """
+    The data needs something only the PyYAML dumpers can write
+    """
+
+
+def repeats(data):
+    """
+    Does a mapping or sequence appear in data more than once, so the dumper would make it an alias?
+    """
+
+    seen = set()
+    stack = [data]
+
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+
+        if kind is ODict or kind is dict or kind is list:
+            if id(value) in seen:
+                return True
+
+            seen.add(id(value))
+        elif kind is not SharedODict and kind is not SharedList:
+            continue
+
+        stack.extend(value.values() if isinstance(value, dict) else value)
+
+    return False
+
+
+def is_simple_plain(value):
+    """
+    Can value be written as a plain scalar without any analysis?
+    Equivalent to the emitter allowing a plain block scalar with no spaces or line breaks
+    """
+
+    if SIMPLE_CHARS.match(value) is None or value[0] in LEADING_INDICATORS or value[-1] == ":":
+        return False
+
+    if value in ("-", "?"):
+        return False
+
+    return not value.startswith(("---", "..."))
+
+
+class YamlWriter(object):
+    """
+    Write a template as YAML by walking it once
+
+    Applies the same rules as the dumpers from get_dumper() but skips building
+    a node graph and the serializer's search for aliases.
+    The text is written with the dumper's own emitter primitives so that quoting,
+    line wrapping and block scalars come out identically.
+    """
+
+    def __init__(self, clean_up=False, long_form=False, width=None):
+        self.clean_up = clean_up
+        self.long_form = long_form
+        # Only the standard dumper formats strings with cfn_flip's string_representer
+        self.string_representer = not clean_up and not long_form
+        # What string_style depends on besides the string
+        self.flavour = ("writer", clean_up, self.string_representer, config.max_col_width)
+        self.stream = six.StringIO()
+
+        self.emitter = get_dumper(clean_up, long_form)(
+            self.stream,
+            default_flow_style=False,
+            allow_unicode=True,
+            width=width,
+        )
+        self.emitter.tag_prefixes = dict(self.emitter.DEFAULT_TAG_PREFIXES)
+        self.resolvers = self.emitter.yaml_implicit_resolvers
+        self.tags = {}
+        self.seen = set()
+
+        # (items, indent, is a mapping) for each mapping and sequence being written
+        self.stack = []
+
+    def write(self, data):
+        """
+        Return data as YAML, or None when it has to be left to the PyYAML dumpers
+        """
+
+        try:
+            for _ in self.steps(data):
+                pass
+        except Unsupported:
+            return None
+
+        return self.stream.getvalue()
+
+    def write_to(self, data, stream, chunk_size=CHUNK_SIZE):
+        """
+        Write data as YAML to stream, chunk_size characters or so at a time
+
+        Returns None once it's all written. When the rest has to be left to the PyYAML dumpers,
+        returns how many characters were written already; the dumpers start with those same
+        characters, since the only thing that would change what's already written, an alias,
+        is checked for first.
+        """
+
+        if repeats(data):
+            return 0
+
+        buffer = self.stream
+        written = 0
+
+        try:
+            for _ in self.steps(data):
+                if buffer.tell() >= chunk_size:
+                    text = buffer.getvalue()
+                    stream.write(text)
+                    written += len(text)
+                    buffer.seek(0)
+                    buffer.truncate()
+        except Unsupported:
+            return written
+
+        stream.write(buffer.getvalue())
+
+        return None
+
+    def steps(self, data):
+        """
+        Write data to self.stream, yielding after each node
+
+        Raises Unsupported when it has to be left to the PyYAML dumpers.
+        Mappings and sequences are kept on self.stack rather than recursing,
+        so the depth of the data doesn't matter.
+        """
+
+        if not isinstance(data, (dict, list)):
+            raise Unsupported()
+
+        emitter = self.emitter
+        stack = self.stack
+
+        self.node(data, None)
+
+        while stack:
+            yield
+
+            items, indent, mapping = stack[-1]
+            item = next(items, END)
+
+            if item is END:
+                stack.pop()
+                continue
+
+            emitter.indent = indent
+            emitter.write_indent()
+
+            if mapping:
+                key, item = item
+                self.key(key, indent)
+                emitter.indent = indent
+            else:
+                emitter.write_indicator("-", True, indention=True)
+
+            self.node(item, indent)
+
+        emitter.indent = None
+        emitter.write_indent()
+
+        if emitter.open_ended:
+            emitter.write_indicator("...", True)
+            emitter.write_indent()
+
+    def prepare_tag(self, tag):
+        prepared = self.tags.get(tag)
+
+        if prepared is None:
+            prepared = self.tags[tag] = self.emitter.prepare_tag(tag)
+
+        return prepared
+
+    def remember(self, data):
+        """
+        The representer would turn a second occurrence of data into an alias
+        """
+
+        if id(data) in self.seen:
+            raise Unsupported()
+
+        self.seen.add(id(data))
+
+    def string_style(self, value):
+        """
+        The style the dumper's str or LiteralString representer would choose
+        """
+
+        if type(value) is LiteralString:
+            return self.scalar_style(value, "|")
+
+        return style_cache.fetch(value, self.flavour, self.choose_string_style, value)
+
+    def choose_string_style(self, value):
+        if self.string_representer:
+            style = string_style(value)
+        else:
+            style = "\"" if "\n" in value else None
+
+        return self.scalar_style(value, style)
+
+    def scalar_style(self, value, style):
+        """
+        Apply the dumper's represent_scalar overrides
+        """
+
+        if self.clean_up and "\n" in value:
+            style = "|"
+
+        if ACCOUNT_ID.match(value):
+            style = "\'"
+
+        if style is None and ("\n" in value or "\r" in value):
+            style = "\""
+
+        return style
+
+    def represent(self, data):
+        """
+        The tag, value and style of a scalar
+        """
+
+        kind = type(data)
+
+        if kind is six.text_type or kind is LiteralString:
+            return TAG_STR, data, self.string_style(data)
+
+        if kind in REPRESENTED_TYPES:
+            node = self.emitter.represent_data(data)
+            return node.tag, node.value, node.style
+
+        raise Unsupported()
+
+    def resolve(self, value):
+        """
+        The tag a plain scalar would be loaded with
+        """
+
+        if value and value[0] not in self.resolvers:
+            return TAG_STR
+
+        return self.emitter.resolve(yaml.ScalarNode, value, (True, False))
+
+    def node(self, data, indent):
+        kind = type(data)
+
+        # Shared mappings and lists can appear more than once without becoming aliases
+        if kind is ODict or kind is SharedODict:
+            if kind is ODict:
+                self.remember(data)
+
+            if not self.long_form and len(data) == 1:
+                key = next(iter(data))
+
+                if key in CONVERTED_SUFFIXES:
+                    return self.function(key, data[key], indent)
+
+                if not isinstance(key, six.string_types):
+                    raise Unsupported()
+
+                if key.startswith(FN_PREFIX):
+                    return self.function(key[4:], data[key], indent)
+
+            return self.mapping(TAG_MAP, data.items(), indent)
+
+        if kind is dict:
+            self.remember(data)
+            return self.mapping(TAG_MAP, self.sorted_items(data), indent)
+
+        if kind is list:
+            self.remember(data)
+            return self.sequence(TAG_SEQ, data, indent)
+
+        if kind is SharedList:
+            return self.sequence(TAG_SEQ, data, indent)
+
+        tag, value, style = self.represent(data)
+
+        return self.scalar(tag, value, style, indent)
+
+    def sorted_items(self, mapping):
+        items = list(mapping.items())
+
+        try:
+            return sorted(items)
+        except TypeError:
+            return items
+
+    def function(self, name, value, indent):
+        """
+        The short form of a single-key function mapping, as in fn_representer
+        """
+
+        tag = "!{}".format(name)
+
+        if tag == "!GetAtt" and isinstance(value, list):
+            if not all(isinstance(part, six.string_types) for part in value):
+                raise Unsupported()
+
+            value = ".".join(value)
+
+        if isinstance(value, list):
+            return self.sequence(tag, value, indent)
+
+        if isinstance(value, dict):
+            items = value.items() if isinstance(value, ODict) else self.sorted_items(value)
+            return self.mapping(tag, items, indent)
+
+        if not isinstance(value, six.text_type):
+            raise Unsupported()
+
+        return self.scalar(tag, value, self.scalar_style(value, None), indent)
+
+    def mapping(self, tag, items, indent):
+        emitter = self.emitter
+
+        if tag != TAG_MAP:
+            emitter.write_indicator(self.prepare_tag(tag), True)
+
+        if not items:
+            emitter.write_indicator("{", True, whitespace=True)
+            emitter.write_indicator("}", False)
+            return
+
+        self.stack.append((iter(items), 0 if indent is None else indent + 2, True))
+
+    def key(self, key, indent):
+        emitter = self.emitter
+        tag, value, style = self.represent(key)
+
+        if style is None and len(self.prepare_tag(tag)) + len(value) < 128:
+            # The tag counts towards the length limit of simple keys even when it isn't written
+            if self.scalar(tag, value, style, indent, simple_key=True):
+                emitter.write_indicator(":", False)
+                return
+
+        analysis = emitter.analyze_scalar(value)
+        length = len(self.prepare_tag(tag)) + len(analysis.scalar)
+
+        if length < 128 and not analysis.empty and not analysis.multiline:
+            self.scalar(tag, value, style, indent, analysis, simple_key=True, fast=False)
+            emitter.write_indicator(":", False)
+            return
+
+        emitter.write_indicator("?", True, indention=True)
+        self.scalar(tag, value, style, indent, analysis, fast=False)
+        emitter.indent = indent
+        emitter.write_indent()
+        emitter.write_indicator(":", True, indention=True)
+
+    def sequence(self, tag, items, indent):
+        emitter = self.emitter
+
+        if tag != TAG_SEQ:
+            emitter.write_indicator(self.prepare_tag(tag), True)
+
+        if not items:
+            emitter.write_indicator("[", True, whitespace=True)
+            emitter.write_indicator("]", False)
+            return
+
+        self.stack.append((iter(items), 0 if indent is None else indent + 2, False))
+
+    def scalar(self, tag, value, style, indent, analysis=None, simple_key=False, fast=True):
+        """
+        Write a scalar the way the emitter would for an equivalent ScalarEvent
+
+        With fast=True, returns False without writing anything if the scalar
+        isn't a plain one that can be written directly.
+        """
+
+        if indent is None:
+            # A document that's just a scalar
+            raise Unsupported()
+
+        emitter = self.emitter
+        implicit = (tag == self.resolve(value), tag == TAG_STR)
+
+        if fast and style is None and implicit[0] and type(value) is six.text_type and is_simple_plain(value):
+            # What write_plain does with a value that has no spaces or line breaks
+            if not emitter.whitespace:
+                self.stream.write(" ")
+                emitter.column += 1
+
+            self.stream.write(value)
+            emitter.column += len(value)
+            emitter.whitespace = False
+            emitter.indention = False
+            return True
+
+        if simple_key and fast:
+            return False
+
+        if analysis is None:
+            analysis = emitter.analyze_scalar(value)
+
+        chosen = self.choose_style(style, implicit, analysis, simple_key)
+
+        if not ((chosen == "" and implicit[0]) or (chosen != "" and implicit[1])):
+            emitter.write_indicator(self.prepare_tag(tag), True)
+
+        emitter.indent = indent + 2
+        split = not simple_key
+
+        if chosen == "\"":
+            emitter.write_double_quoted(analysis.scalar, split)
+        elif chosen == "\'":
+            emitter.write_single_quoted(analysis.scalar, split)
+        elif chosen == ">":
+            emitter.write_folded(analysis.scalar)
+        elif chosen == "|":
+            emitter.write_literal(analysis.scalar)
+        else:
+            emitter.write_plain(analysis.scalar, split)
+
+        return True
+
+    def choose_style(self, style, implicit, analysis, simple_key):
+        """
+        Emitter.choose_scalar_style for block context
+        """
+
+        if style == "\"":
+            return "\""
+
+        if not style and implicit[0]:
+            if not (simple_key and (analysis.empty or analysis.multiline)) and analysis.allow_block_plain:
+                return ""
+
+        if style and style in "|>":
+            if not simple_key and analysis.allow_block:
+                return style
+
+        if not style or style == "\'":
+            if analysis.allow_single_quoted and not (simple_key and analysis.multiline):
+                return "\'"
+
+        return "\""
+
+
+def write_yaml(data, clean_up=False, long_form=False, width=None):
+    """
+    Dump data as the dumper from get_dumper(clean_up, long_form) would,
+    with default_flow_style=False and allow_unicode=True
+
+    Returns None when the output can't be guaranteed identical,
+    in which case the caller should use the dumper instead.
+    """
+
+    return YamlWriter(clean_up, long_form, width).write(data)
+
+
+class Remainder(object):
+    """
+    Passes on what's written to it except for the first skip characters,
+    which YamlWriter.write_to has written to stream already
+    """
+
+    def __init__(self, stream, skip):
+        self.stream = stream
+        self.skip = skip
+
+    def write(self, text):
+        if self.skip:
+            if len(text) <= self.skip:
+                self.skip -= len(text)
+                return
+
+            text = text[self.skip:]
+            self.skip = 0
+
+        self.stream.write(text)
+
+    def flush(self):
+        # The dumpers flush once they're done, as they would the stream itself
+        flush = getattr(self.stream, "flush", None)
+
+        if flush is not None:
+            flush()
+
+
+def stream_yaml(data, stream, clean_up=False, long_form=False, width=None):
+    """
+    Write what write_yaml returns to stream as it's made
+
+    Returns None once it's all written, or how much was written when the caller should
+    have the dumper write the rest; see YamlWriter.write_to.
+    """
+
+    return YamlWriter(clean_up, long_form, width).write_to(data, stream)
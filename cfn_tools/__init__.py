@@ -8,26 +8,146 @@ Licensed under the Apache License, Version 2.0 (the "License"). You may not use
 or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 """
 
-from .json_encoder import DateTimeAwareJsonEncoder
+from ._lazy import lazy_attributes
+from .json_encoder import DateTimeAwareJsonEncoder, indent_json, iterdump, iterencode
 from .odict import ODict
-from .yaml_dumper import CfnYamlDumper
-from .yaml_loader import CfnYamlLoader
+from .summary import Summary, json_hook, summarize  # noqa: F401 Summary is part of the API
 import json
-import yaml
+import six
 
+# PyYAML is only imported once some YAML is read or written
+lazy_attributes(globals(), {
+    "CfnYamlDumper": ".yaml_dumper",
+    "CfnYamlLoader": ".yaml_loader",
+    "TemplateFile": ".buffers",
+    "analysis_cache": ".yaml_dumper",
+    "get_loader": ".yaml_loader",
+    "style_cache": ".yaml_dumper",
+})
 
-def load_json(source):
-    return json.loads(source, object_pairs_hook=ODict)
 
+def finish(steps):
+    """
+    Run a generator of steps to the end and return its result
+    """
 
-def dump_json(source):
-    return json.dumps(source, indent=4, cls=DateTimeAwareJsonEncoder,
-                      separators=(',', ': '), ensure_ascii=False)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        return e.value
 
 
-def load_yaml(source):
-    return yaml.load(source, Loader=CfnYamlLoader)
+def load_json(source, summary=None, share=False):
+    """
+    source may be text or a buffer, such as bytes or a memory-mapped file
+    If a Summary is given, what's loaded is recorded in it
+    With share=True, scalars are interned and identical mappings and lists are shared
+    """
+
+    if not isinstance(source, (six.text_type, bytes, bytearray)):
+        # The json module only reads text, bytes and bytearrays
+        from .buffers import decode
+
+        source = decode(source)
+
+    try:
+        if share:
+            from .sharing import Sharer
+
+            hook, finish_sharing = Sharer().json_hook()
+            data = finish_sharing(json.loads(source, object_pairs_hook=hook))
+
+            if summary is not None:
+                summarize(data, summary)
+
+            return data
+
+        if summary is None:
+            return json.loads(source, object_pairs_hook=ODict)
+
+        hook, finish_summary = json_hook(summary)
+
+        return finish_summary(json.loads(source, object_pairs_hook=hook))
+    except RecursionError:
+        # Nested too deeply for the json module
+        from .json_tokenizer import build_steps
+
+        if not isinstance(source, six.text_type):
+            source = source.decode(json.detect_encoding(source), "surrogatepass")
+
+        data = finish(build_steps(source))
+
+        if summary is not None:
+            summary.clear()
+            summarize(data, summary)
+
+        return data
+
+
+def dump_json(source, stream=None):
+    """
+    Return source as JSON or, if a stream is given, write it there as it's made
+    """
+
+    if stream is not None:
+        for piece in iterdump(source):
+            stream.write(piece)
+
+        return None
+
+    try:
+        # Without indent, json.dumps can use its C encoder
+        return indent_json(json.dumps(source, cls=DateTimeAwareJsonEncoder,
+                                      separators=(',', ': '), ensure_ascii=False))
+    except RecursionError:
+        # Nested too deeply for the json module
+        return "".join(iterencode(source))
+
+
+def load_yaml(source, summary=None, share=False):
+    """
+    source may be text, a buffer, such as bytes or a memory-mapped file, or a stream
+    If a Summary is given, what's loaded is recorded in it
+    With share=True, scalars are interned and identical mappings and lists are shared,
+    except in documents that only the loader itself can build
+    """
+
+    from .buffers import BUFFER_TYPES, readable
+    from .resolver import configured
+    from .sharing import Sharer
+    from .yaml_loader import CfnYamlLoader, build_steps, get_loader
+    import yaml
+
+    if isinstance(source, (six.text_type,) + BUFFER_TYPES):
+        try:
+            return finish(build_steps(source, summary, Sharer() if share else None))
+        except Exception:
+            # Anything out of the ordinary, errors included, is left to the loader
+            pass
+
+    loader = get_loader(source)
+    python_loader = configured(CfnYamlLoader)
+
+    try:
+        data = yaml.load(readable(source, loader), Loader=loader)
+    except yaml.YAMLError:
+        if loader is python_loader:
+            raise
+
+        # libyaml's error messages are terser, so report the pure-Python ones
+        data = yaml.load(readable(source, python_loader), Loader=python_loader)
+
+    if summary is not None:
+        summary.clear()
+        summarize(data, summary)
+
+    return data
 
 
 def dump_yaml(source):
-    return yaml.dump(source, Dumper=CfnYamlDumper, default_flow_style=False, allow_unicode=True, width=120)
+    from .resolver import configured
+    from .yaml_dumper import CfnYamlDumper
+    import yaml
+
+    return yaml.dump(source, Dumper=configured(CfnYamlDumper), default_flow_style=False, allow_unicode=True, width=120)
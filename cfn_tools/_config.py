@@ -1,12 +1,8 @@
 """Configuration file for cfn_flip."""
 
-import inspect
-import logging
 import os
 from typing import Any, Dict, NamedTuple, Optional, Type
 
-_logger: logging.Logger = logging.getLogger(__name__)
-
 
 class _ConfigArg(NamedTuple):
     dtype: Type
@@ -16,7 +12,8 @@ class _ConfigArg(NamedTuple):
 
 
 _CONFIG_DEFAULTS: Dict[str, _ConfigArg] = {
-    "max_col_width": _ConfigArg(dtype=int, nullable=False, has_default=True, default=200)}
+    "max_col_width": _ConfigArg(dtype=int, nullable=False, has_default=True, default=200),
+    "yaml_resolvers": _ConfigArg(dtype=str, nullable=False, has_default=True, default="yaml")}
 
 
 class _Config:
@@ -79,10 +76,11 @@ class _Config:
         """
         if item is None:
             for name, conf in _CONFIG_DEFAULTS.items():
-                delattr(self, f"_{name}")
+                # Gone already if loading it last time failed
+                self.__dict__.pop(f"_{name}", None)
                 self._load_config(name=name, conf=conf)
         else:
-            delattr(self, f"_{item}")
+            self.__dict__.pop(f"_{item}", None)
             self._load_config(name=item, conf=_CONFIG_DEFAULTS[item])
 
     @staticmethod
@@ -108,6 +106,9 @@ class _Config:
 
 def apply_configs(function):
     """Decorate some function with configs."""
+    # inspect is slow to import and only needed here
+    import inspect
+
     signature = inspect.signature(function)
     args_names = list(signature.parameters.keys())
     valid_configs = [x for x in _CONFIG_DEFAULTS if x in args_names]
@@ -0,0 +1,43 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Attributes of a package that are only imported when first used
+"""
+
+import importlib
+import sys
+
+
+def lazy_attributes(namespace, attributes):
+    """
+    Give the module with the namespace globals a __getattr__ that imports attributes on first use
+
+    attributes maps each name to the module it comes from, which may be relative to the package.
+    Python before 3.7 ignores a module's __getattr__, so there they are imported straight away.
+    """
+
+    package = namespace["__package__"] or namespace["__name__"]
+
+    def __getattr__(name):
+        if name not in attributes:
+            raise AttributeError("module {!r} has no attribute {!r}".format(namespace["__name__"], name))
+
+        value = getattr(importlib.import_module(attributes[name], package), name)
+        namespace[name] = value
+
+        return value
+
+    if sys.version_info < (3, 7):
+        for name in attributes:
+            __getattr__(name)
+
+    namespace["__getattr__"] = __getattr__
@@ -0,0 +1,185 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Templates given as bytes, memoryviews, memory maps or paths rather than text
+
+Reading a template as text decodes all of it into a str before parsing starts, and libyaml
+then encodes that str back to UTF-8 to parse it. Given the bytes instead, libyaml parses them
+as they are, reading a memory-mapped file a chunk at a time, and the json module, which needs
+a str, has them decoded in one pass. TemplateFile memory-maps big template files, and lets go
+of each page of the map once it's been read, so that the file doesn't stay in memory as well.
+"""
+
+import codecs
+import json
+import mmap
+import os
+import re
+import stat
+
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+# Template files at least this big are memory-mapped rather than read
+MMAP_SIZE = 1024 * 1024
+
+# How much of a template is decoded to sniff its format
+SNIFF_SIZE = 4096
+
+# sniff_format looks no further than this many characters past the first that isn't whitespace,
+# unless they're all that's there
+SNIFF_CHARS = 8
+
+NOT_BLANK = re.compile(r"[^\s\ufeff]")
+
+
+def detect_encoding(template):
+    """
+    The encoding of a template given as a buffer: UTF-8, or UTF-16 or UTF-32 by their byte order marks
+    or the zero bytes around ASCII characters
+    """
+
+    return json.detect_encoding(bytes(template[:4]))
+
+
+def decode(template):
+    """
+    The text of a template given as a buffer, decoded in one pass
+    """
+
+    text = str(template, detect_encoding(template), "surrogatepass")
+
+    if isinstance(template, TemplateMap):
+        template.release(len(template))
+
+    return text
+
+
+def head(template):
+    """
+    Enough of the start of a template given as a buffer, decoded, for sniff_format to tell
+    what it is; all of it when the first SNIFF_SIZE bytes are little more than whitespace
+    """
+
+    if len(template) <= SNIFF_SIZE:
+        return decode(template)
+
+    decoder = codecs.getincrementaldecoder(detect_encoding(template))("replace")
+    text = decoder.decode(bytes(template[:SNIFF_SIZE]))
+
+    if len(NOT_BLANK.findall(text)) > SNIFF_CHARS:
+        return text
+
+    return decode(template)
+
+
+class BufferReader(object):
+    """
+    Reads a buffer as a binary file would, so that the YAML parsers take it a chunk at a time
+    """
+
+    def __init__(self, buffer, name="<byte string>"):
+        if isinstance(buffer, memoryview):
+            buffer = buffer.cast("B")
+
+        self.buffer = buffer
+        self.name = name
+        self.position = 0
+
+    def read(self, size=-1):
+        end = len(self.buffer) if size < 0 else self.position + size
+        chunk = bytes(self.buffer[self.position:end])
+        self.position += len(chunk)
+
+        if isinstance(self.buffer, TemplateMap):
+            self.buffer.release(self.position)
+
+        return chunk
+
+
+def readable(template, loader):
+    """
+    What the loader class should be given for template: itself if it's text or bytes,
+    which the parsers take as they are, otherwise a BufferReader for libyaml, or the
+    decoded text for the pure-Python parser so that its error messages can quote it
+    """
+
+    if not isinstance(template, BUFFER_TYPES) or isinstance(template, bytes):
+        return template
+
+    import yaml
+
+    if issubclass(loader, getattr(yaml, "CParser", ())):
+        return BufferReader(template)
+
+    return decode(template)
+
+
+class TemplateMap(mmap.mmap):
+    """
+    A read-only memory map of a template file, whose pages can be let go once they've been read
+    """
+
+    released = 0
+
+    def release(self, end):
+        """
+        Let go of the whole pages before end; they're read from the file again if they're needed
+        """
+
+        end -= end % mmap.PAGESIZE
+
+        # madvise is only on Unix
+        if end > self.released and hasattr(self, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+            self.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+            self.released = end
+
+
+class TemplateFile(object):
+    """
+    The contents of a template file, given its path or a binary file object, as a context manager:
+    a read-only TemplateMap of the file if it's a regular file of at least MMAP_SIZE bytes,
+    otherwise its bytes. The memory map is closed on leaving the context.
+    """
+
+    def __init__(self, source, mmap_size=MMAP_SIZE):
+        self.source = source
+        self.mmap_size = mmap_size
+        self.map = None
+
+    def __enter__(self):
+        if isinstance(self.source, (str, bytes, os.PathLike)):
+            with open(self.source, "rb") as f:
+                return self.read(f)
+
+        return self.read(self.source)
+
+    def __exit__(self, *exc_info):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def read(self, f):
+        # A text file, such as sys.stdin, is read through its binary buffer where it has one
+        f = getattr(f, "buffer", f)
+
+        try:
+            fileno = f.fileno()
+            info = os.fstat(fileno)
+            mappable = stat.S_ISREG(info.st_mode) and info.st_size >= self.mmap_size and f.tell() == 0
+        except (AttributeError, OSError, ValueError):
+            mappable = False
+
+        if mappable:
+            self.map = TemplateMap(fileno, 0, access=mmap.ACCESS_READ)
+            return self.map
+
+        return f.read()
@@ -0,0 +1,37 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
+"""
+
+# Characters to collect before writing to the output
+CHUNK_SIZE = 64 * 1024
+
+
+class ChunkedWriter(object):
+    """
+    Collect many small writes into fewer large ones
+    """
+
+    def __init__(self, output, chunk_size=CHUNK_SIZE):
+        self.output = output
+        self.chunk_size = chunk_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.output.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
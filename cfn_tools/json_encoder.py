@@ -8,8 +8,20 @@ Licensed under the Apache License, Version 2.0 (the "License"). You may not use
 or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 """
 
+from .odict import ODict
 from datetime import date, datetime, time
+from json.encoder import encode_basestring, INFINITY
 import json
+import re
+
+INDENT = " " * 4
+
+# iterdump walks this many levels itself and encodes what's below them in chunks of up to CHUNK_ITEMS values
+STREAM_DEPTH = 2
+CHUNK_ITEMS = 100
+
+# A complete JSON string, used to split text whose strings contain escaped quotes
+STRING = re.compile(r'("[^"\\]*(?:\\.[^"\\]*)*")')
 
 
 class DateTimeAwareJsonEncoder(json.JSONEncoder):
@@ -18,3 +30,281 @@ class DateTimeAwareJsonEncoder(json.JSONEncoder):
             return obj.isoformat()
 
         return json.JSONEncoder.default(self, obj)
+
+
+def layout(segment, depth):
+    """
+    Break and indent the brackets and commas in text found between two strings
+    Returns the new text and the depth at its end
+    """
+
+    output = []
+    index = 0
+
+    while index < len(segment):
+        char = segment[index]
+
+        if char in "{[":
+            if segment[index + 1:index + 2] in ("}", "]"):
+                # Empty objects and arrays stay as they are
+                output.append(segment[index:index + 2])
+                index += 2
+                continue
+
+            depth += 1
+            output.append(char + "\n" + INDENT * depth)
+        elif char in "}]":
+            depth -= 1
+            output.append("\n" + INDENT * depth + char)
+        elif char == ",":
+            output.append(",\n" + INDENT * depth)
+        else:
+            output.append(char)
+
+        index += 1
+
+    return "".join(output), depth
+
+
+def indent_json(text, depth=0, caches=None):
+    """
+    Indent compact JSON (as written with separators=(',', ': ')) by four spaces,
+    giving the same text as json.dumps with indent=4
+
+    Everything between two strings is one of a few short pieces of punctuation,
+    so each distinct piece is only laid out once per depth. With depth, the text
+    is laid out as if nested that deeply; caches, a list, keeps the layouts for
+    the next call.
+    """
+
+    if '\\"' in text:
+        # Some quotes are escaped, so find the strings properly
+        parts = STRING.split(text)
+        quote = ""
+    else:
+        parts = text.split('"')
+        quote = '"'
+
+    segments = parts[::2]
+
+    if caches is None:
+        caches = []
+
+    while len(caches) <= depth:
+        caches.append({})
+
+    cache = caches[depth]
+
+    for index, segment in enumerate(segments):
+        if segment == ": ":
+            continue
+
+        laid_out = cache.get(segment)
+
+        if laid_out is None:
+            laid_out = cache[segment] = layout(segment, depth)
+
+        segments[index], end = laid_out
+
+        if end != depth:
+            depth = end
+
+            while len(caches) <= depth:
+                caches.append({})
+
+            cache = caches[depth]
+
+    parts[::2] = segments
+
+    return quote.join(parts)
+
+
+# Marks the end of a list's or dict's items
+END = object()
+
+
+def encode_float(value):
+    if value != value:
+        return "NaN"
+
+    if value == INFINITY:
+        return "Infinity"
+
+    if value == -INFINITY:
+        return "-Infinity"
+
+    return float.__repr__(value)
+
+
+def encode_key(key):
+    """
+    A dict key as json.dumps writes it
+    """
+
+    if isinstance(key, str):
+        pass
+    elif isinstance(key, float):
+        key = encode_float(key)
+    elif key is True:
+        key = "true"
+    elif key is False:
+        key = "false"
+    elif key is None:
+        key = "null"
+    elif isinstance(key, int):
+        key = int.__repr__(key)
+    else:
+        raise TypeError("keys must be str, int, float, bool or None, not {}".format(key.__class__.__name__))
+
+    return encode_basestring(key)
+
+
+def iterencode(data, indent=INDENT, depth=0):
+    """
+    Yield the text of data as json.dumps(data, indent=indent, cls=DateTimeAwareJsonEncoder,
+    separators=(',', ': '), ensure_ascii=False) would write it, a value at a time,
+    or as it would be laid out nested depth deep
+
+    Lists and dicts are kept on a stack rather than recursing,
+    so there's no limit to how deeply data can be nested.
+    """
+
+    default = DateTimeAwareJsonEncoder().default
+    markers = set()
+
+    # [items, whether they're a dict's, id, what comes before the next item] for each list and dict
+    # being written, or [None, None, id, None] for an object being written as its default() value
+    stack = []
+    value = data
+
+    while True:
+        if isinstance(value, str):
+            yield encode_basestring(value)
+        elif value is None:
+            yield "null"
+        elif value is True:
+            yield "true"
+        elif value is False:
+            yield "false"
+        elif isinstance(value, int):
+            yield int.__repr__(value)
+        elif isinstance(value, float):
+            yield encode_float(value)
+        else:
+            mapping = isinstance(value, dict)
+            marker = id(value)
+
+            if marker in markers:
+                raise ValueError("Circular reference detected")
+
+            if not mapping and not isinstance(value, (list, tuple)):
+                markers.add(marker)
+                stack.append([None, None, marker, None])
+                value = default(value)
+                continue
+
+            if not value:
+                yield "{}" if mapping else "[]"
+            else:
+                markers.add(marker)
+                newline = "\n" + indent * (depth + len(stack) + 1) if indent else ""
+                stack.append([iter(value.items()) if mapping else iter(value), mapping, marker, ""])
+                yield ("{" if mapping else "[") + newline
+
+        # Find the next value to write
+        while stack:
+            frame = stack[-1]
+            items = frame[0]
+
+            if items is None:
+                # Finished writing an object's default() value
+                markers.discard(frame[2])
+                stack.pop()
+                continue
+
+            item = next(items, END)
+
+            if item is END:
+                markers.discard(frame[2])
+                stack.pop()
+                newline = "\n" + indent * (depth + len(stack)) if indent else ""
+                yield newline + ("}" if frame[1] else "]")
+                continue
+
+            if not frame[3]:
+                frame[3] = ",\n" + indent * (depth + len(stack)) if indent else ","
+                separator = ""
+            else:
+                separator = frame[3]
+
+            if frame[1]:
+                key, value = item
+                yield separator + encode_key(key) + ": "
+            else:
+                value = item
+
+                if separator:
+                    yield separator
+
+            break
+        else:
+            return
+
+
+def iterdump(data, chunk_items=CHUNK_ITEMS):
+    """
+    Yield the text dump_json returns for data a piece at a time, so it can be written as it's made
+
+    The first STREAM_DEPTH levels of lists and dicts are walked here. What's below them is encoded
+    up to chunk_items values at a time by the json module's C encoder and indented by indent_json,
+    or by iterencode when it's nested too deeply for the json module.
+    """
+
+    encode = DateTimeAwareJsonEncoder(separators=(",", ": "), ensure_ascii=False).encode
+    caches = []
+
+    def text(value, depth):
+        try:
+            return indent_json(encode(value), depth, caches)
+        except RecursionError:
+            return "".join(iterencode(value, depth=depth))
+
+    def walk(value, depth):
+        if not isinstance(value, (dict, list, tuple)) or not value:
+            yield text(value, depth)
+            return
+
+        mapping = isinstance(value, dict)
+        newline = "\n" + INDENT * (depth + 1)
+        yield ("{" if mapping else "[") + newline
+
+        items = iter(value.items() if mapping else value)
+        separator = ""
+
+        if depth + 1 < STREAM_DEPTH:
+            for item in items:
+                if mapping:
+                    key, item = item
+                    yield separator + encode_key(key) + ": "
+                elif separator:
+                    yield separator
+
+                for piece in walk(item, depth + 1):
+                    yield piece
+
+                separator = "," + newline
+        else:
+            while True:
+                chunk = [item for _, item in zip(range(chunk_items), items)]
+
+                if not chunk:
+                    break
+
+                # A list or dict of just these items, without its brackets and the line breaks next to them
+                laid_out = text(ODict(chunk) if mapping else chunk, depth)
+                yield separator + laid_out[len(newline) + 1:-len(INDENT) * depth - 2]
+                separator = "," + newline
+
+        yield "\n" + INDENT * depth + ("}" if mapping else "]")
+
+    return walk(data, 0)
@@ -0,0 +1,296 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from json import JSONDecodeError
+from json.decoder import scanstring
+from json.scanner import NUMBER_RE
+import re
+import six
+
+from .chunked_writer import CHUNK_SIZE
+from .odict import ODict
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+CONSTANTS = (
+    ("true", True),
+    ("false", False),
+    ("null", None),
+    ("NaN", float("nan")),
+    ("Infinity", float("inf")),
+    ("-Infinity", float("-inf")),
+)
+
+# Tokens
+MAP_START = 0
+MAP_END = 1
+SEQ_START = 2
+SEQ_END = 3
+KEY = 4
+SCALAR = 5
+
+# Tokenizer states
+VALUE = 0
+VALUE_OR_END = 1
+KEY_OR_END = 2
+NEXT_KEY = 3
+AFTER_VALUE = 4
+
+
+class JsonTokenizer(object):
+    """
+    Split JSON from a string or file into tokens without decoding it all at once
+    """
+
+    def __init__(self, source, chunk_size=CHUNK_SIZE):
+        if isinstance(source, six.string_types):
+            self.source = None
+            self.buffer = source
+        else:
+            self.source = source
+            self.buffer = ""
+
+        self.chunk_size = chunk_size
+        self.pos = 0
+        # Position of the buffer within the whole document, for error messages
+        self.offset = 0
+        self.lines = 0
+        self.line_start = 0
+
+    def read_more(self):
+        """
+        Add the next chunk of the source to the buffer
+        """
+
+        if self.source is None:
+            return False
+
+        data = self.source.read(self.chunk_size)
+
+        if not data:
+            self.source = None
+            return False
+
+        if self.pos:
+            consumed = self.buffer[:self.pos]
+            newlines = consumed.count("\n")
+
+            if newlines:
+                self.lines += newlines
+                self.line_start = self.offset + consumed.rindex("\n") + 1
+
+            self.offset += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+
+        self.buffer += data
+
+        return True
+
+    def error(self, message, pos):
+        """
+        A JSONDecodeError describing a position in the buffer
+        """
+
+        error = JSONDecodeError(message, self.buffer, pos)
+
+        if self.offset:
+            error.pos = self.offset + pos
+
+            if error.lineno == 1:
+                error.colno = error.pos - self.line_start + 1
+
+            error.lineno += self.lines
+            error.args = ("{}: line {} column {} (char {})".format(message, error.lineno, error.colno, error.pos),)
+
+        return error
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or "" at the end
+        """
+
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self.read_more():
+                return ""
+
+    def string(self):
+        while True:
+            try:
+                value, end = scanstring(self.buffer, self.pos + 1)
+                break
+            except JSONDecodeError as e:
+                # The string may continue in the next chunk
+                if not self.read_more():
+                    raise self.error(e.msg, e.pos)
+
+        self.pos = end
+
+        return value
+
+    def number(self):
+        while True:
+            match = NUMBER_RE.match(self.buffer, self.pos)
+
+            if match is None or match.end() < len(self.buffer) or not self.read_more():
+                break
+
+        if match is None:
+            return None
+
+        integer, frac, exp = match.groups()
+        self.pos = match.end()
+
+        if frac or exp:
+            return float(integer + (frac or "") + (exp or ""))
+
+        return int(integer)
+
+    def constant(self):
+        while len(self.buffer) - self.pos < len("-Infinity") and self.read_more():
+            pass
+
+        for name, value in CONSTANTS:
+            if self.buffer.startswith(name, self.pos):
+                self.pos += len(name)
+                return True, value
+
+        return False, None
+
+    def scalar(self):
+        char = self.buffer[self.pos]
+
+        if char == '"':
+            return self.string()
+
+        found, value = self.constant()
+
+        if found:
+            return value
+
+        if char == "-" or char.isdigit():
+            value = self.number()
+
+            if value is not None:
+                return value
+
+        raise self.error("Expecting value", self.pos)
+
+    def __iter__(self):
+        stack = []  # True for objects, False for arrays
+        state = VALUE
+
+        while True:
+            char = self.peek()
+
+            if state == AFTER_VALUE:
+                if not stack:
+                    if char:
+                        raise self.error("Extra data", self.pos)
+                    return
+
+                if char == ",":
+                    self.pos += 1
+                    state = NEXT_KEY if stack[-1] else VALUE
+                elif char == ("}" if stack[-1] else "]"):
+                    self.pos += 1
+                    yield (MAP_END if stack.pop() else SEQ_END), None
+                else:
+                    raise self.error("Expecting ',' delimiter", self.pos)
+
+            elif state in (VALUE, VALUE_OR_END):
+                if state == VALUE_OR_END and char == "]":
+                    self.pos += 1
+                    stack.pop()
+                    yield SEQ_END, None
+                    state = AFTER_VALUE
+                elif char == "{":
+                    self.pos += 1
+                    stack.append(True)
+                    yield MAP_START, None
+                    state = KEY_OR_END
+                elif char == "[":
+                    self.pos += 1
+                    stack.append(False)
+                    yield SEQ_START, None
+                    state = VALUE_OR_END
+                elif not char:
+                    raise self.error("Expecting value", self.pos)
+                else:
+                    yield SCALAR, self.scalar()
+                    state = AFTER_VALUE
+
+            else:
+                if state == KEY_OR_END and char == "}":
+                    self.pos += 1
+                    stack.pop()
+                    yield MAP_END, None
+                    state = AFTER_VALUE
+                    continue
+
+                if char != '"':
+                    raise self.error("Expecting property name enclosed in double quotes", self.pos)
+
+                key = self.string()
+
+                if self.peek() != ":":
+                    raise self.error("Expecting ':' delimiter", self.pos)
+
+                self.pos += 1
+                yield KEY, key
+                state = VALUE
+
+
+def build_steps(source):
+    """
+    Build the data from a JSON string or file, yielding after each value
+
+    Objects and arrays are kept on a stack rather than recursing,
+    so there's no limit to how deeply they can be nested.
+    """
+
+    data = None
+
+    # [container, key] for each object and array being built
+    stack = []
+
+    for token, value in JsonTokenizer(source):
+        if token == KEY:
+            stack[-1][1] = value
+            continue
+
+        if token == MAP_START:
+            stack.append([ODict(), None])
+            continue
+
+        if token == SEQ_START:
+            stack.append([[], None])
+            continue
+
+        if token != SCALAR:
+            value = stack.pop()[0]
+
+        if not stack:
+            data = value
+        else:
+            container, key = stack[-1]
+
+            if key is None:
+                container.append(value)
+            else:
+                container[key] = value
+
+        yield
+
+    return data
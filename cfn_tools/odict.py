@@ -8,42 +8,26 @@ Licensed under the Apache License, Version 2.0 (the "License"). You may not use
 or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 """
 
-import collections
-
 
 class OdictItems(list):
     """
-    Helper class to ensure ordering is preserved
+    A list that ignores attempts to sort it in place
     """
 
-    def __init__(self, items):
-        new_items = []
-
-        for item in items:
-            class C(type(item)):
-                def __lt__(self, *args, **kwargs):
-                    return False
-
-            new_items.append(C(item))
-
-        return super(OdictItems, self).__init__(new_items)
-
-    def sort(self):
+    def sort(self, *args, **kwargs):
         pass
 
 
-class ODict(collections.OrderedDict):
+class ODict(dict):
     """
-    A wrapper for OrderedDict that doesn't allow sorting of keys
+    A dict that keeps its keys in insertion order when dumped
+
+    The cfn_tools dumpers write ODicts in order rather than sorting their keys.
     """
 
-    def __init__(self, pairs=[]):
+    def __init__(self, pairs=()):
         if isinstance(pairs, dict):
             # Dicts lose ordering in python<3.6 so disallow them
             raise Exception("ODict does not allow construction from a dict")
 
-        super(ODict, self).__init__(pairs)
-
-    def items(self):
-        old_items = super(ODict, self).items()
-        return OdictItems(old_items)
+        dict.__init__(self, pairs)
@@ -0,0 +1,159 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Implicit resolvers tuned for CloudFormation
+
+PyYAML tries every resolver registered for a plain scalar's first character in turn,
+each with a pattern covering every way its type can be written. This table has one
+pattern for each first character holding only the alternatives that can start with it,
+so a scalar takes a single match. Booleans, numbers and nulls resolve exactly as they
+do with the SafeLoader; CloudFormation has no timestamps, so those are left as the
+strings they were written as instead of becoming dates.
+"""
+
+from ._config import config
+from yaml.nodes import ScalarNode
+import re
+
+TAG_PREFIX = "tag:yaml.org,2002:"
+TAG_STR = TAG_PREFIX + "str"
+
+DIGITS = "0123456789"
+SIGNED = "-+" + DIGITS
+
+# (tag, the characters it can start with, pattern) for each alternative
+# of each SafeLoader resolver but timestamp, in the order the SafeLoader tries them
+ALTERNATIVES = [
+    ("bool", "yY", r"yes|Yes|YES"),
+    ("bool", "nN", r"no|No|NO"),
+    ("bool", "tT", r"true|True|TRUE"),
+    ("bool", "fF", r"false|False|FALSE"),
+    ("bool", "oO", r"on|On|ON|off|Off|OFF"),
+    ("float", SIGNED, r"[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+][0-9]+)?"),
+    ("float", ".", r"\.[0-9][0-9_]*(?:[eE][-+][0-9]+)?"),
+    ("float", SIGNED, r"[-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+\.[0-9_]*"),
+    ("float", "-+.", r"[-+]?\.(?:inf|Inf|INF)"),
+    ("float", ".", r"\.(?:nan|NaN|NAN)"),
+    ("int", "-+0", r"[-+]?0b[0-1_]+"),
+    ("int", "-+0", r"[-+]?0[0-7_]+"),
+    ("int", SIGNED, r"[-+]?(?:0|[1-9][0-9_]*)"),
+    ("int", "-+0", r"[-+]?0x[0-9a-fA-F_]+"),
+    ("int", "-+123456789", r"[-+]?[1-9][0-9_]*(?::[0-5]?[0-9])+"),
+    ("merge", "<", r"<<"),
+    ("null", "~", r"~"),
+    ("null", "nN", r"null|Null|NULL"),
+    ("null", [""], r""),
+    ("value", "=", r"="),
+    # Only for dumping; plain scalars can't start with these
+    ("yaml", "!&*", r"!|&|\*"),
+]
+
+
+def build_tables(alternatives):
+    """
+    The resolvers in PyYAML's form, first character to [(tag, regexp)],
+    and in ours, first character to the match method of a pattern and the tag of each of its groups
+    """
+
+    patterns = {}
+
+    for name, chars, pattern in alternatives:
+        for char in chars:
+            patterns.setdefault(char, []).append((TAG_PREFIX + name, pattern))
+
+    resolvers = {}
+    table = {}
+
+    for char, entries in patterns.items():
+        resolvers[char] = []
+
+        for tag in sorted(set(tag for tag, _ in entries), key=[tag for tag, _ in entries].index):
+            # Alternatives of the same resolver stay together, so the order is the SafeLoader's
+            regexp = "|".join(pattern for other, pattern in entries if other == tag)
+            resolvers[char].append((tag, re.compile(r"^(?:{})$".format(regexp))))
+
+        # $ after each alternative so that a later one is tried if an earlier one matches a prefix
+        table[char] = (
+            re.compile("|".join("({})$".format(pattern) for _, pattern in entries)).match,
+            (None,) + tuple(tag for tag, _ in entries),
+        )
+
+    return resolvers, table
+
+
+IMPLICIT_RESOLVERS, RESOLVER_TABLE = build_tables(ALTERNATIVES)
+
+
+class CfnResolver(object):
+    """
+    Resolves plain scalars with RESOLVER_TABLE
+
+    Mixed into a loader or dumper class by with_cfn_resolvers; yaml_implicit_resolvers
+    holds the same resolvers for anything that looks at them directly.
+    """
+
+    yaml_implicit_resolvers = IMPLICIT_RESOLVERS
+
+    def resolve(self, kind, value, implicit):
+        if kind is not ScalarNode or not implicit[0]:
+            return super(CfnResolver, self).resolve(kind, value, implicit)
+
+        entry = RESOLVER_TABLE.get(value[:1])
+
+        if entry is None:
+            return TAG_STR
+
+        match = entry[0](value)
+
+        if match is None:
+            return TAG_STR
+
+        return entry[1][match.lastindex]
+
+
+RESOLVER_SETS = ("yaml", "cfn")
+
+# Each class given the CloudFormation resolvers, by the class it's made from
+variants = {}
+
+
+def with_cfn_resolvers(cls):
+    """
+    A subclass of the loader or dumper class cls that resolves plain scalars with RESOLVER_TABLE
+    """
+
+    variant = variants.get(cls)
+
+    if variant is None:
+        variant = type(cls.__name__, (CfnResolver, cls), {
+            "__doc__": "{} with the CloudFormation implicit resolvers".format(cls.__name__),
+            "__module__": cls.__module__,
+        })
+        variants[cls] = variant
+
+    return variant
+
+
+def configured(cls):
+    """
+    cls, or its variant with the CloudFormation resolvers when config.yaml_resolvers is "cfn"
+    """
+
+    resolvers = config.yaml_resolvers
+
+    if resolvers == "yaml" or cls is None:
+        return cls
+
+    if resolvers == "cfn":
+        return with_cfn_resolvers(cls)
+
+    raise ValueError("Unknown yaml_resolvers {!r}, expected one of {}".format(resolvers, ", ".join(RESOLVER_SETS)))
@@ -0,0 +1,283 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Loading templates with their repeated parts stored once
+
+Big templates repeat the same strings, and often the same Tags lists or policy statements
+on hundreds of resources. With share=True, the loaders intern scalars and build each distinct
+mapping or list only once, so that every place it appears refers to the same SharedODict or
+SharedList. Those can't be changed in place; thaw gives a copy that can, which is how
+cfn_clean changes them, copying only what it actually has to change.
+"""
+
+from .odict import ODict
+import operator
+
+FROZEN = "Shared mappings and lists can't be changed in place; change the copy thaw() returns instead"
+
+
+def frozen(self, *args, **kwargs):
+    raise TypeError(FROZEN)
+
+
+class SharedODict(ODict):
+    """
+    An ODict that may appear in more than one place in a template, so it can't be changed
+    """
+
+    __setitem__ = __delitem__ = __ior__ = frozen
+    clear = pop = popitem = setdefault = update = frozen
+
+    def __reduce__(self):
+        return SharedODict, (list(self.items()),)
+
+
+class SharedList(list):
+    """
+    A list that may appear in more than one place in a template, so it can't be changed
+    """
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = frozen
+    append = clear = extend = insert = pop = remove = reverse = sort = frozen
+
+    def __reduce__(self):
+        return SharedList, (list(self),)
+
+
+SHARED_TYPES = frozenset((SharedODict, SharedList))
+
+# Scalars that can go into a shared mapping or list, along with dates
+SCALAR_TYPES = frozenset((str, int, float, bool, type(None), bytes))
+
+
+def thaw(value):
+    """
+    A copy of a shared mapping or list that can be changed, or value itself if it isn't shared
+    """
+
+    kind = type(value)
+
+    if kind is SharedODict:
+        return ODict(value.items())
+
+    if kind is SharedList:
+        return list(value)
+
+    return value
+
+
+def thaw_all(value):
+    """
+    value with every shared mapping and list in it, however deep, replaced by a copy that can
+    be changed, and whether there were any. Mappings and lists that aren't shared are kept and
+    changed in place, so value itself is returned unless it's shared.
+    """
+
+    thawed = False
+    root = [value]
+    stack = [(root, 0)]
+
+    # Containers that aren't shared can appear more than once, or inside themselves
+    seen = set()
+
+    while stack:
+        container, key = stack.pop()
+        item = container[key]
+
+        if type(item) in SHARED_TYPES:
+            item = container[key] = thaw(item)
+            thawed = True
+        elif isinstance(item, (dict, list)):
+            if id(item) in seen:
+                continue
+
+            seen.add(id(item))
+        else:
+            continue
+
+        stack.extend((item, child) for child in (item.keys() if isinstance(item, dict) else range(len(item))))
+
+    return root[0], thawed
+
+
+def unchanged(original, items):
+    """
+    original, if it's a SharedList holding the very same items, otherwise the list items
+
+    Lets cfn_clean keep sharing a list that it has rebuilt without changing anything.
+    """
+
+    if type(original) is SharedList and len(items) == len(original) and all(map(operator.is_, items, original)):
+        return original
+
+    return items
+
+
+class Sharer(object):
+    """
+    Interns the scalars and shares the subtrees of one template while it loads
+
+    Every scalar is interned, keeping 1, 1.0 and True apart and 0.0 and -0.0 too,
+    so values are interchangeable exactly when they are the same object. mapping and
+    sequence take the items of a container whose contents are already interned or shared,
+    and return the one SharedODict or SharedList with those very items. Only a hash of
+    their ids is kept for each, and when two containers have the same hash the second
+    one simply isn't shared.
+
+    Anything that has to keep its own identity, such as a value with a YAML anchor,
+    is left as it is, and so is everything around it.
+    """
+
+    def __init__(self):
+        # Only needed once a template is loaded, so kept out of import cfn_flip
+        from datetime import date, datetime
+
+        self.scalar_types = SCALAR_TYPES | {date, datetime}
+        self.shareable_types = self.scalar_types | SHARED_TYPES
+
+        self.strings = {}
+        self.scalars = {}
+        self.mappings = {}
+        self.sequences = {}
+
+    def scalar(self, value):
+        """
+        The first value seen of the same type as value that is interchangeable with it
+        """
+
+        kind = type(value)
+
+        if kind is str:
+            return self.strings.setdefault(value, value)
+
+        if kind is bool or value is None or kind not in self.scalar_types:
+            return value
+
+        # By its hex form, so that 0.0 and -0.0 are kept apart
+        key = (kind, value.hex() if kind is float else value)
+
+        return self.scalars.setdefault(key, value)
+
+    def mapping(self, keys, values):
+        """
+        The SharedODict of keys and values, two lists, or None if one of them can't be shared
+        """
+
+        everything = keys + values
+
+        if not self.shareable_types.issuperset(map(type, everything)):
+            return None
+
+        digest = hash(tuple(map(id, everything)))
+        mapping = self.mappings.get(digest)
+
+        if mapping is not None and len(mapping) == len(keys) and \
+                all(map(operator.is_, mapping, keys)) and all(map(operator.is_, mapping.values(), values)):
+            return mapping
+
+        shared = SharedODict(zip(keys, values))
+
+        if mapping is None:
+            self.mappings[digest] = shared
+
+        return shared
+
+    def sequence(self, items):
+        """
+        The SharedList of items, or None if one of them can't be shared
+        """
+
+        if not self.shareable_types.issuperset(map(type, items)):
+            return None
+
+        digest = hash(tuple(map(id, items)))
+        sequence = self.sequences.get(digest)
+
+        if sequence is not None and len(sequence) == len(items) and all(map(operator.is_, sequence, items)):
+            return sequence
+
+        shared = SharedList(items)
+
+        if sequence is None:
+            self.sequences[digest] = shared
+
+        return shared
+
+    def freeze(self, container):
+        """
+        The shared equivalent of a finished ODict or list, or the container itself if it can't be shared
+        """
+
+        if type(container) is list:
+            shared = self.sequence(container)
+        else:
+            shared = self.mapping(list(container), list(container.values()))
+
+        return container if shared is None else shared
+
+    def share(self, value):
+        """
+        value with its scalars interned and its ODicts and lists shared, where they can be
+        """
+
+        kind = type(value)
+
+        if kind is list:
+            items = [self.share(item) for item in value]
+            shared = self.sequence(items)
+
+            return items if shared is None else shared
+
+        if kind is ODict:
+            keys = [self.share(key) for key in value]
+            values = [self.share(item) for item in value.values()]
+            shared = self.mapping(keys, values)
+
+            return ODict(zip(keys, values)) if shared is None else shared
+
+        return self.scalar(value)
+
+    def json_hook(self):
+        """
+        An object_pairs_hook for json.loads, and a function to call with the value
+        json.loads returns to finish sharing it
+
+        json.loads builds objects from the inside out, so each one's objects are already
+        shared by the time it's built; its lists, which the hook never sees, are shared then.
+        Everything in JSON can be shared and json.loads already reuses its keys.
+        """
+
+        share = self.share
+        scalar = self.scalar
+        strings = self.strings
+        mapping = self.mapping
+
+        def hook(pairs):
+            keys = []
+            values = []
+
+            for key, value in pairs:
+                kind = type(value)
+
+                if kind is str:
+                    value = strings.setdefault(value, value)
+                elif kind is list:
+                    value = share(value)
+                elif kind is not SharedODict:
+                    value = scalar(value)
+
+                keys.append(key)
+                values.append(value)
+
+            return mapping(keys, values)
+
+        return hook, share
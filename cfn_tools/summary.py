@@ -0,0 +1,236 @@
+"""
+Copyright 2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from .odict import ODict
+from .sharing import SHARED_TYPES
+from itertools import chain
+import operator
+import six
+
+FN_PREFIX = "Fn::"
+
+# Keys that are intrinsic functions without the Fn:: prefix
+PLAIN_FUNCTIONS = frozenset(("Ref", "Condition"))
+
+# Gets the Type of each mapping without a Python call for each one
+get_type = operator.methodcaller("get", "Type")
+
+
+def is_string(value):
+    return isinstance(value, six.string_types)
+
+
+def is_function(key):
+    return isinstance(key, six.string_types) and (key.startswith(FN_PREFIX) or key in PLAIN_FUNCTIONS)
+
+
+class Summary(object):
+    """
+    What a template contains, as recorded by the loaders while they build it
+
+    * functions: the intrinsic functions used, by their long names
+    * resource_types: the string values of every Type key
+    * aliases: whether any mapping or sequence appears more than once, through a YAML alias
+    * nodes: the number of values, not counting keys
+    * max_depth: how deeply mappings and sequences are nested, 0 for a scalar
+
+    Pass one to load, load_json or load_yaml to have it filled in,
+    or call summarize on data that's already loaded. Counting nodes and depth
+    is most of the work for JSON, so with count=False they are left as None.
+
+    The loaders keep a list of the mappings they build and record them all at once
+    with add_mappings, which goes through their keys without a Python call for each one.
+    """
+
+    def __init__(self, count=True):
+        self.count = count
+        self.functions = set()
+        self.resource_types = set()
+        self.aliases = False
+        self.nodes = 0 if count else None
+        self.max_depth = 0 if count else None
+
+    def add_mappings(self, mappings):
+        """
+        Record the functions among the keys of the mappings, and their Types
+        """
+
+        keys = set(chain.from_iterable(mappings))
+        self.functions.update(key for key in keys if is_function(key))
+
+        if "Type" in keys:
+            self.resource_types.update(filter(is_string, map(get_type, mappings)))
+
+    def add_function(self, name, value, depth=None):
+        """
+        Record a YAML tag, which the loader turns into a mapping of name to value
+
+        For a tag on a scalar, depth is how deeply the mapping is nested and the value,
+        which is a list for !GetAtt, is counted too; otherwise the value has been already.
+        """
+
+        self.functions.add(name)
+
+        if not self.count:
+            return
+
+        self.nodes += 1
+
+        if depth is None:
+            return
+
+        depth += 1
+
+        if isinstance(value, list):
+            self.nodes += len(value)
+            depth += 1
+
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def clear(self):
+        """
+        Forget everything recorded so far
+        """
+
+        self.__init__(self.count)
+
+    def __eq__(self, other):
+        if not isinstance(other, Summary):
+            return NotImplemented
+
+        return vars(self) == vars(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Summary(functions={!r}, resource_types={!r}, aliases={!r}, nodes={!r}, max_depth={!r})".format(
+            sorted(self.functions),
+            sorted(self.resource_types),
+            self.aliases,
+            self.nodes,
+            self.max_depth,
+        )
+
+
+def summarize(data, summary=None):
+    """
+    Walk data that's already loaded and return its Summary,
+    filling in summary if one is given
+    """
+
+    if summary is None:
+        summary = Summary()
+
+    count = summary.count
+    stack = [(data, 0)]
+    seen = set()
+    mappings = []
+
+    while stack:
+        value, depth = stack.pop()
+
+        if count:
+            summary.nodes += 1
+
+        if not isinstance(value, (dict, list)):
+            continue
+
+        if type(value) not in SHARED_TYPES:
+            if id(value) in seen:
+                # Otherwise only aliases share values, and they are summarized once
+                summary.aliases = True
+                continue
+
+            seen.add(id(value))
+
+        if count:
+            summary.max_depth = max(summary.max_depth, depth + 1)
+
+        if isinstance(value, dict):
+            mappings.append(value)
+            stack.extend((item, depth + 1) for item in value.values())
+        else:
+            stack.extend((item, depth + 1) for item in value)
+
+    summary.add_mappings(mappings)
+
+    return summary
+
+
+def json_hook(summary):
+    """
+    An object_pairs_hook for json.loads that records each object in summary,
+    and a function to call with the value json.loads returns to finish the summary
+
+    json.loads builds objects from the inside out, so when counting, the depth
+    of each one is kept until the object around it is built.
+    """
+
+    mappings = []
+    add = mappings.append
+
+    if not summary.count:
+        def hook(pairs):
+            mapping = ODict(pairs)
+            add(mapping)
+
+            return mapping
+
+        def finish(data):
+            summary.add_mappings(mappings)
+
+            return data
+
+        return hook, finish
+
+    depths = {}
+
+    def sequence_depth(sequence):
+        summary.nodes += len(sequence)
+        depth = 0
+
+        for item in sequence:
+            if item.__class__ is ODict:
+                depth = max(depth, depths.pop(id(item)))
+            elif item.__class__ is list:
+                depth = max(depth, sequence_depth(item))
+
+        return depth + 1
+
+    def hook(pairs):
+        mapping = ODict(pairs)
+        add(mapping)
+        depth = 0
+
+        for _, value in pairs:
+            if value.__class__ is ODict:
+                depth = max(depth, depths.pop(id(value)))
+            elif value.__class__ is list:
+                depth = max(depth, sequence_depth(value))
+
+        summary.nodes += len(pairs)
+        depths[id(mapping)] = depth + 1
+
+        return mapping
+
+    def finish(data):
+        summary.add_mappings(mappings)
+        summary.nodes += 1
+
+        if data.__class__ is ODict:
+            summary.max_depth = depths.pop(id(data))
+        elif data.__class__ is list:
+            summary.max_depth = sequence_depth(data)
+
+        return data
+
+    return hook, finish
@@ -14,15 +14,113 @@ See the License for the specific language governing permissions and limitations
 
 import re
 import six
+import threading
 import yaml
 from yaml.emitter import Emitter, ScalarAnalysis
 
 from .literal import LiteralString
 from .odict import ODict
+from .sharing import SHARED_TYPES, SharedList, SharedODict
 
+TAG_PREFIX = "tag:yaml.org,2002:"
 TAG_MAP = "tag:yaml.org,2002:map"
 TAG_STRING = "tag:yaml.org,2002:str"
 AWS_ACCOUNT_ID = r"^0[0-9]+$"
+ACCOUNT_ID = re.compile(AWS_ACCOUNT_ID)
+LINE_BREAKS = "\n\r\x85\u2028\u2029"
+UNICODE_LINE_BREAKS = "\x85\u2028\u2029"
+
+# Characters outside the Basic Multilingual Plane, which libyaml escapes and PyYAML writes as they are
+NON_BMP = re.compile("[\U00010000-\U0010FFFF]")
+
+# Strings longer than this are worked out afresh each time; they rarely repeat
+# and their analysis is dominated by the scan the cache would have to redo anyway
+MAX_CACHED_LENGTH = 256
+
+# Entries kept by each ScalarCache
+SCALAR_CACHE_SIZE = 10000
+
+# Not in a ScalarCache
+MISSING = object()
+
+# A block scalar indicator (and optional indentation and chomping indicators) at the end of a line
+BLOCK_SCALAR_HEADER = re.compile(r"(^| )[|>][0-9+-]*$")
+# A mapping value's tag at the end of a line, the tagged collection follows on the next line
+NESTED_TAG = re.compile(r": ![^ ]*$")
+
+
+class ScalarCache(object):
+    """
+    What the dumpers have worked out about strings they've seen before
+
+    Templates repeat the same strings over and over: resource types, Ref targets, tag keys.
+    Each result is kept under the string and its context, whatever else it depends on,
+    such as the dumper's flavour. At most max_size entries are kept, dropping the oldest
+    first; a max_size of 0 turns the cache off. Strings longer than MAX_CACHED_LENGTH
+    aren't kept and are counted as uncached.
+    """
+
+    def __init__(self, max_size=SCALAR_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self.evictions = 0
+
+    def fetch(self, value, context, make, *args):
+        """
+        make(*args), remembered for value in context
+        """
+
+        if len(value) > MAX_CACHED_LENGTH or not self.max_size:
+            self.uncached += 1
+            return make(*args)
+
+        key = (value, context)
+        result = self.entries.get(key, MISSING)
+
+        if result is not MISSING:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = make(*args)
+
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                del self.entries[next(iter(self.entries))]
+                self.evictions += 1
+
+            self.entries[key] = result
+
+        return result
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+
+        if not lookups:
+            return 0.0
+
+        return float(self.hits) / lookups
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# The styles chosen for strings, and their ScalarAnalysis
+style_cache = ScalarCache()
+analysis_cache = ScalarCache()
+
+# Analyses strings as libyaml would; it never writes anything
+ANALYZER = Emitter(None, allow_unicode=True)
 
 
 class CfnEmitter(Emitter):
@@ -35,10 +133,38 @@ class CfnEmitter(Emitter):
                                   allow_flow_plain=False, allow_block_plain=True,
                                   allow_single_quoted=True, allow_double_quoted=True,
                                   allow_block=True)
-        return super(CfnEmitter, self).analyze_scalar(scalar)
 
+        # The analysis only depends on the string and allow_unicode, and nothing changes it
+        return analysis_cache.fetch(scalar, self.allow_unicode, super(CfnEmitter, self).analyze_scalar, scalar)
 
-class CfnYamlDumper(yaml.Dumper, CfnEmitter):
+
+class CfnRepresenter(object):
+    """
+    Quote account IDs and strings containing line breaks
+    and keep ODict keys in order
+    """
+
+    def represent_mapping(self, tag, mapping, flow_style=None):
+        if isinstance(mapping, ODict):
+            # PyYAML sorts anything with an items() method but not an iterable of pairs
+            mapping = mapping.items()
+
+        return super(CfnRepresenter, self).represent_mapping(tag, mapping, flow_style)
+
+    def represent_scalar(self, tag, value, style=None):
+        style = style_cache.fetch(value, ("represent", style), scalar_style, value, style)
+
+        return super(CfnRepresenter, self).represent_scalar(tag, value, style)
+
+    def ignore_aliases(self, data):
+        # A shared mapping or list stands for separate copies that happen to be the same
+        if type(data) in SHARED_TYPES:
+            return True
+
+        return super(CfnRepresenter, self).ignore_aliases(data)
+
+
+class CfnYamlDumper(CfnRepresenter, yaml.Dumper, CfnEmitter):
     """
     Indent block sequences from parent using more common style
     ("  - entry"  vs "- entry").
@@ -48,17 +174,214 @@ class CfnYamlDumper(yaml.Dumper, CfnEmitter):
     def increase_indent(self, flow=False, indentless=False):
         return super(CfnYamlDumper, self).increase_indent(flow, False)
 
-    def represent_scalar(self, tag, value, style=None):
-        if re.match(AWS_ACCOUNT_ID, value):
-            style = "\'"
 
-        if isinstance(value, six.text_type):
-            if any(eol in value for eol in "\n\r") and style is None:
-                style = "\""
+if getattr(yaml, "__with_libyaml__", False):
+    class CfnCYamlDumper(CfnRepresenter, yaml.CDumper):
+        """
+        libyaml-backed equivalent of CfnYamlDumper
+
+        libyaml always writes block sequences inside mappings without indentation
+        so dump_with_libyaml() has to fix that up afterwards.
+        It records whether any scalar was given a style that makes that unsafe.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super(CfnCYamlDumper, self).__init__(*args, **kwargs)
+            self.reindentable = True
+
+        def represent_scalar(self, tag, value, style=None):
+            if style is None and not tag.startswith(TAG_PREFIX):
+                # Unlike PyYAML, libyaml writes plain scalars after a custom tag
+                style = "\'"
+
+            node = super(CfnCYamlDumper, self).represent_scalar(tag, value, style)
+
+            if type(node.value) is not six.text_type and isinstance(node.value, six.text_type):
+                # libyaml only accepts exact strings, not LiteralString
+                node.value = six.text_type(node.value)
+
+            if self.reindentable and not (is_reindentable(node.value, node.style) and keeps_style(node.value, node.style)):
+                self.reindentable = False
+
+            return node
+
+        def represent_mapping(self, tag, mapping, flow_style=None):
+            node = super(CfnCYamlDumper, self).represent_mapping(tag, mapping, flow_style)
+
+            # PyYAML writes an empty key as "? ''", libyaml as "'':"
+            if self.reindentable and any(isinstance(key, yaml.ScalarNode) and not key.value for key, _ in node.value):
+                self.reindentable = False
+
+            return node
+else:
+    # PyYAML was built without libyaml
+    CfnCYamlDumper = None
+
+
+def scalar_style(value, style):
+    """
+    The style CfnRepresenter gives a scalar that would otherwise have style
+    """
+
+    if ACCOUNT_ID.match(value):
+        style = "\'"
 
-            # return super(CfnYamlDumper, self).represent_scalar(TAG_STRING, value, style)
+    if isinstance(value, six.text_type):
+        if style is None and ("\n" in value or "\r" in value):
+            style = "\""
 
-        return super(CfnYamlDumper, self).represent_scalar(tag, value, style)
+    return style
+
+
+def plain_analysis(value):
+    """
+    The ScalarAnalysis libyaml makes of value, as PyYAML's own Emitter makes it
+    """
+
+    return analysis_cache.fetch(value, "plain", ANALYZER.analyze_scalar, value)
+
+
+def keeps_style(value, style):
+    """
+    Will libyaml write a scalar in the style it's asked for, as the pure-Python dumpers do?
+
+    CfnEmitter lets every LiteralString be a block scalar, but libyaml refuses block and
+    single-quoted styles for some strings, such as those with tabs or trailing spaces,
+    and writes them double-quoted instead.
+    """
+
+    if style == "|" or style == ">":
+        return plain_analysis(value).allow_block
+
+    if style == "\'":
+        return plain_analysis(value).allow_single_quoted
+
+    return True
+
+
+def is_reindentable(value, style):
+    """
+    Can a scalar written by libyaml be safely re-indented line by line?
+    """
+
+    if style == ">":
+        # Folded lines are wrapped according to their column
+        return False
+
+    if any(eol in value for eol in UNICODE_LINE_BREAKS):
+        # libyaml and PyYAML disagree on where these may go, and the re-indenting only splits at \n
+        return False
+
+    if NON_BMP.search(value):
+        # libyaml escapes them even with allow_unicode
+        return False
+
+    if style not in ("|", "\"") and any(eol in value for eol in LINE_BREAKS):
+        # Quoted or plain scalars spanning several lines
+        return False
+
+    if style == "|" and value[-1:] and value[-1] in LINE_BREAKS and (len(value) == 1 or value[-2] in LINE_BREAKS):
+        # Keep-chomped literals leave the document open-ended
+        return False
+
+    if not style and BLOCK_SCALAR_HEADER.search(value):
+        # Would be mistaken for a block scalar header
+        return False
+
+    return True
+
+
+def _leading_spaces(line):
+    return len(line) - len(line.lstrip(" "))
+
+
+def indent_sequences(text):
+    """
+    Indent block sequences found directly under a mapping key
+    ("key:\n  - entry" vs "key:\n- entry") as CfnYamlDumper does
+    """
+
+    output = []
+    sequences = []  # Columns of the sequences being indented
+    key_column = None  # Column of a key whose value starts on the next line
+    block_column = None  # Lines indented past this belong to a block scalar
+    block_inclusive = False
+
+    for line in text.split("\n"):
+        column = _leading_spaces(line)
+
+        if block_column is not None:
+            if not line or column > block_column or (block_inclusive and column == block_column):
+                output.append(" " * (2 * len(sequences)) + line if line else line)
+                continue
+
+            block_column = None
+
+        content = line[column:]
+        is_entry = content == "-" or content.startswith("- ")
+
+        while sequences and (column < sequences[-1] or (column == sequences[-1] and not is_entry)):
+            sequences.pop()
+
+        if is_entry and column == key_column:
+            sequences.append(column)
+
+        output.append(" " * (2 * len(sequences)) + line if line else line)
+
+        # Find where any key on this line starts
+        while content == "-" or content.startswith("- "):
+            content = content[2:]
+            column += 2
+
+        key_column = None
+
+        if BLOCK_SCALAR_HEADER.search(content):
+            block_column = column
+            # A block scalar that is a sequence entry or a document is indented to
+            # the column it starts at; one that is a mapping value is indented further
+            block_inclusive = content.startswith(("|", ">", "!"))
+        elif content.endswith(":") or NESTED_TAG.search(content):
+            key_column = column
+
+    return "\n".join(output)
+
+
+def dump_with_libyaml(data, dumper, width, **kwargs):
+    """
+    Dump using a libyaml-backed dumper
+
+    Returns None when the output can't be guaranteed identical to that of
+    the pure-Python dumpers, in which case the caller should use them instead.
+    """
+
+    if not isinstance(data, (dict, list)):
+        # PyYAML and libyaml disagree on document end markers after a plain scalar
+        return None
+
+    stream = six.StringIO()
+    instance = dumper(stream, width=width, **kwargs)
+
+    try:
+        instance.open()
+        instance.represent(data)
+        instance.close()
+    finally:
+        instance.dispose()
+
+    if not instance.reindentable:
+        return None
+
+    output = indent_sequences(stream.getvalue())
+
+    # PyYAML and libyaml only ever wrap lines that run past the width;
+    # complex keys ("? key") are laid out differently by each.
+    best_width = width if width and width > 4 else 80
+
+    for line in output.split("\n"):
+        if len(line) > best_width or line.lstrip(" -").startswith("?"):
+            return None
+
+    return output
 
 
 def string_representer(dumper, value):
@@ -82,7 +405,16 @@ def literal_unicode_representer(dumper, value):
     return dumper.represent_scalar(TAG_STRING, value, style='|')
 
 
-# Customise the dumper
+# Customise the dumpers
 CfnYamlDumper.add_representer(ODict, map_representer)
+CfnYamlDumper.add_representer(SharedODict, map_representer)
+CfnYamlDumper.add_representer(SharedList, yaml.representer.SafeRepresenter.represent_list)
 CfnYamlDumper.add_representer(LiteralString, literal_unicode_representer)
 CfnYamlDumper.add_representer(six.text_type, string_representer)
+
+if CfnCYamlDumper is not None:
+    CfnCYamlDumper.add_representer(ODict, map_representer)
+    CfnCYamlDumper.add_representer(SharedODict, map_representer)
+    CfnCYamlDumper.add_representer(SharedList, yaml.representer.SafeRepresenter.represent_list)
+    CfnCYamlDumper.add_representer(LiteralString, literal_unicode_representer)
+    CfnCYamlDumper.add_representer(six.text_type, string_representer)
@@ -8,19 +8,40 @@ Licensed under the Apache License, Version 2.0 (the "License"). You may not use
 or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 """
 
+from .buffers import BUFFER_TYPES, readable
 from .odict import ODict
+from .resolver import configured
+import re
 import six
 import yaml
 
 TAG_MAP = "tag:yaml.org,2002:map"
+TAG_SEQ = "tag:yaml.org,2002:seq"
+TAG_STR = "tag:yaml.org,2002:str"
 UNCONVERTED_SUFFIXES = ["Ref", "Condition"]
 FN_PREFIX = "Fn::"
 
+# For templates given as buffers, which str's own search doesn't take
+TAB = re.compile(b"\t")
+
+# A mapping that is waiting for its next key
+NO_KEY = object()
+
 
 class CfnYamlLoader(yaml.SafeLoader):
     pass
 
 
+if getattr(yaml, "__with_libyaml__", False):
+    class CfnCYamlLoader(yaml.CSafeLoader):
+        """
+        libyaml-backed equivalent of CfnYamlLoader
+        """
+else:
+    # PyYAML was built without libyaml
+    CfnCYamlLoader = None
+
+
 def multi_constructor(loader, tag_suffix, node):
     """
     Deal with !Ref style function format
@@ -52,7 +73,9 @@ def construct_getatt(node):
     Reconstruct !GetAtt into a list
     """
 
-    if isinstance(node.value, six.text_type):
+    if isinstance(node, yaml.MappingNode):
+        raise ValueError("Unexpected node type: mapping for !GetAtt\n{}".format(node.start_mark))
+    elif isinstance(node.value, six.text_type):
         return node.value.split(".", 1)
     elif isinstance(node.value, list):
         return [s.value for s in node.value]
@@ -63,9 +86,13 @@ def construct_getatt(node):
 def construct_mapping(self, node, deep=False):
     """
     Use ODict for maps
+
+    The mapping is yielded before it's filled in, so that the loader constructs
+    what's inside it afterwards rather than recursing
     """
 
     mapping = ODict()
+    yield mapping
 
     for key_node, value_node in node.value:
         key = self.construct_object(key_node, deep=deep)
@@ -73,9 +100,239 @@ def construct_mapping(self, node, deep=False):
 
         mapping[key] = value
 
-    return mapping
 
+def get_loader(source=None):
+    """
+    Return the fastest available loader for the source,
+    with the implicit resolvers chosen by config.yaml_resolvers
+    """
+
+    if CfnCYamlLoader is None:
+        return configured(CfnYamlLoader)
+
+    # libyaml is more lenient than PyYAML about tabs used as whitespace
+    # so leave those documents to the pure-Python loader to keep results identical
+    if isinstance(source, six.string_types) and "\t" in source:
+        return configured(CfnYamlLoader)
+
+    if isinstance(source, BUFFER_TYPES) and TAB.search(source):
+        return configured(CfnYamlLoader)
+
+    return configured(CfnCYamlLoader)
+
+
+class Fallback(Exception):
+    """
+    The document needs something only the loader itself does
+    """
+
+
+def build_steps(source, summary=None, sharer=None):
+    """
+    Build the data from a YAML document, yielding after each node
+
+    Works from the parser's events, keeping mappings and sequences on a stack rather than
+    recursing as the composer and constructors do, so there's no limit to how deeply they
+    can be nested. Raises Fallback for anything that needs the loader itself, such as
+    recursive aliases or merge keys; errors are best reported by the loader too.
+    If a Summary is given, what's built is recorded in it.
+    If a Sharer is given, scalars are interned and mappings and lists shared as they're finished,
+    except those with an anchor and everything in them, which have to stay themselves for their aliases.
+    """
+
+    loader_class = get_loader(source)
+    loader = loader_class(readable(source, loader_class))
+    constructors = loader.yaml_constructors
+
+    # A string is its own text, unless something has changed how strings are constructed
+    plain_strings = constructors.get(TAG_STR) is yaml.constructor.SafeConstructor.construct_yaml_str
+
+    data = None
+    documents = 0
+    anchors = {}
+    counting = summary is not None and summary.count
+
+    # Every mapping built, for the summary
+    mappings = []
+
+    # [container, function name, anchor, key, depth] for each mapping and sequence being built;
+    # the key of a sequence is None
+    stack = []
+
+    # How many of them have an anchor; nothing in those is shared
+    anchored = 0
+
+    def function_name(tag):
+        if tag in constructors or not tag.startswith("!"):
+            raise Fallback()
+
+        name = tag[1:]
+
+        if name not in UNCONVERTED_SUFFIXES:
+            name = "{}{}".format(FN_PREFIX, name)
+
+        return name
+
+    try:
+        while True:
+            event = loader.get_event()
+
+            if isinstance(event, yaml.ScalarEvent):
+                tag = event.tag
+
+                if tag is None or tag == "!":
+                    tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+
+                if tag == TAG_STR and plain_strings:
+                    value = event.value
+                elif stack and stack[-1][1] == "Fn::GetAtt" and stack[-1][3] is None:
+                    # !GetAtt [Resource, Attribute] keeps the text of each item
+                    value = event.value
+                else:
+                    node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, event.style)
+                    constructor = constructors.get(tag)
+
+                    if constructor is not None:
+                        value = constructor(loader, node)
+                    elif tag.startswith("!"):
+                        value = multi_constructor(loader, tag[1:], node)
+
+                        if summary is not None:
+                            for name, item in value.items():
+                                summary.add_function(name, item, stack[-1][4] if stack else 0)
+                    else:
+                        raise Fallback()
+
+                # A tag can make a mapping, which has to stay itself for its aliases
+                if sharer is not None and (not isinstance(value, dict) or (event.anchor is None and not anchored)):
+                    value = sharer.share(value)
 
-# Customise our loader
+            elif isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                if stack and stack[-1][1] == "Fn::GetAtt":
+                    raise Fallback()
+
+                mapping = isinstance(event, yaml.MappingStartEvent)
+                tag = event.tag
+                name = None
+
+                if tag is not None and tag != "!" and tag != (TAG_MAP if mapping else TAG_SEQ):
+                    name = function_name(tag)
+
+                # A function wraps the container in a mapping of its own
+                depth = (stack[-1][4] if stack else 0) + (1 if name is None else 2)
+
+                if counting and depth > summary.max_depth:
+                    summary.max_depth = depth
+
+                if mapping:
+                    if name == "Fn::GetAtt":
+                        raise Fallback()
+
+                    stack.append([ODict(), name, event.anchor, NO_KEY, depth])
+                else:
+                    stack.append([[], name, event.anchor, None, depth])
+
+                if event.anchor is not None:
+                    anchored += 1
+
+                continue
+
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                value, name, anchor, _, _ = stack.pop()
+                shareable = sharer is not None and not anchored
+
+                if anchor is not None:
+                    anchored -= 1
+
+                # A mapping inside a tag becomes a plain dict below, so only a list is shared there
+                if shareable and (name is None or isinstance(value, list)):
+                    value = sharer.freeze(value)
+
+                if summary is not None and isinstance(value, dict):
+                    mappings.append(value)
+
+                if name is not None:
+                    if isinstance(value, dict):
+                        # The loader builds the mappings inside tags as plain dicts
+                        value = dict(value)
+
+                    if summary is not None:
+                        summary.add_function(name, value)
+
+                    value = ODict(((name, value),))
+
+                    if shareable:
+                        value = sharer.freeze(value)
+
+                if anchor is not None:
+                    if anchor in anchors:
+                        raise Fallback()
+
+                    anchors[anchor] = value
+
+            elif isinstance(event, yaml.AliasEvent):
+                if event.anchor not in anchors or (stack and stack[-1][1] == "Fn::GetAtt"):
+                    # Recursive, or left to the loader to report
+                    raise Fallback()
+
+                value = anchors[event.anchor]
+
+                if summary is not None and isinstance(value, (dict, list)):
+                    summary.aliases = True
+
+            elif isinstance(event, yaml.DocumentStartEvent):
+                documents += 1
+
+                if documents > 1:
+                    raise Fallback()
+
+                continue
+
+            elif isinstance(event, yaml.StreamEndEvent):
+                if summary is not None:
+                    summary.add_mappings(mappings)
+
+                return data
+
+            else:
+                continue
+
+            if isinstance(event, yaml.ScalarEvent) and event.anchor is not None:
+                if event.anchor in anchors:
+                    raise Fallback()
+
+                anchors[event.anchor] = value
+
+            if not stack:
+                data = value
+            else:
+                frame = stack[-1]
+                container = frame[0]
+
+                if frame[3] is None:
+                    container.append(value)
+                elif frame[3] is NO_KEY:
+                    frame[3] = value
+
+                    if counting:
+                        # Keys aren't counted as nodes
+                        summary.nodes -= 1
+                else:
+                    container[frame[3]] = value
+                    frame[3] = NO_KEY
+
+            if counting:
+                summary.nodes += 1
+
+            yield
+    finally:
+        loader.dispose()
+
+
+# Customise our loaders
 CfnYamlLoader.add_constructor(TAG_MAP, construct_mapping)
 CfnYamlLoader.add_multi_constructor("!", multi_constructor)
+
+if CfnCYamlLoader is not None:
+    CfnCYamlLoader.add_constructor(TAG_MAP, construct_mapping)
+    CfnCYamlLoader.add_multi_constructor("!", multi_constructor)
@@ -0,0 +1,443 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License"). You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from datetime import date, datetime, time
+from json.encoder import encode_basestring
+import six
+import yaml
+from yaml.composer import ComposerError
+from yaml.constructor import ConstructorError
+
+from .chunked_writer import ChunkedWriter
+from .resolver import configured
+from .yaml_loader import CfnYamlLoader, FN_PREFIX, UNCONVERTED_SUFFIXES, get_loader
+
+INDENT = " " * 4
+
+TAG_PREFIX = "tag:yaml.org,2002:"
+
+# Sequences of single-item mappings, which the loader makes into lists of (key, value) pairs
+PAIRS_TAGS = {
+    TAG_PREFIX + "omap": "an ordered map",
+    TAG_PREFIX + "pairs": "pairs",
+}
+
+# Collection tags that stand for nothing more than a mapping or sequence
+PLAIN_TAGS = ("!", TAG_PREFIX + "map", TAG_PREFIX + "seq")
+
+INFINITY = float("inf")
+
+
+def encode_float(value):
+    """
+    Encode a float the way the json module does
+    """
+
+    if value != value:
+        return "NaN"
+
+    if value == INFINITY:
+        return "Infinity"
+
+    if value == -INFINITY:
+        return "-Infinity"
+
+    return float.__repr__(value)
+
+
+def encode_value(value):
+    """
+    Encode a constructed scalar the way dump_json does
+    """
+
+    if isinstance(value, six.string_types):
+        return encode_basestring(value)
+
+    if value is None:
+        return "null"
+
+    if value is True:
+        return "true"
+
+    if value is False:
+        return "false"
+
+    if isinstance(value, six.integer_types):
+        return int.__repr__(value)
+
+    if isinstance(value, float):
+        return encode_float(value)
+
+    if isinstance(value, (datetime, date, time)):
+        return encode_basestring(value.isoformat())
+
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+def encode_key(key):
+    """
+    Encode a mapping key the way the json module does
+    """
+
+    if isinstance(key, six.string_types):
+        return encode_basestring(key)
+
+    if isinstance(key, float):
+        return encode_basestring(encode_float(key))
+
+    if key is True or key is False or key is None:
+        return encode_basestring(encode_value(key))
+
+    if isinstance(key, six.integer_types):
+        return encode_basestring(int.__repr__(key))
+
+    raise TypeError("keys must be str, int, float, bool or None, not {}".format(type(key).__name__))
+
+
+class Frame(object):
+    """
+    An open JSON object or array
+    """
+
+    __slots__ = ("is_mapping", "count", "expect_key", "keys", "wrapper", "getatt", "pairs", "pair", "mark")
+
+    def __init__(self, is_mapping, wrapper=False):
+        self.is_mapping = is_mapping
+        self.count = 0
+        self.expect_key = is_mapping
+        self.keys = set() if is_mapping else None
+        # Closes along with its only value, e.g. {"Ref": ...} for a !Ref tag
+        self.wrapper = wrapper
+        # Values of a !GetAtt sequence, which are collected rather than written
+        self.getatt = None
+        # What an !!omap or !!pairs sequence is called in errors; its mappings are written as pairs
+        self.pairs = None
+        # Whether this is one of those mappings, written as a [key, value] array
+        self.pair = False
+        # Where an !!omap or !!pairs sequence, or one of its mappings, starts
+        self.mark = None
+
+
+class Recording(object):
+    """
+    The events making up an anchored node
+    """
+
+    __slots__ = ("anchor", "events", "depth")
+
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.events = []
+        self.depth = 0
+
+
+class YamlToJsonWriter(object):
+    """
+    Write YAML parse events to a stream as JSON formatted like dump_json
+
+    Applies the same rules as CfnYamlLoader for short-form function tags
+    but only keeps the currently open collections (and any anchored nodes) in memory.
+    """
+
+    def __init__(self, output):
+        self.output = ChunkedWriter(output)
+        self.write = self.output.write
+        self.frames = []
+        self.anchors = {}
+        self.recordings = []
+        self.replaying = False
+        self.document_mark = None
+        self.documents = 0
+        # Resolves and constructs plain scalars exactly as the loader would
+        self.constructor = configured(CfnYamlLoader)("")
+
+    def begin_item(self):
+        """
+        Write whatever separates a new value or key from the previous one
+        """
+
+        if not self.frames:
+            return
+
+        frame = self.frames[-1]
+
+        if frame.is_mapping and not frame.expect_key:
+            frame.expect_key = True
+            return
+
+        if frame.count == 0:
+            self.write("{" if frame.is_mapping else "[")
+
+        else:
+            self.write(",")
+
+        self.write("\n" + INDENT * len(self.frames))
+        frame.count += 1
+
+        if frame.is_mapping:
+            frame.expect_key = False
+
+    def open(self, is_mapping, wrapper=False):
+        self.begin_item()
+        self.frames.append(Frame(is_mapping, wrapper))
+
+    def close(self):
+        frame = self.frames.pop()
+
+        if frame.count == 0:
+            self.write("{}" if frame.is_mapping else "[]")
+        else:
+            self.write("\n" + INDENT * len(self.frames) + ("}" if frame.is_mapping else "]"))
+
+        if self.frames and self.frames[-1].wrapper:
+            self.close()
+
+    def key(self, key):
+        frame = self.frames[-1]
+
+        if key in frame.keys:
+            raise ValueError("Duplicate key {!r} can't be streamed".format(key))
+
+        frame.keys.add(key)
+        self.begin_item()
+        self.write(encode_key(key) + ": ")
+
+    def value(self, value):
+        self.begin_item()
+        self.write(encode_value(value))
+
+        if self.frames and self.frames[-1].wrapper:
+            self.close()
+
+    def function(self, tag):
+        """
+        Open the single-key mapping for a short-form function and return its name
+        """
+
+        name = tag[1:]
+
+        if name not in UNCONVERTED_SUFFIXES:
+            name = "{}{}".format(FN_PREFIX, name)
+
+        self.open(True, wrapper=True)
+        self.key(name)
+
+        return name
+
+    def construct_scalar(self, event):
+        tag = event.tag
+
+        if tag is None or tag == "!":
+            tag = self.constructor.resolve(yaml.ScalarNode, event.value, event.implicit)
+
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, event.style)
+
+        try:
+            return self.constructor.construct_object(node, deep=True)
+        finally:
+            self.constructor.constructed_objects.pop(node, None)
+
+    def not_a_pair(self, frame, found, mark):
+        return ConstructorError(
+            "while constructing {}".format(frame.pairs), frame.mark,
+            "expected a mapping of length 1, but found {}".format(found), mark,
+        )
+
+    def scalar(self, event):
+        frame = self.frames[-1] if self.frames else None
+
+        if frame is not None and frame.getatt is not None:
+            frame.getatt.append(event.value)
+            return
+
+        if frame is not None and frame.pairs:
+            raise self.not_a_pair(frame, "scalar", event.start_mark)
+
+        is_function = event.tag is not None and event.tag.startswith("!") and event.tag != "!"
+
+        if frame is not None and frame.is_mapping and frame.expect_key:
+            if is_function:
+                raise TypeError("unhashable type: 'ODict'")
+
+            self.key(self.construct_scalar(event))
+            return
+
+        if not is_function:
+            self.value(self.construct_scalar(event))
+            return
+
+        if self.function(event.tag) == "Fn::GetAtt":
+            self.open(False)
+            for part in event.value.split(".", 1):
+                self.value(part)
+            self.close()
+        else:
+            self.value(event.value)
+
+    def collection_start(self, event, is_mapping):
+        frame = self.frames[-1] if self.frames else None
+
+        if frame is not None and frame.getatt is not None:
+            raise TypeError("Object of type {} is not JSON serializable".format(
+                "MappingNode" if is_mapping else "SequenceNode"))
+
+        if frame is not None and frame.is_mapping and frame.expect_key:
+            raise TypeError("unhashable type: '{}'".format("ODict" if is_mapping else "list"))
+
+        if frame is not None and frame.pairs:
+            if not is_mapping:
+                raise self.not_a_pair(frame, "sequence", event.start_mark)
+
+            # Its key and value are written as an array, as the loader's (key, value) tuple would be
+            self.open(False)
+            self.frames[-1].pair = True
+            self.frames[-1].mark = event.start_mark
+            return
+
+        if event.tag in PAIRS_TAGS:
+            if is_mapping:
+                raise ConstructorError(
+                    "while constructing {}".format(PAIRS_TAGS[event.tag]), event.start_mark,
+                    "expected a sequence, but found mapping", event.start_mark,
+                )
+
+            self.open(False)
+            self.frames[-1].pairs = PAIRS_TAGS[event.tag]
+            self.frames[-1].mark = event.start_mark
+            return
+
+        if event.tag == TAG_PREFIX + "set":
+            # The loader makes a set, which dump_json can't write
+            raise TypeError("Object of type set is not JSON serializable")
+
+        if event.tag is not None and event.tag not in PLAIN_TAGS and not event.tag.startswith("!"):
+            raise ConstructorError(
+                None, None, "could not determine a constructor for the tag {!r}".format(event.tag), event.start_mark,
+            )
+
+        if event.tag is not None and event.tag.startswith("!") and event.tag != "!":
+            if self.function(event.tag) == "Fn::GetAtt":
+                if is_mapping:
+                    raise ValueError("Unexpected node type: mapping for !GetAtt\n{}".format(event.start_mark))
+
+                getatt = Frame(False)
+                getatt.getatt = []
+                self.frames.append(getatt)
+                return
+
+        self.open(is_mapping)
+
+    def collection_end(self):
+        frame = self.frames[-1]
+
+        if frame.getatt is not None:
+            self.frames.pop()
+            self.open(False)
+            for part in frame.getatt:
+                self.value(part)
+
+        if frame.pair and frame.count != 2:
+            raise ConstructorError(
+                "while constructing {}".format(self.frames[-2].pairs), self.frames[-2].mark,
+                "expected a single mapping item, but found {} items".format(frame.count // 2), frame.mark,
+            )
+
+        self.close()
+
+    def document_start(self, event):
+        if self.documents:
+            raise ComposerError(
+                "expected a single document in the stream", self.document_mark,
+                "but found another document", event.start_mark,
+            )
+
+        self.documents += 1
+        self.document_mark = event.start_mark
+
+    def record(self, event):
+        """
+        Keep the events of anchored nodes so that aliases can replay them
+        """
+
+        if not self.replaying and isinstance(event, (yaml.ScalarEvent, yaml.CollectionStartEvent)):
+            if event.anchor is not None:
+                if event.anchor in self.anchors:
+                    raise ComposerError(
+                        "found duplicate anchor {!r}".format(event.anchor), None,
+                        "second occurrence", event.start_mark,
+                    )
+
+                self.recordings.append(Recording(event.anchor))
+
+        if not self.recordings:
+            return
+
+        for recording in self.recordings:
+            recording.events.append(event)
+
+            if isinstance(event, yaml.CollectionStartEvent):
+                recording.depth += 1
+            elif isinstance(event, yaml.CollectionEndEvent):
+                recording.depth -= 1
+
+        while self.recordings and self.recordings[-1].depth == 0:
+            recording = self.recordings.pop()
+            self.anchors[recording.anchor] = recording.events
+
+    def alias(self, event):
+        if event.anchor not in self.anchors:
+            raise ComposerError(None, None, "found undefined alias {!r}".format(event.anchor), event.start_mark)
+
+        replaying, self.replaying = self.replaying, True
+
+        try:
+            for recorded in self.anchors[event.anchor]:
+                self.handle(recorded)
+        finally:
+            self.replaying = replaying
+
+    def handle(self, event):
+        if isinstance(event, yaml.AliasEvent):
+            self.alias(event)
+            return
+
+        self.record(event)
+
+        if isinstance(event, yaml.ScalarEvent):
+            self.scalar(event)
+        elif isinstance(event, yaml.MappingStartEvent):
+            self.collection_start(event, True)
+        elif isinstance(event, yaml.SequenceStartEvent):
+            self.collection_start(event, False)
+        elif isinstance(event, yaml.CollectionEndEvent):
+            self.collection_end()
+        elif isinstance(event, yaml.DocumentStartEvent):
+            self.document_start(event)
+
+    def close_stream(self):
+        if not self.documents:
+            self.write("null")
+
+        self.output.flush()
+        self.constructor.dispose()
+
+
+def stream_yaml_to_json(source, output):
+    """
+    Convert YAML from a string or file to JSON written to output,
+    without building the whole template in memory
+    """
+
+    writer = YamlToJsonWriter(output)
+
+    for event in yaml.parse(source, Loader=get_loader(source)):
+        writer.handle(event)
+
+    writer.close_stream()
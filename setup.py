@@ -33,6 +33,9 @@ setup(
     ],
     zip_safe=False,
     entry_points={
-        "console_scripts": ["cfn-flip=cfn_flip.main:main"],
+        "console_scripts": [
+            "cfn-flip=cfn_flip.main:main",
+            "cfn-flip-client=cfn_flip.client:main",
+        ],
     },
 )
@@ -0,0 +1,159 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_flip.asynchronous import AsyncExecutor, get_executor, set_executor
+import asyncio
+import cfn_flip
+import pytest
+import threading
+import time
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture
+def json_template():
+    return open("examples/test.json", "r").read()
+
+
+@pytest.fixture
+def yaml_template():
+    return open("examples/test.yaml", "r").read()
+
+
+@pytest.fixture(params=["thread", "process"])
+def executor(request):
+    executor = AsyncExecutor(request.param, workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_conversions(executor, json_template, yaml_template):
+    async def convert():
+        return await asyncio.gather(
+            cfn_flip.flip_async(json_template, executor=executor),
+            cfn_flip.flip_async(json_template, clean_up=True, executor=executor),
+            cfn_flip.to_json_async(yaml_template, executor=executor),
+            cfn_flip.to_yaml_async(json_template, long_form=True, executor=executor),
+        )
+
+    assert run(convert()) == [
+        cfn_flip.flip(json_template),
+        cfn_flip.flip(json_template, clean_up=True),
+        cfn_flip.to_json(yaml_template),
+        cfn_flip.to_yaml(json_template, long_form=True),
+    ]
+
+
+def test_errors_are_raised(executor):
+    with pytest.raises(Exception):
+        run(cfn_flip.flip_async("{", in_format="json", executor=executor))
+
+
+def test_default_executor(json_template, yaml_template):
+    previous = set_executor(AsyncExecutor("thread", workers=1))
+
+    try:
+        assert run(cfn_flip.flip_async(json_template)) == yaml_template
+    finally:
+        get_executor().shutdown()
+        set_executor(previous)
+
+
+class Tracker(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.most = 0
+        self.calls = 0
+
+    def work(self, seconds):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.most = max(self.most, self.active)
+
+        time.sleep(seconds)
+
+        with self.lock:
+            self.active -= 1
+
+
+def test_bounded_concurrency():
+    executor = AsyncExecutor("thread", workers=8, max_concurrency=3)
+    tracker = Tracker()
+
+    async def work():
+        await asyncio.gather(*[executor.run(tracker.work, 0.01) for _ in range(12)])
+
+    run(work())
+    executor.shutdown()
+
+    assert tracker.calls == 12
+    assert tracker.most == 3
+
+
+def test_timeout_drops_waiting_work():
+    executor = AsyncExecutor("thread", workers=1, max_concurrency=1)
+    tracker = Tracker()
+
+    async def work():
+        slow = asyncio.ensure_future(executor.run(tracker.work, 0.2))
+
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(tracker.work, 0, timeout=0.05)
+
+        await slow
+
+        # The slot taken by the timed out call is free again
+        await executor.run(tracker.work, 0, timeout=1)
+
+    run(work())
+    executor.shutdown()
+
+    assert tracker.calls == 2
+
+
+def test_cancellation():
+    executor = AsyncExecutor("thread", workers=1, max_concurrency=1)
+    tracker = Tracker()
+
+    async def work():
+        slow = asyncio.ensure_future(executor.run(tracker.work, 0.1))
+        waiting = asyncio.ensure_future(executor.run(tracker.work, 0))
+
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        await slow
+
+    run(work())
+    executor.shutdown()
+
+    assert tracker.calls == 1
+
+
+def test_unknown_pool():
+    with pytest.raises(ValueError, match="Unknown pool"):
+        AsyncExecutor("fibre")
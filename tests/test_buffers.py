@@ -0,0 +1,196 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from click.testing import CliRunner
+from cfn_flip import main, sniff_format
+from cfn_flip.cache import MemoryCache
+from cfn_tools import dump_json, load_json, load_yaml
+from cfn_tools.buffers import SNIFF_SIZE, BufferReader, TemplateFile, TemplateMap, decode, head
+from cfn_tools.odict import ODict
+import cfn_flip
+import glob
+import io
+import mmap
+import pathlib
+import pytest
+import yaml
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+
+def outcome(function, *args, **kwargs):
+    try:
+        return function(*args, **kwargs)
+    except Exception as e:
+        return type(e)
+
+
+def big_template(resources=5000):
+    return dump_json(ODict((
+        ("Resources", ODict(
+            ("Bucket{}".format(index), ODict((("Type", "AWS::S3::Bucket"),)))
+            for index in range(resources)
+        )),
+    )))
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+@pytest.mark.parametrize("kind", [bytes, bytearray, memoryview, pathlib.Path, TemplateMap])
+def test_same_as_text(path, kind):
+    raw = open(path, "rb").read()
+
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return
+
+    with TemplateFile(path, mmap_size=0) as mapped:
+        template = {pathlib.Path: pathlib.Path(path), TemplateMap: mapped}.get(kind) or kind(raw)
+
+        assert outcome(cfn_flip.load, template) == outcome(cfn_flip.load, text)
+
+        for options in ({}, {"clean_up": True}, {"no_flip": True}):
+            assert outcome(cfn_flip.flip_with_format, template, **options) == \
+                outcome(cfn_flip.flip_with_format, text, **options)
+
+
+@pytest.mark.parametrize("function", [cfn_flip.flip, cfn_flip.to_json, cfn_flip.to_yaml])
+def test_paths(function):
+    path = "examples/test.json" if function is cfn_flip.to_yaml else "examples/test.yaml"
+
+    assert function(pathlib.Path(path), clean_up=True) == function(open(path, "r").read(), clean_up=True)
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-32"])
+def test_encodings(encoding):
+    text = open("examples/test_multibyte.json", "r", encoding="utf-8").read()
+
+    assert load_json(text.encode(encoding)) == load_json(text)
+    assert load_json(memoryview(text.encode(encoding))) == load_json(text)
+    assert decode(text.encode(encoding)) == text
+
+    # YAML has UTF-16 only with a byte order mark
+    if encoding != "utf-16-le" and encoding != "utf-32":
+        assert load_yaml(bytearray(text.encode(encoding))) == load_yaml(text)
+
+
+@pytest.mark.parametrize("text", [
+    "true",
+    "true" + " " * SNIFF_SIZE,
+    "true" + " " * SNIFF_SIZE + "x",
+    " " * SNIFF_SIZE + "- a",
+    " " * (SNIFF_SIZE - 2) + "-",
+    " " * (SNIFF_SIZE - 2) + "- a",
+    " " * (SNIFF_SIZE - 2) + "---",
+    "\ufeff" * 2000 + "{}",
+    "a: b\n" * 2000,
+    "",
+])
+def test_sniff_format(text):
+    assert sniff_format(text.encode("utf-8")) == sniff_format(text)
+    assert sniff_format(memoryview(text.encode("utf-16"))) == sniff_format(text)
+
+
+def test_head():
+    text = "Resources: {}\n" + "a: \u00e9\n" * 2000
+    start = head(text.encode("utf-8"))
+
+    assert text.startswith(start)
+    assert len(start) < len(text)
+
+
+def test_errors_read_the_same():
+    with pytest.raises(yaml.scanner.ScannerError, match="line 1, column 4:\n    a: 'unterminated"):
+        load_yaml(b"a: 'unterminated")
+
+    with pytest.raises(yaml.scanner.ScannerError, match="line 1, column 4:\n    a: 'unterminated"):
+        load_yaml(memoryview(b"a: 'unterminated"))
+
+
+def test_buffer_reader():
+    reader = BufferReader(memoryview(b"abcdefg"))
+
+    assert reader.read(3) == b"abc"
+    assert reader.read(10) == b"defg"
+    assert reader.read(3) == b""
+    assert BufferReader(bytearray(b"abc")).read() == b"abc"
+
+
+def test_template_file(tmpdir):
+    path = tmpdir.join("template.json")
+    path.write(big_template(10))
+
+    with TemplateFile(path.strpath) as template:
+        assert type(template) is bytes
+
+    with TemplateFile(pathlib.Path(path.strpath), mmap_size=0) as template:
+        assert type(template) is TemplateMap
+        assert cfn_flip.load(template) == cfn_flip.load(path.read())
+
+    assert template.closed
+
+    with open(path.strpath, "rb") as f:
+        with TemplateFile(f, mmap_size=0) as template:
+            assert type(template) is TemplateMap
+
+    with TemplateFile(io.StringIO("a: b")) as template:
+        assert template == "a: b"
+
+
+@pytest.mark.skipif(not hasattr(mmap, "MADV_DONTNEED"), reason="madvise is only on Unix with Python 3.8 and later")
+def test_template_map_is_let_go_as_its_read(tmpdir):
+    path = tmpdir.join("template.yaml")
+    path.write(cfn_flip.to_yaml(big_template()))
+
+    with TemplateFile(path.strpath, mmap_size=0) as template:
+        assert load_yaml(template) == load_yaml(path.read())
+        assert template.released > len(template) // 2
+
+    with TemplateFile(path.strpath, mmap_size=0) as template:
+        decode(template)
+        assert template.released == len(template) - len(template) % mmap.PAGESIZE
+
+
+def test_memory_cache():
+    cache = MemoryCache()
+    template = open("examples/test.yaml", "r").read()
+
+    cfn_flip.load(template, cache=cache)
+    cfn_flip.load(template.encode("utf-8"), cache=cache)
+    cfn_flip.load(pathlib.Path("examples/test.yaml"), cache=cache)
+
+    assert cache.hits == 2
+
+
+@pytest.mark.parametrize("resources", [10, 5000])
+def test_cli(tmpdir, resources):
+    # Big enough to be memory-mapped, or not
+    source = tmpdir.join("template.json")
+    source.write(big_template(resources))
+    output = tmpdir.join("template.yaml")
+
+    result = CliRunner().invoke(main.main, [source.strpath, output.strpath])
+
+    assert result.exit_code == 0
+    assert output.read() == cfn_flip.flip(source.read())
+
+
+def test_cli_stdin():
+    template = open("examples/test.json", "r").read()
+
+    for path in ([], ["-"]):
+        result = CliRunner().invoke(main.main, path, input=template)
+
+        assert result.exit_code == 0
+        assert result.output == cfn_flip.flip(template)
@@ -0,0 +1,262 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from click.testing import CliRunner
+from cfn_flip import main
+from cfn_clean import clean
+from cfn_flip.cache import Cache, MemoryCache, default_cache_dir
+from cfn_tools._config import config
+import cfn_flip
+import os
+import pathlib
+import pytest
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return Cache(tmpdir.join("cache").strpath)
+
+
+@pytest.fixture
+def json_template():
+    return open("examples/test.json", "r").read()
+
+
+@pytest.fixture
+def yaml_template():
+    return open("examples/test.yaml", "r").read()
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("Should have come from the cache")
+
+
+def test_flip_uses_cache(cache, json_template, yaml_template, monkeypatch):
+    assert cfn_flip.flip(json_template, cache=cache) == yaml_template
+    assert (cache.hits, cache.misses, cache.writes) == (0, 1, 1)
+
+    monkeypatch.setattr(cfn_flip, "load_json", fail)
+    monkeypatch.setattr(cfn_flip, "dump_yaml", fail)
+
+    assert cfn_flip.flip(json_template, cache=cache) == yaml_template
+    assert cfn_flip.flip_with_format(json_template, cache=cache) == (yaml_template, "yaml")
+    assert (cache.hits, cache.misses, cache.writes) == (2, 1, 1)
+    assert cache.hit_rate == pytest.approx(2.0 / 3)
+
+
+def test_to_json_and_to_yaml_use_cache(cache, json_template, yaml_template):
+    for _ in range(2):
+        assert cfn_flip.to_json(yaml_template, cache=cache) == json_template
+        assert cfn_flip.to_yaml(json_template, cache=cache) == yaml_template
+
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+@pytest.mark.parametrize("options", [
+    {"clean_up": True},
+    {"long_form": True},
+    {"out_format": "json"},
+    {"no_flip": True},
+])
+def test_options_change_key(cache, json_template, options):
+    cfn_flip.flip(json_template, cache=cache)
+
+    assert cfn_flip.flip(json_template, cache=cache, **options) == cfn_flip.flip(json_template, **options)
+    assert cache.hits == 0
+
+
+def test_max_col_width_changes_key(cache):
+    key = cache.key("flip", "{}", {})
+
+    try:
+        config.max_col_width = 80
+        assert cache.key("flip", "{}", {}) != key
+    finally:
+        config.reset("max_col_width")
+
+    assert cache.key("flip", "{}", {}) == key
+    assert cache.key("flip", b"{}", {}) == key
+    assert cache.key("to_json", "{}", {}) != key
+
+
+def test_errors_are_not_cached(cache):
+    for _ in range(2):
+        with pytest.raises(Exception):
+            cfn_flip.flip("{", in_format="json", cache=cache)
+
+    assert (cache.hits, cache.writes) == (0, 0)
+
+
+def test_eviction_removes_least_recently_used(cache):
+    for key in ("aa01", "bb02", "cc03"):
+        cache.put(key, "x" * 100)
+        os.utime(cache.path(key), (1000, 1000))
+
+    # Reading aa01 makes it the most recently used
+    assert cache.get("aa01") == "x" * 100
+
+    cache.max_size = 300
+    cache.put("dd04", "x" * 100)
+
+    assert cache.evictions == 2
+    assert cache.get("bb02") is None
+    assert cache.get("cc03") is None
+    assert cache.get("aa01") == "x" * 100
+    assert cache.get("dd04") == "x" * 100
+    assert cache.size == sum(size for _, size, _ in cache.entries())
+
+
+def test_damaged_entries_are_misses(cache):
+    cache.put("abcd", ("text", "yaml"))
+
+    assert cache.get("abcd") == ("text", "yaml")
+
+    with open(cache.path("abcd"), "w") as f:
+        f.write("[\"trunc")
+
+    assert cache.get("abcd") is None
+    assert not os.path.exists(cache.path("abcd"))
+
+
+def test_clear(cache):
+    cache.put("abcd", "text")
+    cache.put("cdef", "text")
+    cache.clear()
+
+    assert list(cache.entries()) == []
+    assert list(Cache(cache.directory + "-missing").entries()) == []
+
+
+def test_default_cache_dir(monkeypatch):
+    monkeypatch.setenv("CFN_FLIP_CACHE_DIR", "/somewhere")
+
+    assert default_cache_dir() == "/somewhere"
+
+    monkeypatch.delenv("CFN_FLIP_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", "/cache")
+
+    assert default_cache_dir() == os.path.join("/cache", "cfn-flip")
+
+
+def test_memory_cache_load_returns_copies(json_template):
+    cache = MemoryCache()
+    expected = cfn_flip.load(json_template)
+
+    first = cfn_flip.load(json_template, cache=cache)
+    clean(first[0])
+    first[0].clear()
+
+    second = cfn_flip.load(json_template, cache=cache)
+    third = cfn_flip.load(json_template, cache=cache)
+
+    assert second == third == expected
+    assert second[0] is not third[0]
+    assert (cache.hits, cache.misses, cache.writes) == (2, 1, 1)
+    assert cache.size > 0
+
+
+def test_memory_cache_keeps_aliases():
+    cache = MemoryCache()
+    template = "One: &shared [a, b]\nTwo: *shared\n"
+
+    for _ in range(2):
+        data, _ = cfn_flip.load(template, cache=cache)
+
+        assert data["One"] is data["Two"]
+
+    assert cache.hits == 1
+
+
+def test_memory_cache_flip(json_template, yaml_template, monkeypatch):
+    cache = MemoryCache()
+
+    assert cfn_flip.flip(json_template, cache=cache) == yaml_template
+
+    monkeypatch.setattr(cfn_flip, "load_json", fail)
+
+    assert cfn_flip.flip(json_template, cache=cache) == yaml_template
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_cache_evicts_by_size():
+    cache = MemoryCache(max_size=1200)
+
+    for key in ("aa01", "bb02", "cc03"):
+        cache.put(key, "x" * 300)
+
+    # Reading aa01 makes it the most recently used
+    assert cache.get("aa01") == "x" * 300
+
+    cache.put("dd04", "x" * 300)
+
+    assert cache.evictions == 1
+    assert cache.get("bb02") is None
+    assert [cache.get(key) is not None for key in ("aa01", "cc03", "dd04")] == [True] * 3
+    assert cache.size <= cache.max_size
+    assert len(cache) == 3
+
+    cache.put("ee05", "x" * 2000)
+
+    assert cache.get("ee05") is None
+
+    cache.clear()
+
+    assert (len(cache), cache.size) == (0, 0)
+
+
+def test_cache_only_stores_text(cache, json_template):
+    with pytest.raises(TypeError, match="can only store text"):
+        cfn_flip.load(json_template, cache=cache)
+
+    with pytest.raises(TypeError, match="can only store text"):
+        cache.put("ee01", ({"A": 1}, "json"))
+
+
+def test_load_refuses_cache_before_parsing(cache):
+    # Not a parse error, so it's refused before the template is read
+    with pytest.raises(TypeError, match="load needs a MemoryCache"):
+        cfn_flip.load("{", cache=cache)
+
+    with pytest.raises(TypeError, match="load needs a MemoryCache"):
+        cfn_flip.load(pathlib.Path("missing.json"), cache=cache)
+
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_cli_cache_stats(tmpdir, yaml_template):
+    runner = CliRunner()
+    cache_dir = tmpdir.join("cache").strpath
+
+    for expected in ("0 hit(s), 1 miss(es), 0% hit rate", "1 hit(s), 0 miss(es), 100% hit rate"):
+        result = runner.invoke(main.main, ["--cache-dir", cache_dir, "--cache-stats", "examples/test.json"])
+
+        assert result.exit_code == 0
+        assert result.stdout == yaml_template
+        assert expected in result.stderr
+        assert "1 entries" in result.stderr
+
+
+def test_batch_cache_stats(tmpdir):
+    cache_dir = tmpdir.join("cache").strpath
+    runner = CliRunner()
+    args = ["--batch", "--cache-stats", "--cache-dir", cache_dir, "--output-dir", tmpdir.strpath,
+            "examples/test.json", "examples/test.yaml"]
+
+    first = runner.invoke(main.main, args)
+    second = runner.invoke(main.main, args)
+
+    assert (first.exit_code, second.exit_code) == (0, 0)
+    assert "0 hit(s), 2 miss(es)" in first.stderr
+    assert "2 hit(s), 0 miss(es), 100% hit rate; 2 entries" in second.stderr
+    assert first.stdout == second.stdout
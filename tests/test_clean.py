@@ -11,9 +11,13 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and limitations under the License.
 """
 
-from cfn_clean import clean
+from cfn_clean import canonical_hash, clean, cfn_literal_parser, mentions_no_value, transform
 from cfn_clean.yaml_dumper import CleanCfnYamlDumper
 from cfn_tools.odict import ODict
+import cfn_flip
+import copy
+import glob
+import pytest
 import yaml
 
 
@@ -457,3 +461,148 @@ def test_reused_sub_params():
     ))
 
     assert clean(source) == expected
+
+
+def test_equal_params_in_any_key_order():
+    """
+    Parts that are equal are reused however their keys are ordered
+    """
+
+    source = {
+        "Fn::Join": [
+            " ",
+            [
+                ODict((("Fn::Select", [1, "a"]), ("Extra", "x"))),
+                ODict((("Fn::Select", [2, "a"]),)),
+                {"Extra": "x", "Fn::Select": [1, "a"]},
+            ],
+        ],
+    }
+
+    expected = ODict((
+        ("Fn::Sub", [
+            "${Param1} ${Param2} ${Param1}",
+            ODict((
+                ("Param1", ODict((("Fn::Select", [1, "a"]), ("Extra", "x")))),
+                ("Param2", ODict((("Fn::Select", [2, "a"]),))),
+            )),
+        ]),
+    ))
+
+    assert clean(source) == expected
+
+
+def test_params_before_no_value_are_reused():
+    """
+    A part equal to one before a conditional that can evaluate to AWS::NoValue is still converted,
+    but the Join is left alone once a new part comes after one
+    """
+
+    select = {"Fn::Select": [0, {"Fn::GetAZs": ""}]}
+    no_value = {"Fn::If": ["Condition", {"Nested": ["AWS::NoValue"]}, "b"]}
+
+    source = {"Fn::Join": ["", [select, no_value, copy.deepcopy(select)]]}
+
+    assert clean(source) == ODict((
+        ("Fn::Sub", [
+            "${Param1}${Param2}${Param1}",
+            ODict((
+                ("Param1", select),
+                ("Param2", no_value),
+            )),
+        ]),
+    ))
+
+    source = {"Fn::Join": ["", [select, no_value, copy.deepcopy(no_value)]]}
+
+    assert clean(source) == {"Fn::Join": ["", [select, no_value, no_value]]}
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("AWS::NoValue", True),
+    (["a", {"b": ["Ref: AWS::NoValue"]}], True),
+    ({"AWS::NoValue": 1}, True),
+    ([b"AWS::NoValue"], True),
+    (["AWS::", "NoValue", 1, 2.5, None, True], False),
+])
+def test_mentions_no_value(value, expected):
+    assert mentions_no_value(value) == expected
+    assert ("AWS::NoValue" in str(value)) == expected
+
+
+def test_mentions_no_value_with_recursion():
+    value = ["a"]
+    value.append(value)
+
+    assert not mentions_no_value(value)
+
+
+def test_canonical_hash():
+    assert canonical_hash(ODict((("a", 1), ("b", [1, 2])))) == canonical_hash({"b": [1.0, 2], "a": True})
+    assert canonical_hash({"a": [1, 2]}) != canonical_hash({"a": [2, 1]})
+    assert canonical_hash({"a": bytearray(b"x")}) is None
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob("examples/*.*")))
+def test_transform_matches_clean_and_literal(path):
+    data, _ = cfn_flip.load(open(path, "r").read())
+    expected = cfn_literal_parser(clean(copy.deepcopy(data)))
+
+    assert repr(transform(data)) == repr(expected)
+
+
+def test_transform_cleans_before_keeping_literals():
+    """
+    A Join in a state machine's definition is converted before the definition is kept as JSON,
+    and a Type is only checked once it's been cleaned
+    """
+
+    definition = ODict((
+        ("Comment", ODict((
+            ("Fn::Join", ["", ["a", "b"]]),
+        ))),
+    ))
+
+    source = [
+        ODict((
+            ("Type", "AWS::StepFunctions::StateMachine"),
+            ("Properties", ODict((
+                ("DefinitionString", definition),
+            ))),
+        )),
+        ODict((
+            ("Type", ODict((
+                ("Fn::Join", ["::", ["AWS", "StepFunctions", "StateMachine"]]),
+            ))),
+            ("Properties", ODict((
+                ("DefinitionString", ODict((("Comment", "c"),))),
+            ))),
+        )),
+    ]
+
+    expected = cfn_literal_parser(clean(copy.deepcopy(source)))
+    actual = transform(source)
+
+    assert actual == expected
+    assert actual[0]["Properties"]["DefinitionString"] == '{\n  "Comment": "ab"\n}'
+    assert actual[1]["Type"] == "AWS::StepFunctions::StateMachine"
+
+
+@pytest.mark.parametrize("clean_up,literal", [(True, False), (False, True), (False, False)])
+def test_transform_one_pass(clean_up, literal):
+    source = {
+        "Type": "AWS::StepFunctions::StateMachine",
+        "Properties": {
+            "DefinitionString": {"Fn::Join": ["", ["a", "b"]]},
+        },
+    }
+
+    expected = copy.deepcopy(source)
+
+    if clean_up:
+        expected = clean(expected)
+
+    if literal:
+        expected = cfn_literal_parser(expected)
+
+    assert transform(source, clean_up, literal) == expected
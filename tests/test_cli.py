@@ -17,7 +17,8 @@
 # limitations under the License.
 #
 from click.testing import CliRunner
-from cfn_flip import main
+from cfn_flip import flip, main
+import pytest
 
 
 def test_cli_with_version():
@@ -155,3 +156,141 @@ def test_specified_yaml_output_overrides_j_flag(tmpdir):
     assert not result.exception
     assert result.exit_code == 0
     assert file_output.read() == file_standard
+
+
+def make_batch(tmpdir):
+    tmpdir.join('one.json').write(open('examples/test.json', 'r').read())
+    tmpdir.mkdir('nested').join('two.yaml').write(open('examples/test.yaml', 'r').read())
+    tmpdir.join('bad.json').write('{"unterminated": ')
+    tmpdir.join('notes.txt').write('not a template')
+
+
+def test_batch_directory(tmpdir):
+    make_batch(tmpdir)
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['--batch', '--jobs', '2', tmpdir.strpath])
+
+    assert result.exit_code == 1
+    assert tmpdir.join('one.yaml').read() == open('examples/test.yaml', 'r').read()
+    assert tmpdir.join('nested', 'two.json').read() == open('examples/test.json', 'r').read()
+    assert not tmpdir.join('bad.yaml').exists()
+    assert not tmpdir.join('notes.json').exists()
+    assert "Error: {}: Expecting value".format(tmpdir.join('bad.json').strpath) in result.output
+    assert "Converted 2 template(s), 1 failed" in result.output
+
+
+def test_batch_directory_again(tmpdir):
+    make_batch(tmpdir)
+
+    runner = CliRunner()
+    runner.invoke(main.main, ['--batch', '--jobs', '1', tmpdir.strpath])
+    written = tmpdir.join('one.yaml').read()
+    result = runner.invoke(main.main, ['--batch', '--jobs', '1', tmpdir.strpath])
+
+    assert result.exit_code == 1
+    assert "would overwrite an input, use --output-dir" in result.output
+    assert tmpdir.join('one.yaml').read() == written
+
+
+def test_batch_keeps_newer_sibling(tmpdir):
+    tmpdir.join('stack.json').write(open('examples/test.json', 'r').read())
+    sibling = tmpdir.join('stack.yaml')
+    sibling.write('# Written by hand\nResources: {}\n')
+    sibling.setmtime(tmpdir.join('stack.json').mtime() + 60)
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['--batch', '--jobs', '1', tmpdir.strpath])
+
+    assert result.exit_code == 1
+    assert "would overwrite an input" in result.output
+    assert sibling.read() == '# Written by hand\nResources: {}\n'
+
+
+def test_batch_writes_utf8(tmpdir):
+    tmpdir.join('one.json').write_text(u'{"Description": "caf\u00e9 \u2603"}', encoding='utf-8')
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['--batch', '--jobs', '1', tmpdir.strpath])
+
+    assert result.exit_code == 0
+    assert tmpdir.join('one.yaml').read_text(encoding='utf-8') == u'Description: caf\u00e9 \u2603\n'
+
+
+def test_batch_globs_and_output_dir(tmpdir):
+    make_batch(tmpdir)
+    output_dir = tmpdir.join('out')
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, [
+        '-b', '-c', '-d', output_dir.strpath, '--jobs', '1',
+        tmpdir.join('*.json').strpath, tmpdir.join('**', 'two.yaml').strpath,
+    ])
+
+    assert result.exit_code == 1
+    assert output_dir.join('one.yaml').read() == flip(open('examples/test.json', 'r').read(), clean_up=True)
+    assert output_dir.join('nested', 'two.json').exists()
+    assert "Converted 2 template(s), 1 failed" in result.output
+
+
+def test_batch_replaces_outputs_whole(tmpdir):
+    tmpdir.join('one.json').write(open('examples/test.json', 'r').read())
+    output = tmpdir.mkdir('out').join('one.yaml')
+    output.write('old')
+    output.chmod(0o640)
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['-b', '-d', tmpdir.join('out').strpath, tmpdir.join('one.json').strpath])
+
+    assert result.exit_code == 0
+    assert output.read() == open('examples/test.yaml', 'r').read()
+    assert output.stat().mode & 0o777 == 0o640
+    assert [f.basename for f in tmpdir.join('out').listdir()] == ['one.yaml']
+
+
+@pytest.mark.parametrize('option', [['--jobs', '2'], ['--output-dir', 'out']])
+def test_batch_options_need_batch(tmpdir, option):
+    runner = CliRunner()
+    result = runner.invoke(main.main, option + ['examples/test.json'])
+
+    assert result.exit_code == 2
+    assert "{} can only be used with --batch".format(option[0]) in result.output
+
+
+def test_batch_no_flip_needs_output_dir(tmpdir):
+    tmpdir.join('one.json').write(open('examples/test.json', 'r').read())
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['-b', '-n', tmpdir.strpath])
+
+    assert result.exit_code == 1
+    assert "would overwrite an input, use --output-dir" in result.output
+
+    result = runner.invoke(main.main, ['-b', '-n', '-d', tmpdir.join('out').strpath, tmpdir.strpath])
+
+    assert result.exit_code == 0
+    assert tmpdir.join('out', 'one.json').read() == open('examples/test.json', 'r').read()
+
+
+def test_batch_missing_path(tmpdir):
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['-b', tmpdir.join('missing.json').strpath])
+
+    assert result.exit_code == 1
+    assert "No such file or directory" in result.output
+
+
+def test_batch_needs_paths():
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['--batch'])
+
+    assert result.exit_code == 2
+    assert "--batch needs at least one path" in result.output
+
+
+def test_too_many_arguments():
+    runner = CliRunner()
+    result = runner.invoke(main.main, ['examples/test.json', 'out.yaml', 'extra'])
+
+    assert result.exit_code == 2
+    assert "Got unexpected extra argument (extra)" in result.output
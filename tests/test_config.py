@@ -51,14 +51,14 @@ def test_config_apply_configs():
     assert temp_my_func() == 200
 
 
-def test_config_apply_type_null():
-    _CONFIG_DEFAULTS['test_nullable'] = _ConfigArg(dtype=bool, nullable=True, has_default=False)
+def test_config_apply_type_null(monkeypatch):
+    monkeypatch.setitem(_CONFIG_DEFAULTS, 'test_nullable', _ConfigArg(dtype=bool, nullable=True, has_default=False))
     test_config = _Config()
     test_config.test_nullable = None
     assert test_config.test_nullable is None
 
 
-def test_config_apply_type_null_error():
-    _CONFIG_DEFAULTS['test_nullable'] = _ConfigArg(dtype=int, nullable=False, has_default=True, default="nil")
+def test_config_apply_type_null_error(monkeypatch):
+    monkeypatch.setitem(_CONFIG_DEFAULTS, 'test_nullable', _ConfigArg(dtype=int, nullable=False, has_default=True, default="nil"))
     with pytest.raises(ValueError):
         _ = _Config()
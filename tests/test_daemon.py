@@ -0,0 +1,255 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_flip import client
+from cfn_flip.daemon import Daemon, run
+from cfn_tools._config import config
+import os
+import pytest
+import shutil
+import socket
+import tempfile
+import threading
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters, so avoid pytest's long tmpdir paths
+    directory = tempfile.mkdtemp(prefix="cfn-flip-")
+    yield os.path.join(directory, "daemon.sock")
+    shutil.rmtree(directory)
+
+
+@pytest.fixture
+def daemon(socket_path):
+    daemon = Daemon(socket_path)
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    yield daemon
+    daemon.close()
+    thread.join()
+
+
+def run_client(argv, stdin, monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", client.Stdin(stdin))
+
+    with pytest.raises(SystemExit) as e:
+        client.main(argv)
+
+    out, err = capsys.readouterr()
+
+    return e.value.code, out, err
+
+
+def test_client_uses_daemon(daemon, monkeypatch, capsys):
+    expected = open("examples/test.yaml", "r").read()
+
+    status, out, err = run_client(["--socket", daemon.path, "examples/test.json"], "", monkeypatch, capsys)
+
+    assert (status, out, err) == (0, expected, "")
+
+
+def test_client_forwards_stdin(daemon, monkeypatch, capsys):
+    expected = open("examples/test.json", "r").read()
+    source = open("examples/test.yaml", "r").read()
+
+    status, out, err = run_client(["--socket={}".format(daemon.path), "-j"], source, monkeypatch, capsys)
+
+    assert (status, out, err) == (0, expected, "")
+
+
+def test_client_reports_errors(daemon, monkeypatch, capsys):
+    status, out, err = run_client(["--socket", daemon.path, "examples/invalid"], "", monkeypatch, capsys)
+
+    assert status == 1
+    assert err.startswith("Error: Expecting property name")
+
+
+def test_client_without_daemon(socket_path, monkeypatch, capsys):
+    expected = open("examples/test.yaml", "r").read()
+
+    status, out, err = run_client(["--socket", socket_path, "examples/test.json"], "", monkeypatch, capsys)
+
+    assert (status, out) == (0, expected)
+
+
+def test_bind_replaces_stale_socket(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    daemon = Daemon(socket_path)
+    daemon.bind()
+    daemon.close()
+
+    assert not os.path.exists(socket_path)
+
+
+def test_bind_refuses_other_files(socket_path):
+    open(socket_path, "w").close()
+
+    with pytest.raises(RuntimeError, match="isn't a socket"):
+        Daemon(socket_path).bind()
+
+    assert os.path.exists(socket_path)
+
+
+def test_bind_refuses_running_daemon(daemon):
+    with pytest.raises(RuntimeError, match="already listening"):
+        Daemon(daemon.path).bind()
+
+
+def test_default_socket_path(monkeypatch):
+    monkeypatch.delenv("CFN_FLIP_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+
+    assert client.default_socket_path() == "/run/user/1000/cfn-flip.sock"
+
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+
+    assert client.default_socket_path() == os.path.join(client.temporary_socket_directory(), "cfn-flip.sock")
+
+    monkeypatch.setenv("CFN_FLIP_SOCKET", "/somewhere/else.sock")
+
+    assert client.default_socket_path() == "/somewhere/else.sock"
+
+
+def test_bind_makes_temporary_directory_private(socket_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", os.path.dirname(socket_path))
+    directory = client.temporary_socket_directory()
+
+    daemon = Daemon(os.path.join(directory, "cfn-flip.sock"))
+    daemon.bind()
+    daemon.close()
+
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+
+def test_bind_refuses_shared_temporary_directory(socket_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", os.path.dirname(socket_path))
+    directory = client.temporary_socket_directory()
+    os.mkdir(directory)
+    os.chmod(directory, 0o777)
+
+    with pytest.raises(RuntimeError, match="only the current user"):
+        Daemon(os.path.join(directory, "cfn-flip.sock")).bind()
+
+
+def test_client_refuses_other_users_daemon(daemon, monkeypatch, capsys):
+    uid = os.getuid()
+    monkeypatch.setattr("os.getuid", lambda: uid + 1)
+
+    assert client.request(daemon.path, ["examples/test.json"], None) is None
+    assert "belongs to another user" in capsys.readouterr().err
+
+
+def test_daemon_drops_silent_clients(daemon, monkeypatch):
+    monkeypatch.setattr("cfn_flip.daemon.RECEIVE_TIMEOUT", 0.1)
+    silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    silent.connect(daemon.path)
+
+    try:
+        response = client.request(daemon.path, ["examples/test.json"], None)
+    finally:
+        silent.close()
+
+    assert response["status"] == 0
+    assert response["stdout"] == open("examples/test.yaml", "r").read()
+
+
+def test_run_refuses_serve():
+    response = run({"args": ["--serve"], "cwd": os.getcwd(), "stdin": None})
+
+    assert response["status"] == 2
+
+
+def test_run_without_stdin_shows_help():
+    response = run({"args": [], "cwd": os.getcwd(), "stdin": None})
+
+    assert response["status"] == 0
+    assert "Usage: cfn-flip" in response["stdout"]
+
+
+LONG_DESCRIPTION = '{"Description": "one two three four five six seven eight nine ten eleven twelve"}'
+
+
+def test_run_uses_the_clients_settings(monkeypatch):
+    monkeypatch.setenv("CFN_MAX_COL_WIDTH", "200")
+    config.reset()
+
+    narrow = run({"args": ["-y"], "cwd": os.getcwd(), "stdin": LONG_DESCRIPTION, "env": {"CFN_MAX_COL_WIDTH": "20"}})
+    wide = run({"args": ["-y"], "cwd": os.getcwd(), "stdin": LONG_DESCRIPTION, "env": {}})
+
+    assert narrow["stdout"] == "Description: >-\n  one two three four five\n  six seven eight nine\n  ten eleven twelve\n"
+    assert wide["stdout"] == "Description: one two three four five six seven eight nine ten eleven twelve\n"
+
+    # And the daemon's own are put back
+    assert os.environ["CFN_MAX_COL_WIDTH"] == "200"
+    assert config.max_col_width == 200
+
+
+def test_run_reports_bad_settings():
+    response = run({"args": ["-y"], "cwd": os.getcwd(), "stdin": LONG_DESCRIPTION, "env": {"CFN_MAX_COL_WIDTH": "x"}})
+
+    assert response["status"] == 1
+    assert "invalid literal for int()" in response["stderr"]
+    assert config.max_col_width == 200
+    assert "CFN_MAX_COL_WIDTH" not in os.environ
+
+
+def test_client_sends_settings(socket_path, monkeypatch):
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(1)
+    received = []
+
+    def answer():
+        connection, _ = listener.accept()
+        received.append(client.receive(connection))
+        client.send(connection, {"status": 0, "stdout": "", "stderr": ""})
+        connection.close()
+
+    thread = threading.Thread(target=answer)
+    thread.start()
+    monkeypatch.setenv("CFN_YAML_RESOLVERS", "cfn")
+    monkeypatch.setenv("HOME_OF_SOMETHING_ELSE", "x")
+
+    try:
+        client.request(socket_path, ["-y"], "{}")
+    finally:
+        thread.join()
+        listener.close()
+
+    assert received[0]["env"]["CFN_YAML_RESOLVERS"] == "cfn"
+    assert "HOME_OF_SOMETHING_ELSE" not in received[0]["env"]
+
+
+@pytest.mark.parametrize("argv,expected", [
+    ([], True),
+    (["-j"], True),
+    (["-i", "json", "-c"], True),
+    (["-ci", "json"], True),
+    (["-cijson"], True),
+    (["-"], True),
+    (["--", "-"], True),
+    (["--socket", "/tmp/x", "template.json"], False),
+    (["template.json"], False),
+    (["--cache-dir", "cache", "template.json"], False),
+    (["-b", "templates"], False),
+    (["-cb", "templates"], False),
+    (["--help"], False),
+])
+def test_reads_stdin(argv, expected):
+    assert client.reads_stdin(argv) == expected
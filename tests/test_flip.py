@@ -11,9 +11,11 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and limitations under the License.
 """
 
+from cfn_flip.batch import chunk_templates, run_pool
 from cfn_tools import dump_json, load_json, load_yaml
 from cfn_tools.odict import ODict
 import cfn_flip
+import pathlib
 import pytest
 import yaml
 
@@ -677,3 +679,126 @@ def test_flip_to_yaml_with_json_long_line(input_json_with_long_line, parsed_yaml
     """
     actual = cfn_flip.to_yaml(input_json_with_long_line)
     assert load_yaml(actual) == parsed_yaml_with_long_line
+
+
+@pytest.mark.parametrize("template,expected", [
+    ("", ("json", False)),
+    ('{"a": 1}', ("json", False)),
+    ("\ufeff\n  [1, 2]", ("json", False)),
+    ('"string"', ("json", False)),
+    ("-12.5", ("json", False)),
+    ("null\n", ("json", False)),
+    ("NaN", ("json", False)),
+    ("nothing: here", ("yaml", True)),
+    ("# A comment\n{}", ("yaml", True)),
+    ("---\na: b", ("yaml", True)),
+    ("%YAML 1.1\n---\na: b", ("yaml", True)),
+    ("\ufeffAWSTemplateFormatVersion: '2010-09-09'", ("yaml", True)),
+    ("- a\n- b", ("yaml", True)),
+    ("!Ref foo", ("yaml", True)),
+])
+def test_sniff_format(template, expected):
+    assert cfn_flip.sniff_format(template) == expected
+
+
+def test_load_sniffed_yaml_skips_json(input_yaml, parsed_yaml, monkeypatch):
+    """
+    Templates that can only be YAML should not be parsed as JSON first
+    """
+
+    def fail(template):
+        raise AssertionError("load_json should not be called")
+
+    monkeypatch.setattr(cfn_flip, "load_json", fail)
+
+    assert cfn_flip.load(input_yaml) == (parsed_yaml, "yaml")
+
+
+def test_load_ambiguous_yaml():
+    """
+    YAML flow style is still detected after the JSON parser rejects it
+    """
+
+    assert cfn_flip.load("{a: [b, c]}") == ({"a": ["b", "c"]}, "yaml")
+
+
+def test_load_json_with_bom():
+    assert cfn_flip.load('\ufeff{"a": 1}') == ({"a": 1}, "yaml")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_flip_many(input_json, input_yaml, jobs):
+    templates = [input_json, input_yaml, "{", input_json] * 3
+
+    results = list(cfn_flip.flip_many(templates, jobs=jobs, clean_up=True, chunk_size=100))
+
+    assert [result.index for result in results] == list(range(len(templates)))
+
+    for template, result in zip(templates, results):
+        if template == "{":
+            assert result.output is None
+            assert result.error
+            assert issubclass(result.error_type, ValueError)
+        else:
+            output, out_format = cfn_flip.flip_with_format(template, clean_up=True)
+            assert (result.output, result.out_format, result.error) == (output, out_format, None)
+
+
+def test_flip_many_unordered(input_json):
+    templates = (input_json for _ in range(20))
+
+    results = list(cfn_flip.flip_many(templates, jobs=2, ordered=False, out_format="json", chunk_size=1))
+
+    assert sorted(result.index for result in results) == list(range(20))
+    assert set(result.output for result in results) == {cfn_flip.flip(input_json, out_format="json")}
+
+
+def test_flip_many_reads_templates_as_needed(input_json):
+    taken = []
+
+    def templates():
+        for index in range(100):
+            taken.append(index)
+            yield input_json
+
+    results = cfn_flip.flip_many(templates(), jobs=2, out_format="json", chunk_size=1)
+    next(results)
+
+    assert len(taken) < 10
+
+    assert len(list(results)) == 99
+    assert len(taken) == 100
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_run_pool_raises(ordered):
+    with pytest.raises(ValueError, match="invalid literal"):
+        list(run_pool(int, ["1", "2", "x", "4"], 2, ordered=ordered))
+
+
+def test_flip_many_nothing():
+    assert list(cfn_flip.flip_many([], jobs=4)) == []
+
+
+def test_chunk_templates():
+    chunks = list(chunk_templates(["aaaa", "bb", "c", "dddddd", "e"], size=4))
+
+    assert chunks == [
+        [(0, "aaaa")],
+        [(1, "bb"), (2, "c"), (3, "dddddd")],
+        [(4, "e")],
+    ]
+
+
+def test_flip_many_paths(tmpdir, input_json):
+    source = tmpdir.join("template.json")
+    source.write(input_json)
+    templates = [pathlib.Path(source.strpath), input_json, pathlib.Path(tmpdir.join("missing.json").strpath)]
+
+    results = list(cfn_flip.flip_many(templates, jobs=1, chunk_size=10))
+
+    # The file counts for its size, the missing file for nothing
+    assert [len(chunk) for chunk in chunk_templates(templates, size=source.size() + len(input_json))] == [2, 1]
+    assert [len(chunk) for chunk in chunk_templates(templates, size=source.size() + len(input_json) + 1)] == [3]
+    assert results[0].output == results[1].output == cfn_flip.flip(input_json)
+    assert "No such file or directory" in results[2].error
@@ -0,0 +1,170 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_clean import clean, clean_steps, cfn_literal_parser, literal_steps
+from cfn_tools import finish
+from cfn_flip.incremental import Cancelled, Conversion, dump_yaml_steps, load_steps
+from cfn_tools.literal import LiteralString
+from cfn_tools.odict import ODict
+import cfn_flip
+import copy
+import glob
+import pytest
+import re
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+OPTIONS = [
+    {},
+    {"clean_up": True},
+    {"long_form": True},
+    {"no_flip": True},
+    {"out_format": "json", "clean_up": True},
+]
+
+
+def outcome(function, *args, **kwargs):
+    """
+    The result of a call, or the type and message of what it raised without object addresses
+    """
+
+    try:
+        return "ok", function(*args, **kwargs)
+    except Exception as e:
+        return "error", type(e), re.sub(r" at 0x[0-9a-f]+", "", str(e))
+
+
+@pytest.fixture
+def json_template():
+    return open("examples/test.json", "r").read()
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+@pytest.mark.parametrize("options", OPTIONS)
+def test_same_as_flip(path, options):
+    template = open(path, "r").read()
+
+    assert Conversion(template, step_size=7, **options).run() == cfn_flip.flip(template, **options)
+
+
+@pytest.mark.parametrize("path", [path for path in EXAMPLES if path.endswith(".json")])
+def test_literal_same_as_to_yaml(path):
+    template = open(path, "r").read()
+
+    assert Conversion(template, literal=True).run() == cfn_flip.to_yaml(template)
+
+
+@pytest.mark.parametrize("template", [
+    "",
+    "a: &x [1, 2]\nb: *x\n",
+    "a: !GetAtt [x, 1]\nb: !GetAtt x.y.z\n",
+    "a: !Sub {x: 1}\nb: !Join ['', [a, !Ref b]]\n",
+    "a: 2001-01-01\nb: !!binary aGVsbG8=\nc: !!str 1\n",
+    "<<: {a: 1}\nb: 2\n",
+    "a: 1\n---\nb: 2\n",
+    "a: *nope\n",
+    "a: 1\na: 2\nb: 3\n",
+    "1: 2\n2.5: x\ntrue: y\nnull: z\n",
+    "a:\tb\n",
+    "x: [",
+    '{"a": [1, 2.5, "x", null, true, {"b": {}}], "c": []}',
+    '{"a": 1, "a": 2}',
+    "{a: 1}",
+    "{",
+    "-1",
+])
+def test_load_steps_same_as_load(template):
+    assert outcome(finish, load_steps(template)) == outcome(cfn_flip.load, template)
+
+
+@pytest.mark.parametrize("clean_up,long_form", [(False, False), (True, False), (False, True)])
+def test_dump_yaml_steps_falls_back(clean_up, long_form):
+    # Bytes that YamlWriter can't write, and a literal with a tab that libyaml won't
+    data = ODict((("Key", b"bytes"), ("Script", LiteralString("a\tb\nc\n"))))
+
+    assert finish(dump_yaml_steps(data, clean_up, long_form)) == cfn_flip.dump_yaml(data, clean_up, long_form)
+
+
+def test_aliases_are_shared():
+    data, _ = finish(load_steps("a: &x [1, 2]\nb: *x\n"))
+
+    assert data["a"] is data["b"]
+
+
+def test_recursive_alias():
+    data, _ = finish(load_steps("&a [*a]"))
+
+    assert data[0] is data
+
+
+def test_steps_are_bounded(json_template):
+    conversion = Conversion(json_template, step_size=5)
+    stages = []
+
+    while not conversion.step():
+        assert conversion.nodes % 5 == 0
+        stages.append(conversion.stage)
+
+    assert conversion.output == cfn_flip.flip(json_template)
+    assert conversion.out_format == "yaml"
+    assert conversion.nodes > 10
+    assert stages[0] == "load" and stages[-1] == "dump"
+    assert conversion.step()
+
+
+def test_iterate(json_template):
+    conversion = Conversion(json_template, clean_up=True, step_size=10)
+    progress = list(conversion)
+
+    assert progress == sorted(progress)
+    assert progress[-1] == conversion.nodes
+    assert conversion.done
+    assert conversion.output == cfn_flip.flip(json_template, clean_up=True)
+
+
+def test_cancel(json_template):
+    conversion = Conversion(json_template, step_size=1)
+    conversion.step()
+    conversion.cancel()
+
+    assert conversion.cancelled
+    assert conversion.output is None
+
+    with pytest.raises(Cancelled):
+        conversion.step()
+
+
+def test_errors_are_kept():
+    conversion = Conversion("{", in_format="json")
+
+    with pytest.raises(ValueError) as first:
+        conversion.run()
+
+    with pytest.raises(ValueError) as second:
+        conversion.step()
+
+    assert first.value is second.value
+
+
+def test_step_size():
+    with pytest.raises(ValueError, match="step_size"):
+        Conversion("{}", step_size=0)
+
+
+@pytest.mark.parametrize("path", ["examples/test.json", "examples/test_json_state_machine.json"])
+def test_clean_and_literal_steps(path):
+    data, _ = cfn_flip.load(open(path, "r").read())
+
+    assert finish(clean_steps(copy.deepcopy(data))) == clean(copy.deepcopy(data))
+    assert finish(literal_steps(copy.deepcopy(data))) == cfn_literal_parser(copy.deepcopy(data))
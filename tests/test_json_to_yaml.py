@@ -0,0 +1,119 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_tools import load_json
+from cfn_tools.json_tokenizer import JsonTokenizer, KEY, MAP_END, MAP_START, SCALAR, SEQ_END, SEQ_START
+import cfn_flip
+import glob
+import json
+import pytest
+import six
+
+EXAMPLES = sorted(glob.glob("examples/*.json"))
+
+
+def stream(source, long_form=False):
+    output = six.StringIO()
+    cfn_flip.to_yaml_stream(source, output, long_form=long_form)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("long_form", [False, True])
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_stream_examples(path, long_form):
+    """
+    Streaming should produce exactly what loading and dumping does
+    """
+
+    with open(path, "r") as f:
+        source = f.read()
+
+    assert stream(source, long_form) == cfn_flip.dump_yaml(load_json(source), long_form=long_form)
+
+
+@pytest.mark.parametrize("long_form", [False, True])
+@pytest.mark.parametrize("source", [
+    '{}',
+    '"plain"',
+    '{"a": [], "b": {}, "c": [{}]}',
+    '{"Ref": "Thing"}',
+    '{"Fn::GetAtt": ["Thing", "Arn"]}',
+    '{"Ref": "Thing", "Other": 1}',
+    '{"Fn::Join": ["", [{"Ref": "A"}, "b"]], "Ref": {"Ref": "C"}}',
+    '{"a": {"Fn::Sub": ["x", {"y": {"Fn::If": ["c", {"Ref": "AWS::NoValue"}, "z"]}}]}}',
+    '{"Fn::Base64": {"Fn::Sub": "x"}}',
+    '[1, 2.5, 1e5, -0, true, false, null, "0123", "a\\nb", "caf\\u00e9", NaN, -Infinity]',
+])
+def test_stream_matches_dump_yaml(source, long_form):
+    assert stream(source, long_form) == cfn_flip.dump_yaml(load_json(source), long_form=long_form)
+
+
+def test_stream_from_small_chunks():
+    with open("examples/test.json", "r") as f:
+        source = f.read()
+
+    tokens = list(JsonTokenizer(six.StringIO(source), chunk_size=3))
+
+    assert tokens == list(JsonTokenizer(source))
+
+
+def test_tokenizer():
+    tokens = list(JsonTokenizer('{"a": [1, "b", {}], "c": null}'))
+
+    assert tokens == [
+        (MAP_START, None),
+        (KEY, "a"),
+        (SEQ_START, None),
+        (SCALAR, 1),
+        (SCALAR, "b"),
+        (MAP_START, None),
+        (MAP_END, None),
+        (SEQ_END, None),
+        (KEY, "c"),
+        (SCALAR, None),
+        (MAP_END, None),
+    ]
+
+
+@pytest.mark.parametrize("source", [
+    "",
+    '{"a" 1}',
+    '[1 2]',
+    '{"a": 1}x',
+    '\n\n  {\n "a": tru }',
+    '{"a": "unterminated',
+    '{1: 2}',
+])
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_tokenizer_errors(source, chunk_size):
+    """
+    Errors should match those from the json module, wherever the chunks fall
+    """
+
+    with pytest.raises(ValueError) as expected:
+        json.loads(source)
+
+    if chunk_size:
+        tokenizer = JsonTokenizer(six.StringIO(source), chunk_size=chunk_size)
+    else:
+        tokenizer = JsonTokenizer(source)
+
+    with pytest.raises(ValueError) as actual:
+        list(tokenizer)
+
+    assert str(actual.value) == str(expected.value)
+
+
+def test_stream_rejects_duplicate_keys():
+    with pytest.raises(ValueError, match="Duplicate key 'a'"):
+        stream('{"a": 1, "a": 2}')
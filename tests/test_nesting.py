@@ -0,0 +1,166 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+
+Templates nested far deeper than the recursion limit
+
+Comparisons go through iterencode because == and repr recurse too.
+"""
+
+from cfn_clean import MAX_DEPTH, clean, cfn_literal_parser, transform
+from cfn_flip.incremental import Conversion
+from cfn_tools import dump_json, load_json, load_yaml
+from cfn_tools.json_encoder import iterencode
+from cfn_tools.yaml_loader import CfnYamlLoader
+import cfn_clean
+import cfn_flip
+import pytest
+import sys
+
+DEPTH = 10000
+
+# Indented JSON grows with the square of the depth
+JSON_DEPTH = 2000
+
+
+def encode(data):
+    return "".join(iterencode(data, None))
+
+
+def nested_lists(depth):
+    return "[" * depth + "1" + "]" * depth
+
+
+def nested_ifs(depth):
+    return "a: " + "!If [c, " * depth + "x" + ", y]" * depth + "\n"
+
+
+def nested_joins(depth):
+    joins = {"Fn::Join": ["", ["a"]]}
+
+    for _ in range(depth):
+        joins = {"Fn::Join": ["", [joins, "b", {"Ref": "c"}]]}
+
+    return joins
+
+
+def test_deeper_than_recursion_limit():
+    assert DEPTH > sys.getrecursionlimit()
+
+
+def test_load_json():
+    template = '{"a": ' * DEPTH + "1" + "}" * DEPTH
+
+    assert encode(load_json(template)) == template
+
+
+def test_load_yaml():
+    template = "- " * DEPTH + "1\n"
+
+    assert encode(load_yaml(template)) == nested_lists(DEPTH)
+
+
+def test_load_yaml_tags():
+    data = load_yaml(nested_ifs(DEPTH))
+    expected = encode(data)
+    condition = data["a"]
+
+    for _ in range(DEPTH):
+        assert list(condition) == ["Fn::If"]
+        assert condition["Fn::If"][0] == "c"
+        assert condition["Fn::If"][2] == "y"
+        condition = condition["Fn::If"][1]
+
+    assert condition == "x"
+    assert encode(clean(data)) == expected
+
+
+def test_construct_mapping_defers_children():
+    loader = CfnYamlLoader("a: {b: {c: 1}}")
+
+    try:
+        node = loader.get_single_node()
+        depth = [0]
+        construct_object = loader.construct_object
+
+        def counting(node, deep=False):
+            depth[0] += 1
+            deepest[0] = max(deepest[0], depth[0])
+            try:
+                return construct_object(node, deep)
+            finally:
+                depth[0] -= 1
+
+        deepest = [0]
+        loader.construct_object = counting
+        data = loader.construct_document(node)
+    finally:
+        loader.dispose()
+
+    assert data == {"a": {"b": {"c": 1}}}
+    assert deepest[0] == 1
+
+
+def test_dump_json():
+    data = load_json(nested_lists(JSON_DEPTH))
+
+    assert dump_json(data).split() == ["["] * JSON_DEPTH + ["1"] + ["]"] * JSON_DEPTH
+
+
+def test_dump_yaml():
+    assert cfn_flip.dump_yaml(load_json(nested_lists(DEPTH))) == "- " * DEPTH + "1\n"
+
+
+@pytest.mark.parametrize("clean_up", [False, True])
+def test_flip(clean_up):
+    assert cfn_flip.flip(nested_lists(DEPTH), clean_up=clean_up) == "- " * DEPTH + "1\n"
+
+    template = "- " * JSON_DEPTH + "1\n"
+
+    assert cfn_flip.flip(template, clean_up=clean_up).split() == ["["] * JSON_DEPTH + ["1"] + ["]"] * JSON_DEPTH
+
+
+def test_conversion():
+    template = nested_lists(DEPTH)
+
+    assert Conversion(template, clean_up=True, literal=True).run() == cfn_flip.to_yaml(template)
+
+
+def test_clean_joins():
+    data = clean(nested_joins(DEPTH))
+
+    for _ in range(DEPTH - 1):
+        assert data["Fn::Sub"][0] == "${Param1}b${c}"
+        data = data["Fn::Sub"][1]["Param1"]
+
+    assert data == {"Fn::Sub": "ab${c}"}
+
+
+@pytest.mark.parametrize("depth", [MAX_DEPTH - 1, MAX_DEPTH, MAX_DEPTH + 1, 3 * MAX_DEPTH])
+def test_switch_to_stack(monkeypatch, depth):
+    """
+    The recursive and iterative versions agree wherever the switch happens
+    """
+
+    joins = nested_joins(depth)
+    expected = encode(clean(nested_joins(depth)))
+
+    monkeypatch.setattr(cfn_clean, "MAX_DEPTH", 0)
+
+    assert encode(clean(joins)) == expected
+
+
+@pytest.mark.parametrize("function", [cfn_literal_parser, transform])
+def test_literal(function):
+    template = '{"a": ' * DEPTH + '"x"' + "}" * DEPTH
+
+    assert encode(function(load_json(template))) == template
@@ -9,9 +9,11 @@ or in the "license" file accompanying this file. This file is distributed on an
 """
 
 from cfn_tools.odict import ODict
+from cfn_tools.yaml_dumper import CfnYamlDumper
 from copy import deepcopy
 import pickle
 import pytest
+import yaml
 
 
 def test_get_set():
@@ -85,17 +87,17 @@ def test_constructor_disallows_dict():
 
 def test_explicit_sorting():
     """
-    Even an explicit sort should result in no change
+    Even a dumper that sorts keys should leave the order unchanged
     """
 
     case = ODict((
         ("z", 1),
         ("a", 2),
-    )).items()
+    ))
 
-    actual = sorted(case)
+    actual = yaml.dump(case, Dumper=CfnYamlDumper, sort_keys=True)
 
-    assert actual == case
+    assert actual == "z: 1\na: 2\n"
 
 
 def test_post_deepcopy_repr():
@@ -122,3 +124,21 @@ def test_pickle():
     data = pickle.dumps(dct)
     dct2 = pickle.loads(data)
     assert dct == dct2
+
+
+def test_plain_dicts_still_sorted():
+    """
+    Only ODicts keep their order, plain dicts are sorted as before
+    """
+
+    case = {
+        "z": 1,
+        "a": ODict((
+            ("y", 2),
+            ("b", 3),
+        )),
+    }
+
+    actual = yaml.dump(case, Dumper=CfnYamlDumper, default_flow_style=False)
+
+    assert actual == "a:\n  y: 2\n  b: 3\nz: 1\n"
@@ -0,0 +1,167 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_flip import YAML_WRITERS
+from cfn_flip.cache import MemoryCache
+from cfn_flip.yaml_dumper import Dumper, get_dumper
+from cfn_tools import dump_json, load_yaml
+from cfn_tools._config import config
+from cfn_tools.resolver import CfnResolver, with_cfn_resolvers
+from cfn_tools.yaml_loader import CfnCYamlLoader, CfnYamlLoader, get_loader
+import cfn_flip
+import glob
+import itertools
+import pytest
+import yaml
+
+TAG_STR = "tag:yaml.org,2002:str"
+TAG_TIMESTAMP = "tag:yaml.org,2002:timestamp"
+
+SCALARS = [
+    "", "~", "null", "Null", "NULL", "nul", "n", "no", "NO", "nO", "yes", "Yes", "y", "on", "OFF", "Off",
+    "true", "True", "tRUE", "false", "0", "00", "007", "08", "0b101", "0b2", "0x1F", "0xg", "0o7", "-1", "+1",
+    "1_000", "1:30", "1:60", "-1:30", "1.", "1.5", "-.5", ".5", "1e5", "1.0e+5", "1.0e5", "1:30.5",
+    ".inf", "-.Inf", "+.INF", ".NaN", ".nan", "-.nan", "<<", "<", "=", "==", "!", "&", "*", "!x",
+    "2010-09-09", "2001-12-14t21:59:43.10-05:00", "2001-12-14 21:59:43.10 -5", "2010-9-9",
+    "1\n", "true\n", "a", "AWS::Region", "python3.11", "1.2.3", "10.0.0.0/16", "arn:aws:s3:::bucket",
+]
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+
+@pytest.fixture
+def cfn_resolvers(monkeypatch):
+    monkeypatch.setattr(config, "yaml_resolvers", "cfn")
+
+
+def resolvers(cls, *args):
+    return cls(*args), with_cfn_resolvers(cls)(*args)
+
+
+@pytest.mark.parametrize("value", SCALARS + ["".join(chars) for chars in itertools.product("01.-:e", repeat=3)])
+def test_same_as_safe_loader(value):
+    """
+    Everything but timestamps resolves as before, for loading and dumping
+    """
+
+    for base, cfn in (resolvers(CfnYamlLoader, ""), resolvers(Dumper, None)):
+        for implicit in itertools.product((True, False), repeat=2):
+            expected = base.resolve(yaml.ScalarNode, value, implicit)
+
+            if expected == TAG_TIMESTAMP:
+                expected = TAG_STR
+
+            assert cfn.resolve(yaml.ScalarNode, value, implicit) == expected
+
+
+def test_collections_resolve_as_before():
+    base, cfn = resolvers(CfnYamlLoader, "")
+
+    for kind in (yaml.SequenceNode, yaml.MappingNode):
+        assert cfn.resolve(kind, None, True) == base.resolve(kind, None, True)
+
+
+def test_implicit_resolvers_agree():
+    cfn = with_cfn_resolvers(CfnYamlLoader)("")
+
+    for value in SCALARS:
+        tags = [tag for tag, regexp in cfn.yaml_implicit_resolvers.get(value[:1], []) if regexp.match(value)]
+
+        assert (tags[0] if tags else TAG_STR) == cfn.resolve(yaml.ScalarNode, value, (True, False))
+
+
+def test_variants_are_kept():
+    assert with_cfn_resolvers(CfnYamlLoader) is with_cfn_resolvers(CfnYamlLoader)
+    assert issubclass(with_cfn_resolvers(CfnYamlLoader), CfnYamlLoader)
+
+
+def test_off_by_default():
+    assert config.yaml_resolvers == "yaml"
+    assert get_loader("a: b") in (CfnYamlLoader, CfnCYamlLoader)
+    assert get_dumper() is Dumper
+
+
+def test_configured(cfn_resolvers):
+    assert issubclass(get_loader("a: b"), CfnResolver)
+    assert issubclass(get_loader("a:\n\tb"), CfnResolver)
+    assert issubclass(get_dumper(clean_up=True), CfnResolver)
+
+    if CfnCYamlLoader is not None:
+        assert issubclass(get_dumper(libyaml=True), CfnResolver)
+
+
+def test_unknown(monkeypatch):
+    monkeypatch.setattr(config, "yaml_resolvers", "json")
+
+    with pytest.raises(ValueError, match="yaml_resolvers"):
+        get_dumper()
+
+
+def test_timestamps_stay_strings(cfn_resolvers):
+    data = load_yaml("a: 2010-09-09\nb: 2001-12-14 21:59:43.10 -5\nc: 1\nd: yes\ne: ~\n")
+
+    assert data == {"a": "2010-09-09", "b": "2001-12-14 21:59:43.10 -5", "c": 1, "d": True, "e": None}
+
+
+@pytest.mark.parametrize("writer", YAML_WRITERS)
+def test_dates_are_not_quoted(cfn_resolvers, writer):
+    data = {"a": "2010-09-09", "b": "1", "c": "yes"}
+
+    assert cfn_flip.dump_yaml(data, writer=writer) == "a: 2010-09-09\nb: '1'\nc: 'yes'\n"
+
+
+def test_to_json(cfn_resolvers):
+    template = "a: 2010-09-09\nb: 2017-03-02 19:52:00\n"
+
+    assert cfn_flip.to_json(template) == dump_json({"a": "2010-09-09", "b": "2017-03-02 19:52:00"})
+
+
+def test_to_json_stream(cfn_resolvers, tmp_path):
+    template = "a: 2017-03-02 19:52:00\nb: [1, x]\n"
+    path = tmp_path / "out.json"
+
+    with open(str(path), "w") as output:
+        cfn_flip.to_json_stream(template, output)
+
+    assert path.read_text() == cfn_flip.to_json(template)
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_examples(path, monkeypatch):
+    """
+    Templates without timestamps flip the same either way
+    """
+
+    template = open(path, "r").read()
+    expected = [cfn_flip.flip(template), cfn_flip.flip(template, clean_up=True)]
+
+    monkeypatch.setattr(config, "yaml_resolvers", "cfn")
+
+    actual = [cfn_flip.flip(template), cfn_flip.flip(template, clean_up=True)]
+
+    if "2010-09-09" not in template:
+        assert actual == expected
+    else:
+        # The only difference is that the version is no longer a date
+        assert [text.replace("'2010-09-09'", "2010-09-09") for text in expected] == actual
+
+
+def test_cache_keeps_them_apart(monkeypatch):
+    cache = MemoryCache()
+    template = "a: 2017-03-02 19:52:00\n"
+    expected = cfn_flip.to_json(template, cache=cache)
+
+    monkeypatch.setattr(config, "yaml_resolvers", "cfn")
+
+    assert cfn_flip.to_json(template, cache=cache) != expected
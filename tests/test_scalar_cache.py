@@ -0,0 +1,137 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_flip import YAML_WRITERS
+from cfn_tools.yaml_dumper import MAX_CACHED_LENGTH, ScalarCache, analysis_cache, style_cache
+import cfn_flip
+import glob
+import pytest
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+
+@pytest.fixture
+def calls():
+    made = []
+
+    def make(value):
+        made.append(value)
+        return value.upper()
+
+    return made, make
+
+
+def test_hits_and_misses(calls):
+    made, make = calls
+    cache = ScalarCache()
+
+    assert cache.fetch("a", None, make, "a") == "A"
+    assert cache.fetch("a", None, make, "a") == "A"
+    assert cache.fetch("a", "other", make, "a") == "A"
+
+    assert made == ["a", "a"]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.hit_rate == pytest.approx(1.0 / 3)
+    assert len(cache) == 2
+
+
+def test_eviction(calls):
+    made, make = calls
+    cache = ScalarCache(max_size=2)
+
+    for value in "abc":
+        cache.fetch(value, None, make, value)
+
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+    # The oldest went first
+    cache.fetch("a", None, make, "a")
+    cache.fetch("c", None, make, "c")
+
+    assert made == ["a", "b", "c", "a"]
+
+
+def test_long_strings_are_not_kept(calls):
+    made, make = calls
+    cache = ScalarCache()
+    value = "x" * (MAX_CACHED_LENGTH + 1)
+
+    cache.fetch(value, None, make, value)
+    cache.fetch(value, None, make, value)
+
+    assert len(made) == 2
+    assert len(cache) == 0
+    assert cache.uncached == 2
+    assert cache.hit_rate == 0.0
+
+
+def test_turned_off(calls):
+    made, make = calls
+    cache = ScalarCache(max_size=0)
+
+    cache.fetch("a", None, make, "a")
+    cache.fetch("a", None, make, "a")
+
+    assert made == ["a", "a"]
+    assert len(cache) == 0
+
+
+def test_clear(calls):
+    _, make = calls
+    cache = ScalarCache()
+    cache.fetch("a", None, make, "a")
+    cache.clear()
+
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    def turn_off():
+        for cache in (style_cache, analysis_cache):
+            monkeypatch.setattr(cache, "max_size", 0)
+
+    return turn_off
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+@pytest.mark.parametrize("writer", YAML_WRITERS)
+def test_same_output_without_cache(path, writer, no_cache):
+    data, _ = cfn_flip.load(open(path, "r").read())
+    options = [(False, False), (True, False), (False, True)]
+    cached = [cfn_flip.dump_yaml(data, clean_up, long_form, writer=writer) for clean_up, long_form in options]
+
+    no_cache()
+
+    assert [cfn_flip.dump_yaml(data, clean_up, long_form, writer=writer) for clean_up, long_form in options] == cached
+
+
+def test_flavours_are_kept_apart():
+    data = {"a": "0123", "b": "x\ny"}
+
+    for _ in range(2):
+        assert cfn_flip.dump_yaml(data) == "a: '0123'\nb: \"x\\ny\"\n"
+        assert cfn_flip.dump_yaml(data, clean_up=True) == "a: '0123'\nb: |-\n  x\n  y\n"
+
+
+@pytest.mark.parametrize("writer", YAML_WRITERS)
+def test_templates_hit_the_cache(writer):
+    data, _ = cfn_flip.load(open("examples/test.json", "r").read())
+    hits = style_cache.hits
+
+    cfn_flip.dump_yaml(data, writer=writer)
+
+    assert style_cache.hits > hits
+    assert style_cache.hit_rate > 0
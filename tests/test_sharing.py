@@ -0,0 +1,357 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_clean import clean, cfn_literal_parser, clean_steps, transform
+from cfn_flip import YAML_WRITERS, dump_yaml
+from cfn_tools import dump_json, load_json, load_yaml, summarize
+from cfn_tools.odict import ODict
+from cfn_tools.sharing import SharedList, SharedODict, Sharer, thaw, thaw_all, unchanged
+import cfn_flip
+import copy
+import glob
+import json
+import pickle
+import pytest
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+TAGGED = "\n".join([
+    "Resources:",
+    "  A:",
+    "    Type: AWS::S3::Bucket",
+    "    Properties:",
+    "      Name: !Join ['-', [!Ref AWS::StackName, a]]",
+    "      Tags: [{Key: Team, Value: storage}]",
+    "  B:",
+    "    Type: AWS::S3::Bucket",
+    "    Properties:",
+    "      Name: !Join ['-', [!Ref AWS::StackName, b]]",
+    "      Tags: [{Key: Team, Value: storage}]",
+    "  Machine:",
+    "    Type: AWS::StepFunctions::StateMachine",
+    "    Properties:",
+    "      DefinitionString: {StartAt: A}",
+    "      Tags: [{Key: Team, Value: storage}]",
+    "",
+])
+
+
+# Joins that clean won't convert, around parts that it does change, each used more than once
+REFUSED_JOINS = [
+    # A conditional that can be AWS::NoValue
+    {"Fn::Join": ["", [
+        {"Fn::If": ["C", {"Fn::Join": ["-", ["a", {"Fn::GetAtt": ["B", "X.Y"]}]]}, {"Ref": "AWS::NoValue"}]},
+        {"Fn::If": ["D", "x", "y"]},
+    ]]},
+    # Something that isn't a string or a mapping
+    {"Fn::Join": ["", [{"P": {"Fn::Join": ["-", ["a", {"Ref": "B"}]]}}, 7]]},
+    {"Fn::Join": ["", [{"Properties": {"Fn::Join": True, "Q": 1}}, [1]]]},
+    {"Fn::Join": ["-", [{"Fn::Join": ["", [{"Q": {"Fn::Join": ["-", []]}}, True]]}, ["a"]]]},
+]
+
+NESTED_JOINS = [
+    json.dumps({"Resources": {"A": join, "B": join, "C": [join, {"D": join}]}}) for join in REFUSED_JOINS
+] + [
+    "a: &x {}\nb: *x\nc: {}\n".format(json.dumps(join), json.dumps(join)) for join in REFUSED_JOINS
+] + [
+    "a: &x {\"Fn::Join\": {\"Ref\": \"A\"}}\nb: *x\nc: [{\"Ref\": \"B\"}, *x]\n",
+]
+
+
+def contents(value):
+    """
+    The ids of what's in a mapping or list; the shared ones in it are checked separately
+    """
+
+    if isinstance(value, dict):
+        return [(id(key), id(item)) for key, item in value.items()]
+
+    return [id(item) for item in value]
+
+
+def snapshot(data):
+    """
+    Each shared mapping and list in data, with its contents
+    """
+
+    found = []
+    stack = [data]
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, (SharedODict, SharedList)):
+            found.append((value, contents(value)))
+
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+
+    return found
+
+
+def unchanged_since(found):
+    return all(contents(value) == before for value, before in found)
+
+
+def run_steps(steps):
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        return e.value
+
+
+@pytest.mark.parametrize("load", [load_json, load_yaml])
+def test_identical_subtrees_are_shared(load):
+    template = '{"A": {"Tags": [{"Key": "a", "Value": "b"}]}, "B": {"Tags": [{"Key": "a", "Value": "b"}]}}'
+    data = load(template, share=True)
+
+    assert data == load(template)
+    assert isinstance(data, SharedODict)
+    assert data["A"] is data["B"]
+    assert isinstance(data["A"]["Tags"], SharedList)
+
+
+def test_strings_are_interned():
+    data = load_yaml("a: [some text, some text]\nb: !Ref some text\n", share=True)
+
+    assert data["a"][0] is data["a"][1] is data["b"]["Ref"]
+
+
+@pytest.mark.parametrize("load", [load_json, load_yaml])
+def test_scalars_of_different_types_are_kept_apart(load):
+    data = load("[[1], [1.0], [true], [0.0], [-0.0], [1]]", share=True)
+
+    assert data == [[1], [1.0], [True], [0.0], [-0.0], [1]]
+    assert [type(item[0]) for item in data] == [int, float, bool, float, float, int]
+    assert str(data[4][0]) == "-0.0"
+    assert data[0] is data[5]
+    assert len(set(map(id, data))) == 5
+
+
+def test_scalars_are_interned():
+    data = load_json('{"a": [123456, 1.5, "x"], "b": [123456, 1.5, "x"], "c": {"d": 123456}}', share=True)
+
+    assert data["a"] is data["b"]
+    assert data["a"][0] is data["c"]["d"]
+
+
+def test_anchors_are_not_shared():
+    template = "a: &x [1]\nb: *x\nc: [1]\nd: &y !Ref q\ne: *y\nf: !Ref q\n"
+    data = load_yaml(template, share=True)
+
+    assert data["a"] is data["b"] and data["d"] is data["e"]
+    assert type(data["a"]) is list and type(data["d"]) is ODict
+    assert data["c"] is not data["a"] and data["f"] is not data["d"]
+
+    # The aliases survive and nothing else is made into one
+    assert dump_yaml(data) == dump_yaml(load_yaml(template))
+    assert summarize(data).aliases
+
+
+def test_anchored_contents_are_not_shared():
+    template = "a: &x [{P: [1]}, !Ref q]\nb: *x\nc: [{P: [1]}, !Ref q]\n"
+    data = load_yaml(template, share=True)
+
+    assert type(data["a"][0]) is ODict and type(data["a"][0]["P"]) is list and type(data["a"][1]) is ODict
+    assert type(data["c"][0]) is SharedODict
+
+    # Cleaning copies the anchored list but not what's in it, which stays aliased
+    for function in (cfn_flip.to_yaml, cfn_flip.flip):
+        assert function(template, clean_up=True, share=True) == function(template, clean_up=True)
+
+
+def test_frozen():
+    data = load_json('{"a": [1, 2]}', share=True)
+
+    for change in (
+        lambda: data.__setitem__("b", 1),
+        lambda: data.update(b=1),
+        lambda: data.pop("a"),
+        lambda: data.setdefault("b", 1),
+        lambda: data["a"].append(3),
+        lambda: data["a"].__setitem__(0, 3),
+        lambda: data["a"].sort(),
+    ):
+        with pytest.raises(TypeError):
+            change()
+
+    assert data == {"a": [1, 2]}
+
+
+def test_thaw():
+    data = load_json('{"a": [1, 2]}', share=True)
+    mapping = thaw(data)
+    sequence = thaw(data["a"])
+
+    assert type(mapping) is ODict and type(sequence) is list
+    assert mapping == data and sequence == [1, 2]
+
+    mapping["b"] = sequence
+    sequence.append(3)
+
+    assert data == {"a": [1, 2]}
+    assert thaw(mapping) is mapping
+
+
+def test_thaw_all():
+    data = load_json('{"a": [{"b": 1}], "c": {"b": 1}}', share=True)
+    thawed, changed = thaw_all(data)
+
+    assert changed and thawed == data
+    assert type(thawed) is ODict and type(thawed["a"]) is list and type(thawed["a"][0]) is ODict
+    assert thawed["a"][0] is not thawed["c"]
+    assert type(data["c"]) is SharedODict
+
+    plain = load_json('{"a": [{"b": 1}]}')
+
+    assert thaw_all(plain) == (plain, False)
+
+    recursive = load_yaml("&a [*a]")
+
+    assert thaw_all(recursive) == (recursive, False)
+
+
+def test_unchanged():
+    shared = SharedList(["a", "b"])
+
+    assert unchanged(shared, list(shared)) is shared
+    assert unchanged(shared, ["a", "c"]) == ["a", "c"]
+    assert unchanged(["a", "b"], ["a", "b"]) is not shared
+
+
+def test_copy_and_pickle_keep_sharing():
+    data = load_yaml(TAGGED, share=True)
+
+    for copied in (copy.deepcopy(data), pickle.loads(pickle.dumps(data))):
+        assert copied == data
+        assert type(copied["Resources"]["A"]["Properties"]["Tags"]) is SharedList
+        assert copied["Resources"]["A"]["Properties"]["Tags"] is copied["Resources"]["B"]["Properties"]["Tags"]
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_same_output(path):
+    template = open(path, "r").read()
+
+    for load in (load_json, load_yaml):
+        try:
+            plain = load(template)
+        except Exception:
+            continue
+
+        shared = load(template, share=True)
+
+        assert dump_json(shared) == dump_json(plain)
+
+        for writer in YAML_WRITERS:
+            for clean_up in (False, True):
+                for long_form in (False, True):
+                    assert dump_yaml(shared, clean_up, long_form, writer) == dump_yaml(plain, clean_up, long_form, writer)
+
+
+@pytest.mark.parametrize("path", EXAMPLES + ["TAGGED"])
+@pytest.mark.parametrize("function", [
+    clean,
+    cfn_literal_parser,
+    lambda data: transform(data, True, True),
+    lambda data: run_steps(clean_steps(data)),
+])
+def test_cleaning_leaves_shared_values_alone(path, function):
+    template = TAGGED if path == "TAGGED" else open(path, "r").read()
+
+    try:
+        plain = load_yaml(template)
+    except Exception:
+        return
+
+    shared = load_yaml(template, share=True)
+    found = snapshot(shared)
+    expected = function(plain)
+
+    assert dump_yaml(function(shared), clean_up=True) == dump_yaml(expected, clean_up=True)
+    assert unchanged_since(found)
+
+
+def test_cleaning_keeps_what_it_does_not_change_shared():
+    data = clean(load_yaml(TAGGED, share=True))
+    resources = data["Resources"]
+
+    assert resources["A"]["Properties"]["Name"] == {"Fn::Sub": "${AWS::StackName}-a"}
+    assert resources["A"]["Properties"]["Tags"] is resources["Machine"]["Properties"]["Tags"]
+    assert type(resources["Machine"]) is SharedODict
+
+
+def test_summary():
+    data = load_yaml(TAGGED, share=True)
+
+    assert summarize(data) == summarize(load_yaml(TAGGED))
+    assert not summarize(data).aliases
+
+
+@pytest.mark.parametrize("function", [cfn_flip.flip, cfn_flip.to_json, cfn_flip.to_yaml])
+def test_api(function):
+    template = cfn_flip.to_json(TAGGED) if function is cfn_flip.to_yaml else TAGGED
+
+    assert function(template, clean_up=True, share=True) == function(template, clean_up=True)
+
+
+@pytest.mark.parametrize("template", NESTED_JOINS)
+@pytest.mark.parametrize("function", [cfn_flip.flip, cfn_flip.to_json, cfn_flip.to_yaml])
+def test_nested_joins(template, function):
+    assert function(template, clean_up=True, share=True) == function(template, clean_up=True)
+
+
+@pytest.mark.parametrize("template", NESTED_JOINS)
+def test_nested_joins_without_recursing(template, monkeypatch):
+    monkeypatch.setattr("cfn_clean.MAX_DEPTH", 1)
+
+    assert cfn_flip.flip(template, clean_up=True, share=True) == cfn_flip.flip(template, clean_up=True)
+
+
+def test_load():
+    data, in_format = cfn_flip.load(TAGGED, share=True)
+
+    assert in_format == "yaml"
+    assert type(data) is SharedODict
+
+
+def test_memory_cache():
+    cache = cfn_flip.MemoryCache()
+
+    plain, _ = cfn_flip.load(TAGGED, cache=cache)
+    shared, _ = cfn_flip.load(TAGGED, cache=cache, share=True)
+
+    assert type(plain) is ODict and type(shared) is SharedODict
+    assert cache.misses == 2
+
+
+def test_deep():
+    depth = 3000
+    template = "a: " + "[" * depth + "!Join ['', [x, !Ref y]], {b: c}" + "]" * depth + "\n"
+    shared = load_yaml(template, share=True)
+    found = snapshot(shared)
+
+    assert dump_json(clean(shared)) == dump_json(clean(load_yaml(template)))
+    assert unchanged_since(found)
+
+
+def test_unshareable_values_are_left_alone():
+    sharer = Sharer()
+    inner = ODict((("a", "b"),))
+
+    assert sharer.mapping(["x"], [inner]) is None
+    assert sharer.sequence([inner]) is None
+    assert sharer.freeze([inner]) == [inner]
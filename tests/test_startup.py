@@ -0,0 +1,79 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from benchmarks.importtime import import_times
+import os
+import pytest
+import statistics
+import sys
+
+YAML_MODULES = ("yaml", "cfn_flip.yaml_dumper", "cfn_flip.yaml_writer", "cfn_clean.yaml_dumper", "cfn_tools.yaml_dumper")
+
+# Milliseconds that importing cfn_flip may take, several times what it does take (about 10),
+# but less than importing PyYAML and the dumpers eagerly again would (about 60)
+IMPORT_BUDGET = float(os.environ.get("CFN_FLIP_IMPORT_BUDGET", 50))
+
+# Before 3.7 there's no -X importtime, and packages import their lazy attributes straight away
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7), reason="needs Python 3.7")
+
+
+@pytest.mark.parametrize("code", [
+    "import cfn_flip",
+    "import cfn_flip; cfn_flip.flip('{\"A\": 1}', out_format='json', no_flip=True)",
+    "import cfn_flip; cfn_flip.to_json('{\"A\": [1, 2]}', clean_up=True)",
+    "from cfn_flip.main import main; main(['--version'])",
+    "from cfn_flip.main import main; main(['--help'])",
+    "import cfn_flip.client",
+])
+def test_json_only_does_not_import_yaml(code):
+    times = import_times(code)
+
+    assert "cfn_flip" in times
+    assert [module for module in YAML_MODULES if module in times] == []
+
+
+def test_client_does_not_import_click():
+    times = import_times("import cfn_flip.client")
+
+    assert "click" not in times
+    assert "multiprocessing" not in times
+
+
+def test_yaml_is_imported_when_needed():
+    times = import_times("import cfn_flip; cfn_flip.flip('{\"A\": 1}', out_format='yaml')")
+
+    assert "yaml" in times
+    assert "cfn_flip.yaml_writer" in times
+
+
+def test_import_budget():
+    # The median of several runs, so that one slow start doesn't fail it
+    runs = [import_times("import cfn_flip")["cfn_flip"] / 1000.0 for _ in range(7)]
+
+    median = statistics.median(runs)
+
+    assert median < IMPORT_BUDGET, "import cfn_flip took {:.1f} ms, the budget is {} ms".format(median, IMPORT_BUDGET)
+
+
+def test_lazy_attributes():
+    import cfn_flip
+    import cfn_tools
+    from cfn_flip.yaml_dumper import get_dumper
+    from cfn_tools.yaml_loader import CfnYamlLoader
+
+    assert cfn_flip.get_dumper is get_dumper
+    assert cfn_tools.CfnYamlLoader is CfnYamlLoader
+
+    with pytest.raises(AttributeError, match="has no attribute 'missing'"):
+        cfn_flip.missing
@@ -0,0 +1,291 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from click.testing import CliRunner
+from cfn_flip import YAML_WRITERS, dump_yaml, main
+from cfn_flip.yaml_writer import CHUNK_SIZE, Remainder, YamlWriter
+from cfn_tools import dump_json, iterdump, load_json, load_yaml
+from cfn_tools.odict import ODict
+import cfn_flip
+import datetime
+import glob
+import io
+import os
+import pytest
+import stat
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+
+class Recorder(io.StringIO):
+    """
+    A stream that remembers each write
+    """
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+        return super(Recorder, self).write(text)
+
+
+def loaded_examples():
+    found = []
+
+    for path in EXAMPLES:
+        try:
+            found.append(cfn_flip.load(open(path, "r").read())[0])
+        except Exception:
+            pass
+
+    return found
+
+
+def many_resources(count):
+    return ODict((
+        ("Resources", ODict(
+            ("Bucket{}".format(index), ODict((
+                ("Type", "AWS::S3::Bucket"),
+                ("Properties", ODict((
+                    ("BucketName", ODict((("Fn::Sub", "${{AWS::StackName}}-{}".format(index)),))),
+                    ("Tags", [ODict((("Key", "Index"), ("Value", index)))]),
+                ))),
+            )))
+            for index in range(count)
+        )),
+    ))
+
+
+SAMPLES = loaded_examples() + [
+    many_resources(1000),
+    load_json(dump_json(many_resources(1000)), share=True),
+    load_yaml("a: &x [1]\nb: *x\nc: 2010-09-09\n"),
+    ODict((("When", [datetime.datetime(2020, 1, 1, 12)]), ("Empty", ODict()), ("None", []))),
+    [[[[[[1, "x"]]]]]],
+    [],
+    ODict(),
+    "text",
+    1.5,
+    None,
+]
+
+
+@pytest.mark.parametrize("data", SAMPLES)
+@pytest.mark.parametrize("chunk_items", [1, 7, 100])
+def test_iterdump(data, chunk_items):
+    assert "".join(iterdump(data, chunk_items)) == dump_json(data)
+
+
+def test_iterdump_deep():
+    data = ODict((("a", [[[]]]),))
+    inner = data["a"][0][0]
+
+    for _ in range(5000):
+        inner.append([])
+        inner = inner[0]
+
+    assert "".join(iterdump(data)) == dump_json(data)
+
+
+def test_iterdump_is_incremental():
+    pieces = list(iterdump(many_resources(1000), chunk_items=10))
+
+    assert len(pieces) > 100
+    assert max(len(piece) for piece in pieces) < 10000
+
+
+def test_dump_json_stream():
+    data = many_resources(1000)
+    stream = Recorder()
+
+    assert dump_json(data, stream) is None
+    assert stream.getvalue() == dump_json(data)
+    assert len(stream.writes) > 1
+
+
+@pytest.mark.parametrize("data", SAMPLES)
+@pytest.mark.parametrize("writer", YAML_WRITERS)
+@pytest.mark.parametrize("clean_up,long_form", [(False, False), (True, False), (False, True)])
+def test_dump_yaml_stream(data, writer, clean_up, long_form):
+    stream = io.StringIO()
+
+    assert dump_yaml(data, clean_up, long_form, writer, stream=stream) is None
+    assert stream.getvalue() == dump_yaml(data, clean_up, long_form, writer)
+
+
+def test_dump_yaml_stream_is_incremental():
+    data = many_resources(3000)
+    stream = Recorder()
+
+    dump_yaml(data, stream=stream)
+
+    assert len(stream.writes) > 1
+    assert max(len(text) for text in stream.writes) < 2 * CHUNK_SIZE
+
+
+def test_write_to_stops_where_it_has_to():
+    data = many_resources(100)
+    data["Resources"]["Bucket50"]["Properties"]["Key"] = b"bytes"
+    stream = io.StringIO()
+
+    written = YamlWriter().write_to(data, stream, chunk_size=1)
+
+    assert 0 < written == len(stream.getvalue())
+    assert dump_yaml(data).startswith(stream.getvalue())
+
+
+@pytest.mark.parametrize("size", [1000, 3000])
+def test_dump_yaml_stream_falls_back(size):
+    # Something the direct writer can't write, after it's written some of the template
+    data = many_resources(size)
+    data["Resources"]["Bucket{}".format(size - 1)]["Properties"]["Key"] = b"bytes"
+    stream = io.StringIO()
+
+    dump_yaml(data, stream=stream)
+
+    assert stream.getvalue() == dump_yaml(data)
+
+
+def test_remainder():
+    stream = io.StringIO()
+    remainder = Remainder(stream, 5)
+
+    for text in ("ab", "cde", "fg", "", "h"):
+        remainder.write(text)
+
+    remainder.flush()
+
+    assert stream.getvalue() == "fgh"
+
+
+def test_remainder_flushes_the_stream():
+    class Flushed(io.StringIO):
+        flushes = 0
+
+        def flush(self):
+            self.flushes += 1
+
+    stream = Flushed()
+    Remainder(stream, 0).flush()
+
+    assert stream.flushes == 1
+
+    # Streams without a flush are fine too
+    Remainder(object(), 0).flush()
+
+
+def test_repeated_values_are_written_with_aliases():
+    data = load_yaml("a: &x [1]\nb: *x\n")
+    stream = io.StringIO()
+
+    dump_yaml(data, stream=stream)
+
+    assert stream.getvalue() == "a: &id001\n  - 1\nb: *id001\n"
+
+
+@pytest.mark.parametrize("function", [cfn_flip.flip, cfn_flip.to_json, cfn_flip.to_yaml])
+@pytest.mark.parametrize("clean_up", [False, True])
+def test_api(function, clean_up):
+    template = open("examples/test.yaml" if function is not cfn_flip.to_yaml else "examples/test.json", "r").read()
+    stream = io.StringIO()
+
+    assert function(template, clean_up=clean_up, stream=stream) is None
+    assert stream.getvalue() == function(template, clean_up=clean_up)
+
+
+def test_flip_with_format():
+    stream = io.StringIO()
+
+    assert cfn_flip.flip_with_format(open("examples/test.json", "r").read(), stream=stream) == (None, "yaml")
+    assert stream.getvalue() == open("examples/test.yaml", "r").read()
+
+
+@pytest.mark.parametrize("function", [cfn_flip.flip, cfn_flip.to_json, cfn_flip.flip_with_format])
+def test_cache(tmpdir, function):
+    cache = cfn_flip.Cache(tmpdir.strpath)
+    template = open("examples/test.yaml", "r").read()
+    expected = function(template)
+
+    for _ in range(2):
+        stream = io.StringIO()
+        result = function(template, cache=cache, stream=stream)
+
+        assert result == ((None, "json") if function is cfn_flip.flip_with_format else None)
+        assert stream.getvalue() == (expected[0] if function is cfn_flip.flip_with_format else expected)
+
+    assert cache.hits == 1
+
+
+def test_cli(tmpdir):
+    output = tmpdir.join("output.json")
+    result = CliRunner().invoke(main.main, ["examples/test.yaml", output.strpath])
+
+    assert result.exit_code == 0
+    assert output.read() == open("examples/test.json", "r").read()
+
+
+def test_cli_keeps_output_on_error(tmpdir, monkeypatch):
+    output = tmpdir.join("output.json")
+    output.write("previous")
+
+    def fail(template, stream=None, **kwargs):
+        stream.write("partial")
+        raise ValueError("Something went wrong")
+
+    monkeypatch.setattr(main, "flip", fail)
+    result = CliRunner().invoke(main.main, ["examples/test.yaml", output.strpath])
+
+    assert result.exit_code == 1
+    assert "Something went wrong" in result.output
+    assert output.read() == "previous"
+    assert tmpdir.listdir() == [output]
+
+
+def test_cli_replaces_output(tmpdir):
+    output = tmpdir.join("output.json")
+    output.write("previous")
+    output.chmod(0o640)
+    link = tmpdir.join("link.json")
+    link.mksymlinkto(output)
+
+    result = CliRunner().invoke(main.main, ["examples/test.yaml", link.strpath])
+
+    assert result.exit_code == 0
+    assert link.islink()
+    assert output.read() == open("examples/test.json", "r").read()
+    assert output.stat().mode & 0o777 == 0o640
+    assert sorted(tmpdir.listdir()) == [link, output]
+
+
+def test_cli_writes_to_devices(tmpdir):
+    result = CliRunner().invoke(main.main, ["examples/test.yaml", "/dev/null"])
+
+    assert result.exit_code == 0
+    assert stat.S_ISCHR(os.stat("/dev/null").st_mode)
+
+
+def test_cli_output_in_missing_directory(tmpdir):
+    result = CliRunner().invoke(main.main, ["examples/test.yaml", tmpdir.join("missing", "output.json").strpath])
+
+    assert result.exit_code == 1
+    assert "No such file or directory" in result.output
+
+
+def test_cli_stdout():
+    result = CliRunner().invoke(main.main, ["-c", "examples/test.json"])
+
+    assert result.exit_code == 0
+    assert result.output == cfn_flip.flip(open("examples/test.json", "r").read(), clean_up=True)
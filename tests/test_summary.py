@@ -0,0 +1,145 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_clean import needs_clean, needs_literal
+from cfn_tools import Summary, load_json, load_yaml, summarize
+import cfn_flip
+import glob
+import pytest
+
+EXAMPLES = sorted(glob.glob("examples/*.*"))
+
+
+def summary_of(function, template):
+    summary = Summary()
+    function(template, summary)
+
+    return summary
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_loaders_agree_with_summarize(path):
+    template = open(path, "r").read()
+    summary = Summary()
+    data, _ = cfn_flip.load(template, summary=summary)
+
+    assert summary == summarize(data)
+
+
+@pytest.mark.parametrize("template", [
+    "1",
+    "[]",
+    "[[[1]], {}]",
+    '{"a": [1, [2, {"b": null}]], "c": {"d": {}}}',
+])
+def test_json(template):
+    assert summary_of(load_json, template) == summarize(load_json(template))
+
+
+@pytest.mark.parametrize("template", [
+    "x",
+    "!Ref x",
+    "!GetAtt a.b",
+    "- !GetAtt [a, b]\n- !Sub {a: b}\n- !If [c, !Ref d, [1]]\n",
+    "a: &x [1, 2]\nb: *x\n",
+    "a: &x y\nb: *x\n",
+    "&a [*a]",
+])
+def test_yaml(template):
+    assert summary_of(load_yaml, template) == summarize(load_yaml(template))
+
+
+def test_fields():
+    summary = summary_of(load_yaml, "\n".join([
+        "Resources:",
+        "  Machine:",
+        "    Type: AWS::StepFunctions::StateMachine",
+        "    Properties:",
+        "      Name: !Join ['-', [!Ref AWS::StackName, machine]]",
+        "      Role: !GetAtt Role.Arn",
+        "  Other:",
+        "    Type: {Ref: SomeType}",
+    ]))
+
+    assert summary.functions == {"Fn::Join", "Fn::GetAtt", "Ref"}
+    assert summary.resource_types == {"AWS::StepFunctions::StateMachine"}
+    assert not summary.aliases
+    assert summary.max_depth == 8
+    assert summary.nodes == 19
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_without_counting(path):
+    template = open(path, "r").read()
+    summary = Summary(count=False)
+    data, _ = cfn_flip.load(template, summary=summary)
+    counted = summarize(data)
+
+    assert summary.nodes is None and summary.max_depth is None
+    assert summary.functions == counted.functions
+    assert summary.resource_types == counted.resource_types
+    assert summary.aliases == counted.aliases
+
+
+def test_aliases():
+    assert summary_of(load_yaml, "a: &x [1]\nb: *x\n").aliases
+    assert summary_of(load_yaml, "a: &x {b: 1}\nb: *x\n").aliases
+    assert not summary_of(load_yaml, "a: &x 1\nb: *x\n").aliases
+
+
+def test_json_error_is_forgotten():
+    # Loaded as JSON up to c, then as YAML
+    template = '{"a": {"Fn::Join": 1}, c: 2}'
+    summary = Summary()
+    data, in_format = cfn_flip.load(template, summary=summary)
+
+    assert in_format == "yaml"
+    assert summary == summarize(data)
+
+
+def test_needs_clean():
+    assert not needs_clean(summary_of(load_json, '{"a": {"Fn::Sub": "x"}}'))
+    assert needs_clean(summary_of(load_json, '{"a": {"Fn::Join": ["", ["x"]]}}'))
+    assert needs_clean(summary_of(load_yaml, "a: &x [1]\nb: *x\n"))
+
+
+def test_needs_literal():
+    assert not needs_literal(summary_of(load_json, '{"A": {"Type": "AWS::S3::Bucket"}}'))
+    assert needs_literal(summary_of(load_json, '{"A": {"Type": "AWS::StepFunctions::StateMachine"}}'))
+    assert needs_literal(summary_of(load_yaml, "a: &x [1]\nb: *x\n"))
+
+
+def test_passes_are_skipped(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("The pass should have been skipped")
+
+    monkeypatch.setattr(cfn_flip, "clean", fail)
+    monkeypatch.setattr(cfn_flip, "transform", lambda data, clean_up, literal: fail() if clean_up or literal else data)
+
+    template = '{"A": {"Type": "AWS::S3::Bucket", "Properties": {"Name": {"Fn::Sub": "x"}}}}'
+
+    assert cfn_flip.flip(template, clean_up=True)
+    assert cfn_flip.to_yaml(template, clean_up=True)
+    assert cfn_flip.to_json(template, clean_up=True)
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_skipping_does_not_change_output(path, monkeypatch):
+    template = open(path, "r").read()
+    skipped = cfn_flip.to_yaml(template, clean_up=True), cfn_flip.flip(template, clean_up=True)
+
+    monkeypatch.setattr(cfn_flip, "needs_clean", lambda summary: True)
+    monkeypatch.setattr(cfn_flip, "needs_literal", lambda summary: True)
+
+    assert (cfn_flip.to_yaml(template, clean_up=True), cfn_flip.flip(template, clean_up=True)) == skipped
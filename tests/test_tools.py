@@ -12,10 +12,12 @@ See the License for the specific language governing permissions and limitations
 """
 
 from cfn_tools import load_json, load_yaml, dump_json, dump_yaml, CfnYamlDumper
+from cfn_tools.json_encoder import DateTimeAwareJsonEncoder, indent_json
 from cfn_tools.odict import ODict, OdictItems
 from cfn_tools.yaml_loader import multi_constructor, construct_getatt
 from yaml import ScalarNode
 import datetime
+import json
 import pytest
 import six
 
@@ -109,6 +111,36 @@ def test_dump_json():
         })
 
 
+@pytest.mark.parametrize("source", [
+    ODict((("a", [1, [], {}, [2.5, None]]), ("b", ODict((("c", True),))))),
+    ODict((("{[,]}", "]}, {["), ("quote\"", "back\\"), ("", ""))),
+    [ODict(), "\u00e9\u2028\n", float("nan"), -float("inf")],
+    "plain",
+    [],
+])
+def test_dump_json_matches_indented_encoder(source):
+    """
+    The C-encoded output is re-indented to exactly what json.dumps(indent=4) gives
+    """
+
+    expected = json.dumps(source, indent=4, cls=DateTimeAwareJsonEncoder,
+                          separators=(',', ': '), ensure_ascii=False)
+
+    assert dump_json(source) == expected
+
+
+def test_indent_json():
+    assert indent_json('{"a": [1,{}],"b": "[x, y]"}') == "\n".join((
+        "{",
+        '    "a": [',
+        "        1,",
+        "        {}",
+        "    ],",
+        '    "b": "[x, y]"',
+        "}",
+    ))
+
+
 def test_dump_yaml():
     """
     YAML dumping needs to use quoted style for strings with newlines,
@@ -0,0 +1,233 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_clean import clean, cfn_literal_parser
+from cfn_flip.yaml_dumper import get_dumper
+from cfn_tools.literal import LiteralString
+from cfn_tools.odict import ODict
+from cfn_tools.yaml_dumper import CfnCYamlDumper, dump_with_libyaml, indent_sequences
+import cfn_flip
+import glob
+import pytest
+import yaml
+
+requires_libyaml = pytest.mark.skipif(CfnCYamlDumper is None, reason="PyYAML built without libyaml")
+
+EXAMPLES = [
+    path for path in sorted(glob.glob("examples/*"))
+    if path.endswith((".json", ".yaml"))
+]
+
+FLAVOURS = [
+    (False, False),
+    (True, False),
+    (False, True),
+    (True, True),
+]
+
+
+def dump_both(data, clean_up, long_form, width=200):
+    expected = yaml.dump(
+        data,
+        Dumper=get_dumper(clean_up, long_form),
+        default_flow_style=False,
+        allow_unicode=True,
+        width=width,
+    )
+
+    actual = dump_with_libyaml(
+        data,
+        get_dumper(clean_up, long_form, libyaml=True),
+        default_flow_style=False,
+        allow_unicode=True,
+        width=width,
+    )
+
+    return expected, actual
+
+
+@requires_libyaml
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_golden_output(path, clean_up, long_form):
+    """
+    The libyaml dumpers should either match the pure-Python ones byte for byte
+    or decline to produce anything
+    """
+
+    with open(path, "r") as f:
+        data, _ = cfn_flip.load(f.read())
+
+    if clean_up:
+        data = clean(data)
+
+    data = cfn_literal_parser(data)
+
+    expected, actual = dump_both(data, clean_up, long_form)
+
+    assert actual is None or actual == expected
+
+
+@requires_libyaml
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+def test_golden_output_features(clean_up, long_form):
+    data = ODict((
+        ("Account", "0123456789"),
+        ("Tags", [
+            ODict((("Key", "Name"), ("Value", ODict((("Ref", "Name"),))))),
+            ODict((("Key", "Empty"), ("Value", ""))),
+        ]),
+        ("Joined", ODict((("Fn::Join", ["", ["a", ODict((("Ref", "B"),)), [1, 2]]]),))),
+        ("Att", ODict((("Fn::GetAtt", ["Res", "Arn"]),))),
+        ("Script", "#!/bin/bash\nyum -y update\n"),
+        ("Indented", " leading\n  spaces"),
+        ("Definition", LiteralString('{\n  "a": [\n    1\n  ]\n}')),
+        ("Nested", [[["deep"], ODict((("key", ["value"]),))]]),
+        ("Empty", [ODict(), []]),
+    ))
+
+    expected, actual = dump_both(data, clean_up, long_form)
+
+    assert actual == expected
+
+
+@requires_libyaml
+def test_dump_yaml_declines_folded_strings():
+    data = ODict((
+        ("Long", "word " * 50),
+    ))
+
+    expected, actual = dump_both(data, False, False)
+
+    assert actual is None
+    assert cfn_flip.dump_yaml(data) == expected
+
+
+@requires_libyaml
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+@pytest.mark.parametrize("value", [
+    LiteralString("tab\there\nx"),
+    LiteralString('{\n  "a": 1 \n}'),
+    LiteralString("trailing \n"),
+    LiteralString("next\x85line"),
+    "line\u2028separator\nx",
+    "tab\there\nx",
+])
+def test_golden_output_refused_styles(value, clean_up, long_form):
+    """
+    libyaml writes these double-quoted rather than in the style asked for,
+    so it should decline them and every writer should give the same output
+    """
+
+    data = ODict((("Value", value), ("List", [value])))
+    expected, actual = dump_both(data, clean_up, long_form)
+
+    assert actual is None or actual == expected
+
+    for writer in cfn_flip.YAML_WRITERS:
+        assert cfn_flip.dump_yaml(data, clean_up, long_form, writer) == expected
+
+
+@requires_libyaml
+def test_dump_yaml_declines_literals_with_tabs():
+    expected, actual = dump_both(ODict((("Value", LiteralString("tab\there\nx")),)), False, False)
+
+    assert actual is None
+    assert expected == "Value: |-\n  tab\there\n  x\n"
+
+
+@requires_libyaml
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+@pytest.mark.parametrize("data,expected", [
+    (ODict((("", "v"),)), "? ''\n: v\n"),
+    (ODict((("Outer", ODict((("", 1),))),)), "Outer:\n  ? ''\n  : 1\n"),
+    (ODict((("Value", "\U0001F600"),)), "Value: \U0001F600\n"),
+    (ODict(((":\U0001F600", 1),)), ":\U0001F600: 1\n"),
+    (["a\U0001F600b"], "- a\U0001F600b\n"),
+])
+def test_dump_yaml_declines_empty_keys_and_non_bmp(data, expected, clean_up, long_form):
+    """
+    libyaml writes an empty key as "'':" and escapes characters past U+FFFF,
+    where PyYAML writes "? ''" and the characters as they are
+    """
+
+    assert dump_both(data, clean_up, long_form) == (expected, None)
+
+    for writer in cfn_flip.YAML_WRITERS:
+        assert cfn_flip.dump_yaml(data, clean_up, long_form, writer) == expected
+
+
+@requires_libyaml
+def test_dump_yaml_declines_wrapped_lines():
+    data = ODict((
+        ("Short", "word " * 10),
+    ))
+
+    expected, actual = dump_both(data, False, False, width=20)
+
+    assert actual is None
+
+
+@requires_libyaml
+def test_dump_yaml_declines_scalar_documents():
+    expected, actual = dump_both("plain", False, False)
+
+    assert actual is None
+    assert expected == "plain\n...\n"
+
+
+def test_indent_sequences():
+    source = "\n".join((
+        "a:",
+        "- b",
+        "- c: !Join",
+        "  - ''",
+        "  - - d",
+        "  e:",
+        "  - |-",
+        "    - not",
+        "    - an entry",
+        "f: !Sub |-",
+        "  - literal",
+        "g:",
+        "  h: i",
+        "",
+    ))
+
+    expected = "\n".join((
+        "a:",
+        "  - b",
+        "  - c: !Join",
+        "      - ''",
+        "      - - d",
+        "    e:",
+        "      - |-",
+        "        - not",
+        "        - an entry",
+        "f: !Sub |-",
+        "  - literal",
+        "g:",
+        "  h: i",
+        "",
+    ))
+
+    assert indent_sequences(source) == expected
+
+
+def test_get_dumper_libyaml():
+    dumper = get_dumper(clean_up=True, long_form=True, libyaml=True)
+
+    if CfnCYamlDumper is None:
+        assert dumper is None
+    else:
+        assert dumper == cfn_flip.yaml_dumper.CLongCleanDumper
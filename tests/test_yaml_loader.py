@@ -0,0 +1,94 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_tools import load_yaml
+from cfn_tools.odict import ODict
+from cfn_tools.yaml_loader import CfnCYamlLoader, CfnYamlLoader, get_loader
+import glob
+import pytest
+import yaml
+
+requires_libyaml = pytest.mark.skipif(CfnCYamlLoader is None, reason="PyYAML built without libyaml")
+
+EXAMPLES = [
+    path for path in sorted(glob.glob("examples/*"))
+    if path.endswith((".json", ".yaml"))
+]
+
+
+@requires_libyaml
+def test_get_loader_prefers_libyaml():
+    assert get_loader() is CfnCYamlLoader
+
+
+def test_get_loader_without_libyaml(monkeypatch):
+    monkeypatch.setattr("cfn_tools.yaml_loader.CfnCYamlLoader", None)
+
+    assert get_loader() is CfnYamlLoader
+
+
+@requires_libyaml
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_loader_parity(path):
+    """
+    Both loaders should build identical trees from every example
+    """
+
+    with open(path, "r") as f:
+        source = f.read()
+
+    expected = yaml.load(source, Loader=CfnYamlLoader)
+    actual = yaml.load(source, Loader=CfnCYamlLoader)
+
+    assert actual == expected
+
+
+@requires_libyaml
+def test_loader_parity_types():
+    source = """
+    a: !GetAtt foo.bar.baz
+    b: !Sub
+      - ${x}
+      - x: !Ref y
+    c:
+      nested: [1, 2.5, true, null]
+    """
+
+    actual = yaml.load(source, Loader=CfnCYamlLoader)
+
+    assert type(actual) is ODict
+    assert type(actual["b"]["Fn::Sub"][1]) is ODict
+    assert actual == yaml.load(source, Loader=CfnYamlLoader)
+
+
+def test_load_yaml_reports_pure_python_errors():
+    """
+    Errors should read the same whichever loader was used
+    """
+
+    with pytest.raises(yaml.scanner.ScannerError, match="line 1, column 4:\n    a: 'unterminated"):
+        load_yaml("a: 'unterminated")
+
+
+def test_get_loader_with_tabs():
+    """
+    libyaml accepts some tab-indented documents that PyYAML rejects
+    """
+
+    assert get_loader("a:\n\tb") is CfnYamlLoader
+
+
+def test_get_loader_with_tabs_in_bytes():
+    assert get_loader(b"a:\n\tb") is CfnYamlLoader
+    assert get_loader(memoryview(b"a:\n\tb")) is CfnYamlLoader
+    assert get_loader(b"a:\n  b") is CfnCYamlLoader
@@ -0,0 +1,156 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License. A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_tools import dump_json, load_yaml
+from cfn_tools.chunked_writer import CHUNK_SIZE
+from cfn_tools.yaml_to_json import stream_yaml_to_json
+import cfn_flip
+import glob
+import pytest
+import six
+import yaml
+
+EXAMPLES = [
+    path for path in sorted(glob.glob("examples/*"))
+    if path.endswith((".json", ".yaml"))
+]
+
+
+def stream(source):
+    output = six.StringIO()
+    stream_yaml_to_json(source, output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_stream_examples(path):
+    """
+    Streaming should produce exactly what loading and dumping does
+    """
+
+    with open(path, "r") as f:
+        source = f.read()
+
+    assert stream(source) == dump_json(load_yaml(source))
+
+
+@pytest.mark.parametrize("source", [
+    "",
+    "plain",
+    "!Ref Thing",
+    "!GetAtt Thing.Arn",
+    "[]",
+    "a: []\nb: {}\nc: [{}, []]",
+    "a: !GetAtt a.b.c\nb: !GetAtt [a, 1]\nc: !Base64 {Ref: x}\nd: !Sub [a, {b: !Ref c}]\ne: !Condition x",
+    "a: !Join ['', [a, !Ref b, !GetAtt c.d]]\nb: !Foo {x: y}\nc: ! 12",
+    "1: a\nfalse: b\n~: c\n1.5: d\n.inf: e\nx: .nan\ny: 2017-01-01\nz: 2017-01-01 10:00:00\nw: !!str 12\nv: 0x1F",
+    "a: &x [1, {b: 2}]\nc: *x\nd: &y !Ref z\ne: *y\nf: &z [*y, *x]\ng: *z",
+    "a: 'caf\\xe9'\nb: \"\\t\\x01\\u2028\"",
+    "a: !!omap [x: 1, y: [2, {z: 3}]]\nb: !!pairs [x: 1, x: 2]\nc: !!omap []",
+    "a: !!omap\n  - !Ref x: !GetAtt a.b\n  - 1: !!omap [y: 1]\nb: !!map {c: !!seq [d]}",
+    "a: !!omap [&x {b: 1}, *x]",
+])
+def test_stream_matches_dump_json(source):
+    assert stream(source) == dump_json(load_yaml(source))
+
+
+def test_stream_from_file():
+    with open("examples/test.yaml", "r") as f:
+        actual = stream(f)
+
+    with open("examples/test.yaml", "r") as f:
+        expected = dump_json(load_yaml(f.read()))
+
+    assert actual == expected
+
+
+def test_stream_writes_in_chunks():
+    source = "\n".join("Key{}: {}".format(i, "x" * 100) for i in range(2000))
+    writes = []
+
+    class Output(object):
+        def write(self, text):
+            writes.append(len(text))
+
+    stream_yaml_to_json(source, Output())
+
+    assert len(writes) > 1
+    assert max(writes) < CHUNK_SIZE * 2
+
+
+def test_stream_rejects_duplicate_keys():
+    with pytest.raises(ValueError, match="Duplicate key 'a'"):
+        stream("a: 1\na: 2")
+
+
+def test_stream_rejects_multiple_documents():
+    with pytest.raises(yaml.composer.ComposerError, match="expected a single document"):
+        stream("a: 1\n---\nb: 2")
+
+
+def test_stream_rejects_undefined_alias():
+    with pytest.raises(yaml.composer.ComposerError, match="found undefined alias"):
+        stream("a: *x")
+
+
+def test_stream_rejects_bad_getatt():
+    with pytest.raises(ValueError, match="Unexpected node type"):
+        stream("!GetAtt {a: b}")
+
+
+def test_stream_bad_getatt_names_the_node():
+    source = "A:\n  B: !GetAtt {Ref: x}\n"
+
+    with pytest.raises(ValueError) as streamed:
+        stream(source)
+
+    with pytest.raises(ValueError) as loaded:
+        load_yaml(source)
+
+    assert str(streamed.value) == str(loaded.value)
+    assert "mapping for !GetAtt" in str(streamed.value)
+    assert "line 2, column 6" in str(streamed.value)
+
+
+@pytest.mark.parametrize("source,message", [
+    ("a: !!omap {b: 1}", "expected a sequence, but found mapping"),
+    ("a: !!omap [b]", "expected a mapping of length 1, but found scalar"),
+    ("a: !!pairs [[b]]", "expected a mapping of length 1, but found sequence"),
+    ("a: !!omap [{}]", "expected a single mapping item, but found 0 items"),
+    ("a: !!omap [{b: 1, c: 2}]", "expected a single mapping item, but found 2 items"),
+    ("a: !!foo {b: 1}", "could not determine a constructor"),
+])
+def test_stream_rejects_what_the_loader_rejects(source, message):
+    with pytest.raises(yaml.constructor.ConstructorError, match=message):
+        load_yaml(source)
+
+    with pytest.raises(yaml.constructor.ConstructorError, match=message):
+        stream(source)
+
+
+def test_stream_rejects_sets():
+    with pytest.raises(TypeError, match="Object of type set"):
+        dump_json(load_yaml("a: !!set {b, c}"))
+
+    with pytest.raises(TypeError, match="Object of type set"):
+        stream("a: !!set {b, c}")
+
+
+def test_to_json_stream():
+    with open("examples/test.yaml", "r") as f:
+        source = f.read()
+
+    output = six.StringIO()
+    cfn_flip.to_json_stream(source, output)
+
+    assert output.getvalue() == cfn_flip.to_json(source)
@@ -0,0 +1,232 @@
+"""
+Copyright 2016-2017 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Licensed under the Apache License, Version 2.0 (the "License").
+You may not use this file except in compliance with the License.
+A copy of the License is located at
+
+    http://aws.amazon.com/apache2.0/
+
+or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and limitations under the License.
+"""
+
+from cfn_clean import clean, cfn_literal_parser
+from cfn_flip.yaml_dumper import get_dumper
+from cfn_flip.yaml_writer import is_simple_plain, write_yaml
+from cfn_tools.literal import LiteralString
+from cfn_tools.odict import ODict
+import cfn_flip
+import glob
+import pytest
+import random
+import yaml
+
+EXAMPLES = [
+    path for path in sorted(glob.glob("examples/*"))
+    if path.endswith((".json", ".yaml"))
+]
+
+FLAVOURS = [
+    (False, False),
+    (True, False),
+    (False, True),
+    (True, True),
+]
+
+# Pieces of strings that exercise quoting, escaping, wrapping and implicit types
+FRAGMENTS = [
+    "a", "word ", " ", "  ", "\n", "\r", "\t", ":", "-", "?", "#", "'", "\"", "\\", "0", "123",
+    "0123456789", "true", "null", "~", "yes", "1.5", "1e3", "...", "---", "!", "|", ">", "&x", "*x",
+    "{", "[", ",", "%", "@", "`", "<<", "=", ".", "Ref", "Fn::", "AWS::S3::Bucket", "x" * 30,
+    "é", " ", "\x85", "﻿", "\x00", "\U0001F600",
+]
+
+FUNCTIONS = ["Ref", "Condition", "Fn::Join", "Fn::GetAtt", "Fn::Sub", "Fn::If", "Fn::", "Fn::é x"]
+
+
+def dump(data, clean_up, long_form, width=200):
+    return yaml.dump(
+        data,
+        Dumper=get_dumper(clean_up, long_form),
+        default_flow_style=False,
+        allow_unicode=True,
+        width=width,
+    )
+
+
+def random_string(rand):
+    value = "".join(rand.choice(FRAGMENTS) for _ in range(rand.choice([0, 1, 2, 3, 5, 10, 40])))
+
+    if rand.random() < 0.05:
+        return LiteralString(value)
+
+    return value
+
+
+def random_scalar(rand):
+    choice = rand.random()
+
+    if choice < 0.75:
+        return random_string(rand)
+
+    if choice < 0.85:
+        return rand.choice([0, 7, -5, 10 ** 20])
+
+    if choice < 0.9:
+        return rand.choice([True, False, None])
+
+    return rand.choice([1.5, 3.0, -0.0, 1e17, float("inf"), float("nan")])
+
+
+def random_node(rand, depth=0):
+    choice = rand.random()
+
+    if depth > 4 or choice < 0.45:
+        return random_scalar(rand)
+
+    if choice < 0.6:
+        return [random_node(rand, depth + 1) for _ in range(rand.choice([0, 1, 2, 3]))]
+
+    if choice < 0.75:
+        name = rand.choice(FUNCTIONS)
+
+        if name == "Fn::GetAtt" and rand.random() < 0.5:
+            return ODict(((name, [random_string(rand), random_string(rand)]),))
+
+        return ODict(((name, random_node(rand, depth + 1)),))
+
+    pairs = [
+        (random_string(rand) if rand.random() < 0.9 else random_scalar(rand), random_node(rand, depth + 1))
+        for _ in range(rand.choice([0, 1, 2, 3, 4]))
+    ]
+
+    if rand.random() < 0.15:
+        return dict(pairs)
+
+    return ODict(dict(pairs).items())
+
+
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+@pytest.mark.parametrize("path", EXAMPLES)
+def test_golden_output(path, clean_up, long_form):
+    with open(path, "r") as f:
+        data, _ = cfn_flip.load(f.read())
+
+    if clean_up:
+        data = clean(data)
+
+    data = cfn_literal_parser(data)
+
+    assert write_yaml(data, clean_up, long_form, width=200) == dump(data, clean_up, long_form)
+
+
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+def test_golden_output_features(clean_up, long_form):
+    data = ODict((
+        ("Account", "0123456789"),
+        ("Zero", "0abc"),
+        ("Implicit", ["true", "null", "1.5", "~", "", " padded "]),
+        ("Tags", [
+            ODict((("Key", "Name"), ("Value", ODict((("Ref", "Name"),))))),
+            ODict((("Key", "Empty"), ("Value", ""))),
+        ]),
+        ("Joined", ODict((("Fn::Join", ["", ["a", ODict((("Ref", "B"),)), [1, 2]]]),))),
+        ("Att", ODict((("Fn::GetAtt", ["Res", "Arn"]),))),
+        ("Sub", ODict((("Fn::Sub", "line\nbreak"),))),
+        ("Script", "#!/bin/bash\nyum -y update\n"),
+        ("Lines", "line\n" * 12),
+        ("Long", "word " * 50),
+        ("Indented", " leading\n  spaces"),
+        ("Definition", LiteralString('{\n  "a": [\n    1\n  ]\n}')),
+        ("Nested", [[["deep"], ODict((("key", ["value"]),))]]),
+        ("Empty", [ODict(), [], {}]),
+        ("Sorted", {"b": 1, "a": [True, None, 1.5]}),
+        (1, "int key"),
+        (None, "null key"),
+        ("k" * 130, "long key"),
+        ("multi\nline key", "value"),
+    ))
+
+    assert write_yaml(data, clean_up, long_form, width=200) == dump(data, clean_up, long_form)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_templates(seed):
+    rand = random.Random(seed)
+    data = ODict((("Root", random_node(rand)), ("Other", random_node(rand))))
+    width = rand.choice([None, 20, 40, 200])
+
+    for clean_up, long_form in FLAVOURS:
+        try:
+            expected = dump(data, clean_up, long_form, width)
+        except Exception:
+            # Anything PyYAML can't dump has to be left to it
+            assert write_yaml(data, clean_up, long_form, width) is None
+            continue
+
+        actual = write_yaml(data, clean_up, long_form, width)
+
+        assert actual is None or actual == expected
+
+
+def test_declines_aliases():
+    shared = ["a", "b"]
+    data = ODict((("One", shared), ("Two", shared)))
+
+    assert write_yaml(data) is None
+    assert "&id001" in cfn_flip.dump_yaml(data)
+
+
+def test_declines_scalar_documents():
+    assert write_yaml("plain") is None
+    assert write_yaml(ODict((("Ref", "Thing"),))) is None
+    assert cfn_flip.dump_yaml(ODict((("Ref", "Thing"),))) == dump(ODict((("Ref", "Thing"),)), False, False)
+
+
+def test_declines_unknown_types():
+    data = ODict((("Tuple", (1, 2)),))
+
+    assert write_yaml(data) is None
+    assert cfn_flip.dump_yaml(data) == dump(data, False, False)
+
+
+def test_keep_chomped_literals():
+    data = ODict((("Literal", LiteralString("text\n\n")),))
+
+    assert write_yaml(data) == dump(data, False, False)
+    assert write_yaml(data).endswith("...\n")
+
+
+@pytest.mark.parametrize("writer", ["direct", "libyaml", "pyyaml"])
+@pytest.mark.parametrize("clean_up,long_form", FLAVOURS)
+def test_dump_yaml_writers(writer, clean_up, long_form):
+    with open("examples/test.json", "r") as f:
+        data = cfn_flip.load_json(f.read())
+
+    actual = cfn_flip.dump_yaml(data, clean_up, long_form, writer=writer)
+
+    assert actual == dump(data, clean_up, long_form)
+
+
+def test_dump_yaml_unknown_writer():
+    with pytest.raises(ValueError, match="Unknown YAML writer"):
+        cfn_flip.dump_yaml({}, writer="fast")
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("AWS::S3::Bucket", True),
+    ("arn:aws:s3:::bucket/*", True),
+    ("a:", False),
+    ("-", False),
+    ("-1", True),
+    ("?x", True),
+    ("---x", False),
+    ("...", False),
+    ("#x", False),
+    ("has space", False),
+    ("é", False),
+])
+def test_is_simple_plain(value, expected):
+    assert is_simple_plain(value) == expected